@@ -0,0 +1,246 @@
+import asyncio
+import inspect
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from license_models import License, FeatureType
+from license_validator import LicenseValidator
+from rate_limiter import RateDecision, RateLimiter
+from validation_result import ValidationResult
+
+LicenseProvider = Union[License, Callable[[], Union[License, Awaitable[License]]]]
+
+class AsyncLicenseValidator:
+    """LicenseValidator 的 asyncio 封装
+
+    签名验证、时间戳文件读写和时间同步探测都在有界线程池中执行，不阻塞
+    事件循环；同一许可证对象的并发校验合并为一次。权限查找本身只是字典
+    查找，直接在事件循环中完成。
+    """
+
+    def __init__(self, validator: LicenseValidator, max_workers: int = 4):
+        """初始化异步许可证验证器
+
+        Args:
+            validator: 同步验证器
+            max_workers: 校验线程池大小
+        """
+        self.validator = validator
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="license-verify")
+        # id(license_obj) -> 进行中的校验；许可证对象在校验期间被引用，id 不会被复用
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self.coalesced = 0
+
+    @classmethod
+    def from_files(
+        cls,
+        public_key_path: str,
+        secret_key: bytes,
+        max_workers: int = 4,
+        **validator_kwargs: Any
+    ) -> "AsyncLicenseValidator":
+        """创建异步验证器
+
+        默认开启延迟初始化和后台时间同步，构造过程不会阻塞事件循环。
+
+        Args:
+            public_key_path: 公钥文件路径
+            secret_key: 密钥
+            max_workers: 校验线程池大小
+            **validator_kwargs: 传给 LicenseValidator 的其他参数
+        """
+        validator_kwargs.setdefault('lazy_init', True)
+        validator_kwargs.setdefault('background_time_sync', True)
+        return cls(LicenseValidator(public_key_path, secret_key, **validator_kwargs), max_workers)
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待底层验证器完成初始化"""
+        return await self._run(self.validator.wait_until_ready, timeout)
+
+    def is_ready(self) -> bool:
+        return self.validator.is_ready()
+
+    async def validate_license(self, license_obj: License) -> bool:
+        """验证许可证的有效性
+
+        Args:
+            license_obj: 许可证对象
+
+        Returns:
+            bool: 许可证是否有效
+        """
+        # 持有验证租约时直接放行，不进入线程池
+        if self.validator.leased_result(license_obj) is not None:
+            return True
+        return (await self.validate_license_detailed(license_obj)).valid
+
+    async def validate_license_detailed(self, license_obj: License) -> ValidationResult:
+        """验证许可证并返回失败原因、失败阶段与各阶段耗时
+
+        Args:
+            license_obj: 许可证对象
+
+        Returns:
+            ValidationResult: 验证结果
+        """
+        key = id(license_obj)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(self._run(self.validator.validate_license_detailed, license_obj))
+        self._inflight[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: int, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def _check(self, license_obj: License, query: tuple) -> bool:
+        """验证许可证后执行单项检查
+
+        结果缓存命中或持有验证租约时不进入线程池；缓存规则与同步验证器一致。
+        """
+        validator = self.validator
+        result = validator.cached_decision(license_obj, query)
+        if result is not None:
+            return result
+        validation = validator.leased_result(license_obj)
+        if validation is None:
+            validation = await self.validate_license_detailed(license_obj)
+        if query[0] == 'usage' and validator.usage_meter is not None:
+            # 用量计数器需要读数据库
+            return await self._run(validator.decide, license_obj, query, validation)
+        return validator.decide(license_obj, query, validation)
+
+    async def check_feature(self, license_obj: License, feature_id: str, feature_type: FeatureType) -> bool:
+        """检查特定功能是否可用"""
+        return await self._check(license_obj, ('feature', feature_id, feature_type))
+
+    async def check_api_permission(self, license_obj: License, method: str, path: str) -> bool:
+        """检查API权限"""
+        return await self._check(license_obj, ('api', method, path))
+
+    async def acquire_api(self, license_obj: License, method: str, path: str, tokens: float = 1) -> RateDecision:
+        """检查API权限并申请令牌，见 LicenseValidator.acquire_api"""
+        if not await self.check_api_permission(license_obj, method, path):
+            return RateDecision(False, None, None)
+        limiter = self.validator.rate_limiter
+        if limiter is None:
+            return RateDecision(True, None, None)
+        if type(limiter) is RateLimiter:
+            return limiter.acquire(license_obj, method, path, tokens)
+        # 其他限流器（如 AggregatedRateLimiter）可能需要网络往返
+        return await self._run(limiter.acquire, license_obj, method, path, tokens)
+
+    async def check_service_permission(self, license_obj: License, service_name: str, endpoint: str) -> bool:
+        """检查微服务权限"""
+        return await self._check(license_obj, ('service', service_name, endpoint))
+
+    async def check_ui_permission(self, license_obj: License, component_id: str) -> bool:
+        """检查UI组件权限"""
+        return await self._check(license_obj, ('ui', component_id))
+
+    async def check_button_permission(self, license_obj: License, button_id: str) -> bool:
+        """检查按钮权限"""
+        return await self._check(license_obj, ('button', button_id))
+
+    async def check_usage_limit(self, license_obj: License, metric_type: str, value: int = 1) -> bool:
+        """检查使用限制"""
+        return await self._check(license_obj, ('usage', metric_type, value))
+
+    async def consume_usage(self, license_obj: License, metric_type: str, value: int = 1) -> bool:
+        """验证许可证并占用用量，见 LicenseValidator.consume_usage"""
+        if self.validator.usage_meter is None:
+            raise RuntimeError("未配置用量计数器")
+        if not await self.validate_license(license_obj):
+            return False
+        return await self._run(self.validator.usage_meter.consume, license_obj, metric_type, value)
+
+    async def release_usage(self, license_obj: License, metric_type: str, value: int = 1) -> None:
+        """释放用量，见 LicenseValidator.release_usage"""
+        await self._run(self.validator.release_usage, license_obj, metric_type, value)
+
+    async def check_many(self, license_obj: License, queries: Sequence[Tuple]) -> List[bool]:
+        """批量检查权限，在线程池中执行 LicenseValidator.check_many，结果缓存规则与之一致"""
+        return await self._run(self.validator.check_many, license_obj, queries)
+
+    async def aclose(self) -> None:
+        """关闭验证器和线程池"""
+        await self._run(self.validator.close)
+        self._executor.shutdown(wait=False)
+
+async def _resolve_license(provider: LicenseProvider) -> License:
+    if isinstance(provider, License):
+        return provider
+    license_obj = provider()
+    if inspect.isawaitable(license_obj):
+        license_obj = await license_obj
+    return license_obj
+
+def require_api_permission(
+    validator: AsyncLicenseValidator,
+    license_provider: LicenseProvider,
+    method: Optional[str] = None,
+    path: Optional[str] = None
+) -> Callable:
+    """生成 FastAPI 依赖，校验API权限，未授权时返回403
+
+    验证器配置了限流器时同时执行 rate_limit，超限返回429并带 Retry-After 头。
+
+    Args:
+        validator: 异步验证器
+        license_provider: 许可证对象，或返回许可证（可为协程）的无参函数
+        method: HTTP方法，为None时使用请求的方法
+        path: API路径，为None时使用请求的路径
+
+    用法：
+        @app.post("/api/v1/users", dependencies=[Depends(require_api_permission(validator, load_license))])
+    """
+    from fastapi import HTTPException, Request
+
+    async def dependency(request: Request) -> None:
+        license_obj = await _resolve_license(license_provider)
+        request_method = method or request.method
+        request_path = path or request.url.path
+        decision = await validator.acquire_api(license_obj, request_method, request_path)
+        if decision.allowed:
+            return
+        if decision.retry_after is None:
+            raise HTTPException(status_code=403, detail="License check failed")
+        raise HTTPException(
+            status_code=429, detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(decision.retry_after))}
+        )
+
+    return dependency
+
+def require_service_permission(
+    validator: AsyncLicenseValidator,
+    license_provider: LicenseProvider,
+    service_name: str,
+    endpoint: str
+) -> Callable:
+    """生成 FastAPI 依赖，校验微服务权限，未授权时返回403
+
+    Args:
+        validator: 异步验证器
+        license_provider: 许可证对象，或返回许可证（可为协程）的无参函数
+        service_name: 服务名称
+        endpoint: 端点路径
+    """
+    from fastapi import HTTPException
+
+    async def dependency() -> None:
+        license_obj = await _resolve_license(license_provider)
+        if not await validator.check_service_permission(license_obj, service_name, endpoint):
+            raise HTTPException(status_code=403, detail="Service not allowed")
+
+    return dependency
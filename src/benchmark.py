@@ -0,0 +1,1112 @@
+"""许可证系统性能基准
+
+用法：
+    python src/benchmark.py [基准名称 ...] [--features N] [--json 输出文件]
+                            [--baseline 基线文件] [--threshold 0.2]
+
+不指定名称时运行全部基准，名称 core 表示发布前必跑的核心基准。结果中以
+_us、_ms 结尾的字段为耗时（越小越好），以 _per_s 结尾的字段为吞吐（越大越好），
+其余字段为参数或说明。
+
+--json 将结果写为 JSON，可作为之后运行的 --baseline；指定基线时逐项比较，
+任一指标劣化超过 --threshold 比例时以退出码1结束。
+"""
+import argparse
+import inspect
+import io
+import json
+import os
+import platform
+import random
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+import uuid
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import ntplib
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from license_models import (
+    License, APIPermission, ServicePermission,
+    UIPermission, ButtonPermission, FeatureType, UsageLimit
+)
+from hardware_validator import TimeSyncValidator
+from license_container import LicenseContainer, write_container
+from license_generator import LicenseGenerator
+from license_validator import LicenseValidator
+from multi_tenant_validator import MultiTenantValidator
+from secure_time_storage import SecureTimeStorage
+from usage_meter import UsageMeter
+from rate_limiter import RateLimiter
+from usage_aggregator import AggregatedUsageMeter, AggregatorClient, AggregatorServer
+from signature_suites import SIGNATURE_SUITES
+from validation_metrics import ValidationMetrics
+from shared_snapshot import SnapshotPublisher, SharedLicenseView
+
+def make_synthetic_license(n_features: int) -> License:
+    """构造包含指定数量功能权限的许可证（未签名）
+
+    四种权限类型轮流生成，便于覆盖各类检查。
+
+    Args:
+        n_features: 功能权限数量
+
+    Returns:
+        License: 许可证对象
+    """
+    features = []
+    for i in range(n_features):
+        kind = i % 4
+        if kind == 0:
+            features.append(APIPermission(
+                feature_id=f"api_{i}",
+                feature_name=f"API {i}",
+                feature_type=FeatureType.API,
+                method="GET",
+                path=f"/api/v1/resource_{i}",
+                rate_limit=1000
+            ))
+        elif kind == 1:
+            features.append(ServicePermission(
+                feature_id=f"service_{i}",
+                feature_name=f"服务 {i}",
+                feature_type=FeatureType.SERVICE,
+                service_name=f"service-{i}",
+                version="1.0.0",
+                endpoints=["/orders", "/payments"]
+            ))
+        elif kind == 2:
+            features.append(UIPermission(
+                feature_id=f"ui_{i}",
+                feature_name=f"组件 {i}",
+                feature_type=FeatureType.UI,
+                component_id=f"component-{i}",
+                component_type="panel"
+            ))
+        else:
+            features.append(ButtonPermission(
+                feature_id=f"button_{i}",
+                feature_name=f"按钮 {i}",
+                feature_type=FeatureType.BUTTON,
+                button_id=f"button-{i}",
+                action_type="click"
+            ))
+    now = datetime.utcnow()
+    return License(
+        license_id=str(uuid.uuid4()),
+        customer_id="bench_customer",
+        not_before=now - timedelta(days=1),
+        not_after=now + timedelta(days=365),
+        features=features,
+        usage_limits=[
+            UsageLimit(metric_type="nodes", max_value=10),
+            UsageLimit(metric_type="users", max_value=100)
+        ],
+        metadata={"environment": "benchmark"}
+    )
+
+@contextmanager
+def _in_temp_dir():
+    """在临时目录中运行，避免基准写入的 secure_storage 等文件污染工作目录"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(cwd)
+
+class LocalNTPServer:
+    """本地UDP NTP应答器，用于在无外网环境下模拟NTP服务器
+
+    可设置应答延迟以模拟慢速或跨地域的服务器。
+    """
+
+    def __init__(self, delay: float = 0.0, offset: float = 0.0, respond: bool = True):
+        """
+        Args:
+            delay: 每次应答前的等待时间（秒）
+            offset: 应答时间相对本机时间的偏移（秒）
+            respond: 为False时只接收不应答，模拟无法访问的服务器
+        """
+        self.delay = delay
+        self.offset = offset
+        self.respond = respond
+        self.requests = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.settimeout(0.1)
+        self._running = False
+        self._thread = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._sock.getsockname()
+        return f"{host}:{port}"
+
+    def __enter__(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._running = False
+        self._thread.join()
+        self._sock.close()
+
+    def _serve(self):
+        while self._running:
+            try:
+                data, addr = self._sock.recvfrom(256)
+            except socket.timeout:
+                continue
+            self.requests += 1
+            if not self.respond:
+                continue
+            if self.delay:
+                time.sleep(self.delay)
+            request = ntplib.NTPPacket()
+            request.from_data(data)
+            now = time.time() + self.offset
+            response = ntplib.NTPPacket(version=request.version, mode=4, tx_timestamp=ntplib.system_to_ntp_time(now))
+            response.stratum = 1
+            response.orig_timestamp = request.tx_timestamp
+            response.recv_timestamp = ntplib.system_to_ntp_time(now)
+            self._sock.sendto(response.to_data(), addr)
+
+def write_rsa_key_pair(directory: str, key_size: int = 2048) -> Dict[str, str]:
+    """生成RSA密钥对并写入目录
+
+    Returns:
+        dict: private_key 与 public_key 文件路径
+    """
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+    paths = {
+        'private_key': os.path.join(directory, "private_key.pem"),
+        'public_key': os.path.join(directory, "public_key.pem")
+    }
+    with open(paths['private_key'], "wb") as f:
+        f.write(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        ))
+    with open(paths['public_key'], "wb") as f:
+        f.write(private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        ))
+    return paths
+
+def _time_per_call(func: Callable[[], object], number: int) -> float:
+    """测量单次调用耗时（秒），取5轮中的最小值"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+def _linear_check_api_permission(license_obj: License, method: str, path: str) -> bool:
+    """线性扫描实现，作为权限索引的对照"""
+    for feature in license_obj.features:
+        if (isinstance(feature, APIPermission) and
+                feature.method == method and
+                feature.path == path):
+            return feature.enabled
+    return False
+
+def bench_permission_index() -> List[Dict[str, float]]:
+    """权限索引与线性扫描的查找耗时随功能数量的变化"""
+    results = []
+    for size in (10, 100, 1000, 10000):
+        license_obj = make_synthetic_license(size)
+        # 查找最后一个API权限，线性扫描的最坏情况
+        last_api = max(i for i in range(size) if i % 4 == 0)
+        path = f"/api/v1/resource_{last_api}"
+        number = max(100, 100000 // size)
+
+        compile_time = _time_per_call(lambda: license_obj.invalidate_index() or license_obj.permission_index, 5)
+        linear = _time_per_call(lambda: _linear_check_api_permission(license_obj, "GET", path), number)
+        indexed = _time_per_call(lambda: license_obj.check_api_permission("GET", path), 10000)
+        results.append({
+            'features': size,
+            'compile_ms': compile_time * 1e3,
+            'linear_us': linear * 1e6,
+            'indexed_us': indexed * 1e6
+        })
+    return results
+
+def _template_regex(template: str) -> "re.Pattern":
+    """将路径模板转换为正则表达式，作为逐条扫描匹配的对照"""
+    parts = []
+    segments = [seg for seg in template.split("/") if seg]
+    for i, segment in enumerate(segments):
+        if segment == "*" and i == len(segments) - 1:
+            parts.append("/.+")
+        elif segment == "*" or (segment.startswith("{") and segment.endswith("}")):
+            parts.append("/[^/]+")
+        else:
+            parts.append("/" + re.escape(segment))
+    return re.compile("".join(parts) + "/?$")
+
+def bench_route_matcher() -> List[Dict[str, float]]:
+    """路由前缀树与逐条扫描的模板匹配耗时随API权限数量的变化"""
+    results = []
+    for size in (10, 100, 1000, 10000):
+        features = [
+            APIPermission(
+                feature_id=f"api_{i}",
+                feature_name=f"API {i}",
+                feature_type=FeatureType.API,
+                method="GET",
+                path=f"/api/v1/tenants/{{tenant}}/resource_{i}/{{id}}/orders"
+            )
+            for i in range(size)
+        ]
+        now = datetime.utcnow()
+        license_obj = License(
+            license_id=str(uuid.uuid4()),
+            customer_id="bench_customer",
+            not_before=now - timedelta(days=1),
+            not_after=now + timedelta(days=365),
+            features=features
+        )
+        patterns = [(f, _template_regex(f.path)) for f in features]
+        path = f"/api/v1/tenants/t1/resource_{size - 1}/42/orders"
+
+        def linear_scan():
+            for feature, pattern in patterns:
+                if feature.method == "GET" and pattern.match(path):
+                    return feature.enabled
+            return False
+
+        assert linear_scan() and license_obj.check_api_permission("GET", path)
+        number = max(100, 100000 // size)
+        results.append({
+            'routes': size,
+            'linear_scan_us': _time_per_call(linear_scan, number) * 1e6,
+            'trie_us': _time_per_call(lambda: license_obj.check_api_permission("GET", path), 10000) * 1e6
+        })
+    return results
+
+def bench_timestamp_updates() -> List[Dict[str, float]]:
+    """时间戳即时写盘与合并写回两种策略下 update_timestamps 的耗时"""
+    results = []
+    with _in_temp_dir():
+        secret_key = Fernet.generate_key()
+        for flush_interval in (0.0, 1.0, 5.0):
+            storage = SecureTimeStorage(secret_key, flush_interval=flush_interval)
+            results.append({
+                'flush_interval': flush_interval,
+                'update_us': _time_per_call(storage.update_timestamps, 200) * 1e6
+            })
+            storage.close()
+    return results
+
+def bench_storage_validation() -> List[Dict[str, float]]:
+    """validate_storage 在缓存与不缓存解密时间戳时的耗时"""
+    results = []
+    with _in_temp_dir():
+        secret_key = Fernet.generate_key()
+        for cache_timestamps in (False, True):
+            storage = SecureTimeStorage(secret_key, cache_timestamps=cache_timestamps)
+            assert storage.validate_storage()
+            results.append({
+                'cache_timestamps': cache_timestamps,
+                'validate_us': _time_per_call(storage.validate_storage, 500) * 1e6
+            })
+    return results
+
+def bench_time_sync_refresh() -> List[Dict[str, float]]:
+    """刷新边界上 validate_time 的最大耗时：同步刷新与后台刷新对比
+
+    本地NTP应答器每次延迟0.2秒应答，刷新间隔设为0.05秒，使测量窗口内
+    多次跨越刷新边界。
+    """
+    results = []
+    with LocalNTPServer(delay=0.2) as server:
+        for background in (False, True):
+            validator = TimeSyncValidator(
+                [server.address], background_refresh=background,
+                refresh_interval=0.05, refresh_jitter=0.0
+            )
+            latencies = []
+            deadline = time.monotonic() + 1.0
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                assert validator.validate_time(time.time())
+                latencies.append(time.perf_counter() - start)
+            validator.stop()
+            latencies.sort()
+            results.append({
+                'background_refresh': background,
+                'calls': len(latencies),
+                'p50_us': latencies[len(latencies) // 2] * 1e6,
+                'max_ms': latencies[-1] * 1e3
+            })
+    return results
+
+def bench_validator_startup() -> List[Dict[str, float]]:
+    """LicenseValidator 构造耗时与就绪耗时：立即初始化与延迟初始化对比
+
+    有网络时使用一个本地NTP应答器；无网络时使用四个不应答的本地端口，
+    模拟离线集群中默认NTP服务器逐个超时的情况。
+    """
+    results = []
+    with _in_temp_dir() as tmp:
+        keys = write_rsa_key_pair(tmp)
+        secret_key = Fernet.generate_key()
+        reachable = LocalNTPServer()
+        unreachable = [LocalNTPServer(respond=False) for _ in range(4)]
+        with reachable, unreachable[0], unreachable[1], unreachable[2], unreachable[3]:
+            networks = {
+                'online': [reachable.address],
+                'offline': [server.address for server in unreachable]
+            }
+            for network, servers in networks.items():
+                for lazy_init in (False, True):
+                    start = time.perf_counter()
+                    validator = LicenseValidator(
+                        keys['public_key'], secret_key,
+                        ntp_servers=servers, lazy_init=lazy_init
+                    )
+                    constructed = time.perf_counter() - start
+                    assert validator.wait_until_ready(30)
+                    ready = time.perf_counter() - start
+                    validator.close()
+                    results.append({
+                        'network': network,
+                        'lazy_init': lazy_init,
+                        'construct_ms': constructed * 1e3,
+                        'ready_ms': ready * 1e3
+                    })
+    return results
+
+def bench_signature_suites() -> List[Dict[str, float]]:
+    """各签名算法的签名与验签吞吐（100项功能的许可证）"""
+    data = make_synthetic_license(100).dump_for_sign()
+    results = []
+    for name, suite in SIGNATURE_SUITES.items():
+        private_key = suite.generate_private_key()
+        public_key = private_key.public_key()
+        signature = suite.sign(private_key, data)
+        sign_time = _time_per_call(lambda: suite.sign(private_key, data), 50)
+        verify_time = _time_per_call(lambda: suite.verify(public_key, signature, data), 200)
+        results.append({
+            'algorithm': name,
+            'signature_bytes': len(signature),
+            'sign_us': sign_time * 1e6,
+            'verify_us': verify_time * 1e6,
+            'sign_per_s': 1 / sign_time,
+            'verify_per_s': 1 / verify_time
+        })
+    return results
+
+def _legacy_dump_for_sign(license_obj: License) -> bytes:
+    """旧版 dump_for_sign 实现（model_dump 后逐项重新 dump），作为对照"""
+    data = license_obj.model_dump(exclude={"signature", "signature_algorithm"})
+    for k in ["not_before", "not_after"]:
+        v = data.get(k)
+        if isinstance(v, datetime):
+            data[k] = v.replace(microsecond=0).isoformat()
+    data["features"] = [f.model_dump() for f in license_obj.features]
+    data["usage_limits"] = [l.model_dump() for l in license_obj.usage_limits]
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+def bench_canonical_encoding() -> List[Dict[str, float]]:
+    """dump_for_sign 耗时：旧实现、单次遍历编码与冻结后缓存"""
+    results = []
+    for size in (10, 100, 1000):
+        license_obj = make_synthetic_license(size)
+        assert _legacy_dump_for_sign(license_obj) == license_obj.dump_for_sign()
+        frozen = license_obj.model_copy().freeze()
+        number = max(10, 10000 // size)
+        results.append({
+            'features': size,
+            'legacy_us': _time_per_call(lambda: _legacy_dump_for_sign(license_obj), number) * 1e6,
+            'single_pass_us': _time_per_call(license_obj.dump_for_sign, number) * 1e6,
+            'frozen_cached_us': _time_per_call(frozen.dump_for_sign, 10000) * 1e6
+        })
+    return results
+
+def bench_license_container() -> List[Dict[str, float]]:
+    """JSON 许可证文件与二进制容器的大小、加载耗时和验签耗时"""
+    results = []
+    with _in_temp_dir() as tmp:
+        keys = write_rsa_key_pair(tmp)
+        generator = LicenseGenerator(keys['private_key'])
+        public_key = generator.private_key.public_key()
+        suite = generator.signature_suite
+        for size in (10, 100, 1000):
+            license_obj = make_synthetic_license(size)
+            generator._sign_license(license_obj)
+            json_path = generator._write_license_file(license_obj, tmp)
+            container_path = write_container(license_obj, os.path.join(tmp, f"{size}.lic"))
+            number = max(10, 2000 // size)
+
+            def load_json():
+                with open(json_path, "r", encoding="utf-8") as f:
+                    return License.model_validate(json.load(f))
+
+            def load_container_field():
+                with LicenseContainer.open(container_path) as container:
+                    return container.not_after
+
+            def load_container_full():
+                with LicenseContainer.open(container_path) as container:
+                    return container.to_license()
+
+            def verify_json():
+                loaded = load_json()
+                suite.verify(public_key, bytes.fromhex(loaded.signature), loaded.dump_for_sign())
+
+            def verify_container():
+                with LicenseContainer.open(container_path) as container:
+                    assert container.verify(public_key)
+
+            results.append({
+                'features': size,
+                'json_bytes': os.path.getsize(json_path),
+                'container_bytes': os.path.getsize(container_path),
+                'json_load_us': _time_per_call(load_json, number) * 1e6,
+                'container_field_us': _time_per_call(load_container_field, number) * 1e6,
+                'container_full_us': _time_per_call(load_container_full, number) * 1e6,
+                'json_load_verify_us': _time_per_call(verify_json, number) * 1e6,
+                'container_verify_us': _time_per_call(verify_container, number) * 1e6
+            })
+    return results
+
+def bench_multi_tenant() -> List[Dict[str, float]]:
+    """多租户验证器在不同LRU容量下的命中率、常驻内存与单次检查耗时
+
+    1000个租户，每个许可证100项功能，按帕累托分布访问（少数租户承担大部分请求）。
+    """
+    results = []
+    with _in_temp_dir() as tmp, LocalNTPServer() as server:
+        keys = write_rsa_key_pair(tmp)
+        generator = LicenseGenerator(keys['private_key'])
+        stored = {}
+        for i in range(1000):
+            license_obj = make_synthetic_license(100)
+            generator._sign_license(license_obj)
+            stored[f"tenant-{i}"] = license_obj.model_dump_json()
+        validator = LicenseValidator(
+            keys['public_key'], Fernet.generate_key(),
+            signature_cache_size=len(stored), timestamp_flush_interval=60.0,
+            ntp_servers=[server.address]
+        )
+        rng = random.Random(0)
+        tenants = [f"tenant-{min(int(rng.paretovariate(0.5)) - 1, 999)}" for _ in range(20000)]
+        for max_tenants in (50, 200, 1000):
+            multi = MultiTenantValidator(
+                validator, lambda tenant_id: License.model_validate_json(stored[tenant_id]),
+                max_tenants=max_tenants
+            )
+            start = time.perf_counter()
+            for tenant_id in tenants:
+                assert multi.check_api_permission(tenant_id, "GET", "/api/v1/resource_0")
+            elapsed = time.perf_counter() - start
+            stats = multi.stats()
+            results.append({
+                'max_tenants': max_tenants,
+                'hit_rate': stats['hit_rate'],
+                'evictions': stats['evictions'],
+                'resident_mb': stats['resident_bytes'] / 2 ** 20,
+                'check_us': elapsed / len(tenants) * 1e6
+            })
+        validator.close()
+    return results
+
+def bench_usage_meter() -> List[Dict[str, float]]:
+    """UsageMeter.consume 的耗时随预留批量的变化"""
+    results = []
+    license_obj = make_synthetic_license(10)
+    license_obj.usage_limits = [UsageLimit(metric_type="api_calls", max_value=10 ** 12)]
+    with _in_temp_dir():
+        for lease_size in (1, 10, 100):
+            meter = UsageMeter(f"usage_{lease_size}.db", lease_size=lease_size)
+            results.append({
+                'lease_size': lease_size,
+                'consume_us': _time_per_call(lambda: meter.consume(license_obj, "api_calls"), 2000) * 1e6,
+                'check_us': _time_per_call(lambda: meter.check(license_obj, "api_calls"), 2000) * 1e6
+            })
+            meter.close()
+    return results
+
+def bench_rate_limiter() -> List[Dict[str, float]]:
+    """令牌桶限流器在1、8、32个线程下的准入吞吐：单分片与16分片对比
+
+    许可证含100项功能（25条带 rate_limit 的API权限），rate_limit 调到足够大，
+    使测量的是准入判定本身而非拒绝路径。
+    """
+    license_obj = make_synthetic_license(100)
+    for feature in license_obj.features:
+        if isinstance(feature, APIPermission):
+            feature.rate_limit = 10 ** 9
+    license_obj.freeze()
+    paths = [f.path for f in license_obj.features if isinstance(f, APIPermission)]
+    per_thread = 20000
+    results = []
+    for shards in (1, 16):
+        for threads in (1, 8, 32):
+            limiter = RateLimiter(shards=shards)
+            barrier = threading.Barrier(threads + 1)
+
+            def worker(offset: int):
+                barrier.wait()
+                for i in range(per_thread):
+                    limiter.acquire(license_obj, "GET", paths[(i + offset) % len(paths)])
+
+            workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+            for t in workers:
+                t.start()
+            barrier.wait()
+            start = time.perf_counter()
+            for t in workers:
+                t.join()
+            elapsed = time.perf_counter() - start
+            results.append({
+                'shards': shards,
+                'threads': threads,
+                'admissions_per_s': threads * per_thread / elapsed
+            })
+    return results
+
+def bench_usage_aggregator() -> List[Dict[str, float]]:
+    """经本地协调进程汇总时 consume 的耗时随预留批量的变化"""
+    results = []
+    license_obj = make_synthetic_license(10)
+    license_obj.usage_limits = [UsageLimit(metric_type="api_calls", max_value=10 ** 12)]
+    with _in_temp_dir() as tmp:
+        secret_key = os.urandom(32)
+        server = AggregatorServer(
+            "tcp://127.0.0.1:0", os.path.join(tmp, "aggregator.db"), secret_key
+        ).start()
+        try:
+            for lease_size in (1, 10, 100):
+                meter = AggregatedUsageMeter(
+                    AggregatorClient(server.address, secret_key=secret_key), lease_size=lease_size
+                )
+                results.append({
+                    'lease_size': lease_size,
+                    'consume_us': _time_per_call(lambda: meter.consume(license_obj, "api_calls"), 1000) * 1e6
+                })
+                meter.close()
+        finally:
+            server.stop()
+    return results
+
+def bench_decision_cache() -> List[Dict[str, float]]:
+    """LicenseValidator.check_api_permission 在开启与关闭结果缓存时的耗时（允许与拒绝两种结果）"""
+    results = []
+    with _in_temp_dir() as tmp, LocalNTPServer() as server:
+        keys = write_rsa_key_pair(tmp)
+        generator = LicenseGenerator(keys['private_key'])
+        license_obj = make_synthetic_license(100)
+        generator._sign_license(license_obj)
+        license_obj.freeze()
+        for ttl in (0.0, 5.0):
+            validator = LicenseValidator(
+                keys['public_key'], Fernet.generate_key(),
+                ntp_servers=[server.address], decision_cache_ttl=ttl
+            )
+            for path, expected in (("/api/v1/resource_0", True), ("/api/v1/missing", False)):
+                assert validator.check_api_permission(license_obj, "GET", path) is expected
+                results.append({
+                    'decision_cache_ttl': ttl,
+                    'allowed': expected,
+                    'check_us': _time_per_call(
+                        lambda: validator.check_api_permission(license_obj, "GET", path),
+                        200 if ttl == 0 else 100000
+                    ) * 1e6
+                })
+            validator.close()
+    return results
+
+def _signed_license(n_features: int, generator: LicenseGenerator) -> License:
+    license_obj = make_synthetic_license(n_features)
+    generator._sign_license(license_obj)
+    return license_obj.freeze()
+
+def bench_validate_license(n_features: int = 100) -> List[Dict[str, float]]:
+    """LicenseValidator.validate_license 的耗时：默认配置、关闭签名缓存、开启合并写回"""
+    configs = (
+        ('default', {}),
+        ('no_signature_cache', {'signature_cache_size': 0}),
+        ('write_behind', {'timestamp_flush_interval': 5.0}),
+    )
+    results = []
+    with _in_temp_dir() as tmp, LocalNTPServer() as server:
+        keys = write_rsa_key_pair(tmp)
+        license_obj = _signed_license(n_features, LicenseGenerator(keys['private_key']))
+        for name, kwargs in configs:
+            validator = LicenseValidator(
+                keys['public_key'], Fernet.generate_key(), ntp_servers=[server.address], **kwargs
+            )
+            assert validator.validate_license(license_obj)
+            results.append({
+                'features': n_features,
+                'config': name,
+                'validate_us': _time_per_call(lambda: validator.validate_license(license_obj), 100) * 1e6
+            })
+            validator.close()
+    return results
+
+def bench_rejected_signature(n_features: int = 100) -> List[Dict[str, float]]:
+    """签名无效的许可证重复校验的耗时：开启与关闭无效签名缓存"""
+    results = []
+    with _in_temp_dir() as tmp, LocalNTPServer() as server:
+        keys = write_rsa_key_pair(tmp)
+        license_obj = _signed_license(n_features, LicenseGenerator(keys['private_key']))
+        tampered = license_obj.model_copy(update={'customer_id': "tampered"}).freeze()
+        for cache_size in (0, 1024):
+            validator = LicenseValidator(
+                keys['public_key'], Fernet.generate_key(), ntp_servers=[server.address],
+                signature_cache_size=cache_size, timestamp_flush_interval=5.0
+            )
+            assert not validator.validate_license(tampered)
+            elapsed = _time_per_call(lambda: validator.validate_license(tampered), 100)
+            results.append({
+                'features': n_features,
+                'signature_cache_size': cache_size,
+                'validate_us': elapsed * 1e6
+            })
+            validator.close()
+    return results
+
+def bench_validation_lease(n_features: int = 100) -> List[Dict[str, float]]:
+    """验证租约的效果：无租约与租约内 validate_license、check_feature 的耗时"""
+    results = []
+    with _in_temp_dir() as tmp, LocalNTPServer() as server:
+        keys = write_rsa_key_pair(tmp)
+        license_obj = _signed_license(n_features, LicenseGenerator(keys['private_key']))
+        for lease in (0.0, 5.0):
+            validator = LicenseValidator(
+                keys['public_key'], Fernet.generate_key(), ntp_servers=[server.address],
+                timestamp_flush_interval=5.0, validation_lease=lease
+            )
+            assert validator.validate_license(license_obj)
+            results.append({
+                'features': n_features,
+                'validation_lease': lease,
+                'validate_us': _time_per_call(lambda: validator.validate_license(license_obj), 2000) * 1e6,
+                'check_feature_us': _time_per_call(
+                    lambda: validator.check_feature(license_obj, "ui_2", FeatureType.UI), 2000
+                ) * 1e6
+            })
+            validator.close()
+    return results
+
+def _run_concurrent_validation(validator: LicenseValidator, license_obj: License,
+                              n_threads: int, duration: float) -> Tuple[int, int, float]:
+    """多线程同时交替调用 validate_license 与 check_feature
+
+    开始前先空闲超过1秒，使时间戳文件之间的差距超过一致性检查的容差。
+
+    Returns:
+        (调用次数, 返回False的次数, 实际耗时秒数)
+    """
+    assert validator.validate_license(license_obj)
+    time.sleep(1.2)
+    counts = [[0, 0] for _ in range(n_threads)]
+    barrier = threading.Barrier(n_threads + 1)
+    stop = threading.Event()
+
+    def worker(count):
+        barrier.wait()
+        while not stop.is_set():
+            for ok in (validator.validate_license(license_obj),
+                       validator.check_feature(license_obj, "ui_2", FeatureType.UI)):
+                count[0 if ok else 1] += 1
+
+    threads = [threading.Thread(target=worker, args=(count,)) for count in counts]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    calls = sum(c[0] + c[1] for c in counts)
+    return calls, sum(c[1] for c in counts), elapsed
+
+def bench_concurrent_validation(n_features: int = 100, duration: float = 1.0) -> List[Dict[str, float]]:
+    """多线程并发校验的压力测试：吞吐与错误拒绝数
+
+    每个配置由 _run_concurrent_validation 持续压测 duration 秒。许可证有效，
+    failures 应始终为0，tests/test_concurrent_validation.py 以较短的时长断言这一点。
+    """
+    configs = (
+        ('per_call', {}),
+        ('write_behind', {'timestamp_flush_interval': 5.0}),
+        ('snapshot', {'environment_refresh_interval': 1.0}),
+    )
+    results = []
+    with _in_temp_dir() as tmp, LocalNTPServer() as server:
+        keys = write_rsa_key_pair(tmp)
+        license_obj = _signed_license(n_features, LicenseGenerator(keys['private_key']))
+        for name, kwargs in configs:
+            for n_threads in (1, 8, 32):
+                validator = LicenseValidator(
+                    keys['public_key'], Fernet.generate_key(), ntp_servers=[server.address], **kwargs
+                )
+                calls, failures, elapsed = _run_concurrent_validation(
+                    validator, license_obj, n_threads, duration
+                )
+                validator.close()
+                results.append({
+                    'config': name,
+                    'threads': n_threads,
+                    'calls_per_s': calls / elapsed,
+                    'failures': failures
+                })
+    return results
+
+def bench_shared_snapshot(n_features: int = 100) -> List[Dict[str, float]]:
+    """预派生工作进程的启动开销：各自加载并验证许可证与打开主进程发布的共享快照
+
+    worker_kb 为工作进程启动后保留的 Python 对象内存（tracemalloc），快照的
+    映射页由各进程共享，不计入。
+    """
+    results = []
+    with _in_temp_dir() as tmp, LocalNTPServer() as server:
+        keys = write_rsa_key_pair(tmp)
+        generator = LicenseGenerator(keys['private_key'])
+        for n_licenses in (10, 100):
+            licenses = [_signed_license(n_features, generator) for _ in range(n_licenses)]
+            stored = [license_obj.model_dump_json() for license_obj in licenses]
+            master = LicenseValidator(
+                keys['public_key'], Fernet.generate_key(), ntp_servers=[server.address],
+                signature_cache_size=n_licenses
+            )
+            path = os.path.join(tmp, "licenses.snap")
+            snapshot_key = os.urandom(32)
+            publisher = SnapshotPublisher(path, master, licenses, snapshot_key)
+            start = time.perf_counter()
+            publisher.publish()
+            publish_ms = (time.perf_counter() - start) * 1e3
+
+            def boot_validator():
+                validator = LicenseValidator(
+                    keys['public_key'], Fernet.generate_key(), ntp_servers=[server.address],
+                    timestamp_flush_interval=5.0
+                )
+                loaded = [License.model_validate_json(data).freeze() for data in stored]
+                for license_obj in loaded:
+                    assert validator.validate_license(license_obj)
+                    license_obj.permission_index
+                return validator, loaded
+
+            def boot_view():
+                view = SharedLicenseView(path, snapshot_key)
+                assert view.validate_license(licenses[-1].license_id)
+                return view
+
+            for mode, boot in (('validator', boot_validator), ('shared_snapshot', boot_view)):
+                tracemalloc.start()
+                start = time.perf_counter()
+                worker = boot()
+                boot_ms = (time.perf_counter() - start) * 1e3
+                worker_kb = tracemalloc.get_traced_memory()[0] / 1024
+                tracemalloc.stop()
+                if mode == 'validator':
+                    validator, loaded = worker
+                    license_obj = loaded[-1]
+                    check = lambda: validator.check_feature(license_obj, "ui_2", FeatureType.UI)
+                else:
+                    license_id = licenses[-1].license_id
+                    check = lambda: worker.check_feature(license_id, "ui_2", FeatureType.UI)
+                assert check()
+                results.append({
+                    'licenses': n_licenses,
+                    'mode': mode,
+                    'publish_ms': publish_ms,
+                    'snapshot_kb': os.path.getsize(path) / 1024,
+                    'boot_ms': boot_ms,
+                    'worker_kb': worker_kb,
+                    'check_feature_us': _time_per_call(check, 2000) * 1e6
+                })
+                if mode == 'validator':
+                    validator.close()
+                else:
+                    worker.close()
+            master.close()
+    return results
+
+def bench_validation_metrics(n_features: int = 100) -> List[Dict[str, float]]:
+    """验证指标收集的开销：不注册钩子与注册 ValidationMetrics 时的 validate_license 耗时
+
+    使用写回模式的时间戳存储，使验证本身尽量快，开销占比按最坏情况计。
+    """
+    results = []
+    with _in_temp_dir() as tmp, LocalNTPServer() as server:
+        keys = write_rsa_key_pair(tmp)
+        license_obj = _signed_license(n_features, LicenseGenerator(keys['private_key']))
+        validator = LicenseValidator(
+            keys['public_key'], Fernet.generate_key(), ntp_servers=[server.address],
+            timestamp_flush_interval=60.0
+        )
+        metrics = ValidationMetrics()
+        validate = lambda: validator.validate_license(license_obj)
+        assert validate()
+        # 两种配置交替测量，减少机器负载波动对差值的影响
+        timings = {False: [], True: []}
+        for _ in range(7):
+            for enabled in (False, True):
+                validator.hooks = [metrics] if enabled else []
+                timings[enabled].append(_time_per_call(validate, 500))
+        for enabled in (False, True):
+            results.append({
+                'features': n_features,
+                'metrics': enabled,
+                'validate_us': min(timings[enabled]) * 1e6
+            })
+        render = _time_per_call(lambda: metrics.render_prometheus(validator), 100)
+        validator.close()
+    overhead = results[1]['validate_us'] - results[0]['validate_us']
+    results[1]['overhead_us'] = overhead
+    results[1]['overhead_pct'] = overhead / results[0]['validate_us'] * 100
+    results[1]['render_us'] = render * 1e6
+    return results
+
+def bench_license_checks(n_features: int = 100) -> List[Dict[str, float]]:
+    """License 各项 check_* 方法的耗时（权限索引已编译）"""
+    license_obj = make_synthetic_license(n_features)
+    license_obj.features.append(APIPermission(
+        feature_id="api_template",
+        feature_name="API template",
+        feature_type=FeatureType.API,
+        method="GET",
+        path="/api/v1/tenants/{tenant}/orders/{id}"
+    ))
+    license_obj.freeze()
+    checks = {
+        'check_feature': lambda: license_obj.check_feature("ui_2", FeatureType.UI),
+        'check_api_permission': lambda: license_obj.check_api_permission("GET", "/api/v1/resource_0"),
+        'check_api_permission_template': lambda: license_obj.check_api_permission("GET", "/api/v1/tenants/t1/orders/42"),
+        'check_service_permission': lambda: license_obj.check_service_permission("service-1", "/orders"),
+        'check_ui_permission': lambda: license_obj.check_ui_permission("component-2"),
+        'check_button_permission': lambda: license_obj.check_button_permission("button-3"),
+        'check_usage_limit': lambda: license_obj.check_usage_limit("nodes", 1),
+    }
+    results = []
+    for name, check in checks.items():
+        check()
+        results.append({
+            'features': n_features,
+            'method': name,
+            'check_us': _time_per_call(check, 20000) * 1e6
+        })
+    return results
+
+def bench_dump_for_sign(n_features: int = 100) -> List[Dict[str, float]]:
+    """License.dump_for_sign 的耗时：未冻结（每次序列化）与冻结后（缓存）"""
+    license_obj = make_synthetic_license(n_features)
+    frozen = license_obj.model_copy().freeze()
+    number = max(10, 10000 // max(1, n_features))
+    return [{
+        'features': n_features,
+        'bytes': len(license_obj.dump_for_sign()),
+        'dump_us': _time_per_call(license_obj.dump_for_sign, number) * 1e6,
+        'frozen_us': _time_per_call(frozen.dump_for_sign, 10000) * 1e6
+    }]
+
+def bench_generate_license(n_features: int = 100) -> List[Dict[str, float]]:
+    """LicenseGenerator.generate_license 的耗时（构造、签名、写文件），按签名算法"""
+    license_obj = make_synthetic_license(n_features)
+    spec = {
+        'customer_id': "bench_customer",
+        'not_before': license_obj.not_before,
+        'not_after': license_obj.not_after,
+        'features': [feature.model_dump() for feature in license_obj.features],
+        'usage_limits': [limit.model_dump() for limit in license_obj.usage_limits],
+    }
+    results = []
+    with _in_temp_dir() as tmp:
+        for name, suite in SIGNATURE_SUITES.items():
+            key_path = os.path.join(tmp, f"{name}.pem")
+            with open(key_path, "wb") as f:
+                f.write(suite.generate_private_key().private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.PKCS8,
+                    encryption_algorithm=serialization.NoEncryption()
+                ))
+            generator = LicenseGenerator(key_path)
+            # generate_license 每次都会打印保存路径
+            with redirect_stdout(io.StringIO()):
+                elapsed = _time_per_call(lambda: generator.generate_license(**spec), 20)
+            results.append({
+                'features': n_features,
+                'algorithm': name,
+                'generate_us': elapsed * 1e6
+            })
+    return results
+
+BENCHMARKS = {
+    'permission_index': bench_permission_index,
+    'route_matcher': bench_route_matcher,
+    'timestamp_updates': bench_timestamp_updates,
+    'storage_validation': bench_storage_validation,
+    'time_sync_refresh': bench_time_sync_refresh,
+    'validator_startup': bench_validator_startup,
+    'signature_suites': bench_signature_suites,
+    'canonical_encoding': bench_canonical_encoding,
+    'license_container': bench_license_container,
+    'multi_tenant': bench_multi_tenant,
+    'usage_meter': bench_usage_meter,
+    'rate_limiter': bench_rate_limiter,
+    'usage_aggregator': bench_usage_aggregator,
+    'decision_cache': bench_decision_cache,
+    'validate_license': bench_validate_license,
+    'license_checks': bench_license_checks,
+    'dump_for_sign': bench_dump_for_sign,
+    'generate_license': bench_generate_license,
+    'validation_metrics': bench_validation_metrics,
+    'rejected_signature': bench_rejected_signature,
+    'validation_lease': bench_validation_lease,
+    'concurrent_validation': bench_concurrent_validation,
+    'shared_snapshot': bench_shared_snapshot,
+}
+
+# 发布前必跑的核心基准
+CORE_BENCHMARKS = (
+    'validate_license', 'license_checks', 'dump_for_sign', 'storage_validation',
+    'timestamp_updates', 'generate_license', 'validator_startup',
+)
+
+def _is_lower_better(key: str) -> bool:
+    return key.endswith(("_us", "_ms"))
+
+def _is_higher_better(key: str) -> bool:
+    return key.endswith("_per_s")
+
+def _row_label(row: Dict[str, Any]) -> str:
+    return " ".join(
+        f"{k}={v}" for k, v in row.items()
+        if not (_is_lower_better(k) or _is_higher_better(k) or isinstance(v, float))
+    )
+
+def run_benchmarks(names: List[str], n_features: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """运行基准并返回 {名称: 结果行}
+
+    Args:
+        names: 基准名称
+        n_features: 合成许可证的功能数，传给支持该参数的基准
+    """
+    results = {}
+    for name in names:
+        func = BENCHMARKS[name]
+        kwargs = {}
+        if n_features is not None and 'n_features' in inspect.signature(func).parameters:
+            kwargs['n_features'] = n_features
+        results[name] = func(**kwargs)
+    return results
+
+def compare_with_baseline(
+    results: Dict[str, List[Dict[str, Any]]],
+    baseline: Dict[str, List[Dict[str, Any]]],
+    threshold: float = 0.2
+) -> List[Dict[str, Any]]:
+    """逐项比较结果与基线
+
+    同名基准的结果行按顺序对应，只比较耗时与吞吐字段。
+
+    Args:
+        results: 本次结果
+        baseline: 基线结果
+        threshold: 允许的劣化比例
+
+    Returns:
+        List[Dict[str, Any]]: 每个指标一项，包含 benchmark、row、metric、baseline、
+            current、change（正数表示劣化的比例）、regression
+    """
+    comparisons = []
+    for name, rows in results.items():
+        for row, base_row in zip(rows, baseline.get(name, [])):
+            for key, value in row.items():
+                base_value = base_row.get(key)
+                if not isinstance(base_value, (int, float)) or not base_value or isinstance(base_value, bool):
+                    continue
+                if _is_lower_better(key):
+                    change = value / base_value - 1
+                elif _is_higher_better(key):
+                    change = base_value / value - 1 if value else float("inf")
+                else:
+                    continue
+                comparisons.append({
+                    'benchmark': name,
+                    'row': _row_label(row),
+                    'metric': key,
+                    'baseline': base_value,
+                    'current': value,
+                    'change': change,
+                    'regression': change > threshold
+                })
+    return comparisons
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="许可证系统性能基准")
+    parser.add_argument("names", nargs="*", help="基准名称，core 表示核心基准，不指定时运行全部")
+    parser.add_argument("--features", type=int, default=None, help="合成许可证的功能数（默认100）")
+    parser.add_argument("--json", dest="json_path", help="将结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="与之比较的基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为劣化的比例，默认0.2")
+    args = parser.parse_args(argv)
+
+    names = []
+    for name in args.names or list(BENCHMARKS):
+        expanded = CORE_BENCHMARKS if name == "core" else (name,)
+        for item in expanded:
+            if item not in BENCHMARKS:
+                raise SystemExit(f"未知基准: {item}，可选: core, {', '.join(BENCHMARKS)}")
+            if item not in names:
+                names.append(item)
+
+    results = {}
+    for name in names:
+        print(f"== {name} ==")
+        results.update(run_benchmarks([name], args.features))
+        for row in results[name]:
+            print("  " + "  ".join(
+                f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}"
+                for k, v in row.items()
+            ))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.now().isoformat(timespec="seconds"),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'cpu_count': os.cpu_count(),
+                    'features': args.features
+                },
+                'results': results
+            }, f, ensure_ascii=False, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)['results']
+    comparisons = compare_with_baseline(results, baseline, args.threshold)
+    regressions = [c for c in comparisons if c['regression']]
+    print(f"== 与基线比较（阈值 {args.threshold:.0%}）==")
+    for c in comparisons:
+        flag = "劣化" if c['regression'] else "    "
+        print(f"  {flag} {c['benchmark']} [{c['row']}] {c['metric']}: "
+              f"{c['baseline']:.3f} -> {c['current']:.3f} ({c['change']:+.1%})")
+    print(f"共 {len(comparisons)} 项指标，{len(regressions)} 项劣化")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
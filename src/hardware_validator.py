@@ -1,9 +1,11 @@
 import sys
 import time
 import uuid
+import random
+import threading
 import subprocess
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, NamedTuple, Tuple, Optional, Union
 import os
 
 class BootTimeValidator:
@@ -24,79 +26,245 @@ class BootTimeValidator:
         # 当前时间不能早于系统启动时间
         return current_time >= self.boot_time
 
+class TimeSyncSnapshot(NamedTuple):
+    """一次时间同步探测的结果快照"""
+    sources: Tuple[Tuple[str, float], ...]  # (来源, 探测时的时间戳)
+    ntp_time: Optional[float]               # 最近一次成功的NTP时间
+    sync_time: float                        # 探测完成时的本地时间
+    sync_monotonic: float                   # 探测完成时的单调时钟读数
+
 class TimeSyncValidator:
-    def __init__(self, ntp_servers: List[str] = None):
+    # 快照过期后的处理策略
+    STALE_USE_LAST = "use_last"  # 继续使用过期快照
+    STALE_ALLOW = "allow"        # 忽略同步源，视为校验通过
+    STALE_REJECT = "reject"      # 视为校验失败
+
+    def __init__(
+        self,
+        ntp_servers: List[str] = None,
+        background_refresh: bool = False,
+        refresh_interval: float = 300.0,
+        refresh_jitter: float = 0.1,
+        max_staleness: Optional[float] = None,
+        stale_policy: str = STALE_USE_LAST,
+        ntp_timeout: float = 1.0,
+        initial_sync: bool = True
+    ):
         """初始化时间同步验证器
         
         Args:
-            ntp_servers: NTP服务器列表，如果为None则使用默认服务器
+            ntp_servers: NTP服务器列表，支持 "host" 或 "host:port"，如果为None则使用默认服务器
+            background_refresh: 是否在后台线程中刷新同步源。开启后 validate_time
+                只读取最近一次快照，不会在请求路径上发起网络探测
+            refresh_interval: 刷新间隔（秒）
+            refresh_jitter: 刷新间隔的随机抖动比例，避免多个实例同时探测
+            max_staleness: 快照最大可用时长（秒），为None时不过期
+            stale_policy: 快照过期后的处理策略，见 STALE_* 常量
+            ntp_timeout: 单个NTP服务器的请求超时（秒）
+            initial_sync: 是否在构造时同步探测。为False时构造不阻塞，开启后台刷新
+                则由后台线程立即完成首次探测，否则需调用 refresh()
         """
+        if stale_policy not in (self.STALE_USE_LAST, self.STALE_ALLOW, self.STALE_REJECT):
+            raise ValueError(f"未知的快照过期策略: {stale_policy}")
         self.ntp_servers = ntp_servers or [
             'pool.ntp.org',
             'time.windows.com',
             'time.apple.com',
             'time.google.com'
         ]
-        self.sync_sources = self._get_sync_sources()
-        self.last_ntp_time = None
-        self.last_sync_time = time.time()
+        self.background_refresh = background_refresh
+        self.refresh_interval = refresh_interval
+        self.refresh_jitter = refresh_jitter
+        self.max_staleness = max_staleness
+        self.stale_policy = stale_policy
+        self.ntp_timeout = ntp_timeout
+
+        self._snapshot = TimeSyncSnapshot((), None, time.time(), time.monotonic())
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._synced = threading.Event()
+
+        if initial_sync:
+            self.refresh()
+        if background_refresh:
+            self.start_background_refresh()
+
+    @property
+    def snapshot(self) -> TimeSyncSnapshot:
+        """最近一次探测的结果快照"""
+        return self._snapshot
+
+    @property
+    def sync_sources(self) -> List[Tuple[str, float]]:
+        return list(self._snapshot.sources)
+
+    @property
+    def last_ntp_time(self) -> Optional[float]:
+        return self._snapshot.ntp_time
+
+    @property
+    def last_sync_time(self) -> float:
+        return self._snapshot.sync_time
+
+    def _parse_server(self, server: str) -> Tuple[str, Union[int, str]]:
+        """解析 "host" 或 "host:port" 形式的服务器地址"""
+        host, sep, port = server.rpartition(':')
+        if sep and port.isdigit() and ':' not in host:
+            return host, int(port)
+        return server, 'ntp'
+
+    def _get_sync_sources(self) -> Tuple[List[Tuple[str, float]], Optional[float]]:
+        """获取可用的时间同步源
         
-    def _get_sync_sources(self) -> List[Tuple[str, float]]:
-        """获取可用的时间同步源"""
+        Returns:
+            (同步源列表, NTP时间)，NTP不可用时NTP时间为None
+        """
         sources = []
+        ntp_time = None
         
         # 检查NTP服务器
         for server in self.ntp_servers:
             try:
                 import ntplib
+                host, port = self._parse_server(server)
                 ntp_client = ntplib.NTPClient()
-                response = ntp_client.request(server, timeout=1)
+                response = ntp_client.request(host, port=port, timeout=self.ntp_timeout)
                 sources.append(('ntp', response.tx_time))
-                self.last_ntp_time = response.tx_time
-                self.last_sync_time = time.time()
+                ntp_time = response.tx_time
                 break  # 只要有一个NTP服务器响应就退出
             except:
                 continue
             
         # 检查系统时间同步服务
         try:
-            result = subprocess.check_output(['timedatectl', 'status'])
+            result = subprocess.check_output(['timedatectl', 'status'], stderr=subprocess.DEVNULL)
             if b'NTP synchronized: yes' in result:
                 sources.append(('systemd-timesyncd', time.time()))
         except:
             pass
             
-        return sources
+        return sources, ntp_time
+
+    def refresh(self) -> TimeSyncSnapshot:
+        """探测同步源并发布新快照
+        
+        NTP不可用时保留上一次的NTP时间。
+        
+        Returns:
+            TimeSyncSnapshot: 新快照
+        """
+        with self._refresh_lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> TimeSyncSnapshot:
+        sources, ntp_time = self._get_sync_sources()
+        previous = self._snapshot
+        if ntp_time is None and previous.ntp_time is not None:
+            # 将上一次的NTP时间外推到当前
+            ntp_time = previous.ntp_time + (time.monotonic() - previous.sync_monotonic)
+        snapshot = TimeSyncSnapshot(tuple(sources), ntp_time, time.time(), time.monotonic())
+        self._snapshot = snapshot
+        self._synced.set()
+        return snapshot
+
+    @property
+    def synced(self) -> bool:
+        """是否已完成至少一次探测"""
+        return self._synced.is_set()
+
+    def wait_for_sync(self, timeout: Optional[float] = None) -> bool:
+        """等待首次探测完成
+        
+        Args:
+            timeout: 最长等待时间（秒），为None时一直等待
+            
+        Returns:
+            bool: 是否已完成探测
+        """
+        return self._synced.wait(timeout)
+
+    def _next_refresh_delay(self) -> float:
+        jitter = self.refresh_interval * self.refresh_jitter
+        return max(0.0, self.refresh_interval + random.uniform(-jitter, jitter))
+
+    def _refresh_loop(self):
+        if not self._synced.is_set():
+            self.refresh()
+        while not self._stop_event.wait(self._next_refresh_delay()):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"时间同步刷新失败: {e}")
+
+    def start_background_refresh(self):
+        """启动后台刷新线程"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, name="time-sync-refresh", daemon=True
+        )
+        self._refresh_thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台刷新线程"""
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout)
+            self._refresh_thread = None
         
+    def _current_snapshot(self) -> TimeSyncSnapshot:
+        snapshot = self._snapshot
+        # 未开启后台刷新时，快照超过刷新间隔则在当前线程重新同步；
+        # 已有其他线程在探测时不等待，继续使用旧快照
+        if (not self.background_refresh and
+                time.monotonic() - snapshot.sync_monotonic > self.refresh_interval and
+                self._refresh_lock.acquire(blocking=False)):
+            try:
+                if self._snapshot is snapshot:
+                    snapshot = self._refresh_locked()
+                else:
+                    snapshot = self._snapshot
+            finally:
+                self._refresh_lock.release()
+        return snapshot
+
     def get_ntp_time(self) -> Optional[float]:
         """获取NTP时间
         
         Returns:
-            float: NTP时间戳，如果获取失败则返回None
+            float: 快照中的NTP时间戳，如果获取失败则返回None
         """
-        # 如果上次同步时间超过5分钟，重新同步
-        if time.time() - self.last_sync_time > 300:
-            self.sync_sources = self._get_sync_sources()
-            
-        return self.last_ntp_time
+        return self._current_snapshot().ntp_time
         
     def validate_time(self, current_time: float) -> bool:
-        """验证时间是否合理"""
-        if not self.sync_sources:
+        """验证时间是否合理
+        
+        快照中的同步源时间按单调时钟外推到当前，再与 current_time 比较。
+        """
+        snapshot = self._current_snapshot()
+        if not snapshot.sources:
             return True
+        ntp_time = snapshot.ntp_time
+
+        elapsed = time.monotonic() - snapshot.sync_monotonic
+        if self.max_staleness is not None and elapsed > self.max_staleness:
+            if self.stale_policy == self.STALE_ALLOW:
+                return True
+            if self.stale_policy == self.STALE_REJECT:
+                return False
             
-        # 获取NTP时间
-        ntp_time = self.get_ntp_time()
         if ntp_time is not None:
             # 检查与NTP时间的差异
-            time_diff = abs(current_time - ntp_time)
+            time_diff = abs(current_time - (ntp_time + elapsed))
             if time_diff > 300:  # 允许5分钟误差
                 return False
                 
         # 检查其他时间同步源
-        for source, source_time in self.sync_sources:
+        for source, source_time in snapshot.sources:
             if source != 'ntp':  # 已经检查过NTP时间
-                time_diff = abs(current_time - source_time)
+                time_diff = abs(current_time - (source_time + elapsed))
                 if time_diff > 300:  # 允许5分钟误差
                     return False
                     
@@ -108,8 +276,7 @@ class TimeSyncValidator:
         Returns:
             bool: 同步是否成功
         """
-        self.sync_sources = self._get_sync_sources()
-        return len(self.sync_sources) > 0 
+        return len(self.refresh().sources) > 0 
 
 class KubernetesHardwareValidator:
     def __init__(self):
@@ -0,0 +1,214 @@
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import TypeAdapter
+
+from license_models import License, UsageLimit, APIPermission, ServicePermission, UIPermission, ButtonPermission
+from signature_suites import DEFAULT_ALGORITHM, get_suite
+
+# 二进制许可证容器格式（所有整数为网络字节序）：
+#   magic       4字节  b"NCLB"
+#   version     1字节
+#   flags       1字节  保留，当前为0
+#   alg_len     2字节  签名算法名称长度
+#   payload_len 4字节  规范化签名内容长度
+#   sig_len     4字节  签名长度
+#   algorithm   alg_len 字节，ASCII
+#   payload     payload_len 字节，即 License.dump_for_sign() 的输出
+#   signature   sig_len 字节，原始签名
+MAGIC = b"NCLB"
+VERSION = 1
+HEADER = struct.Struct("!4sBBHII")
+CONTAINER_SUFFIX = ".lic"
+
+_FEATURES_ADAPTER = TypeAdapter(List[Union[APIPermission, ServicePermission, UIPermission, ButtonPermission]])
+_USAGE_LIMITS_ADAPTER = TypeAdapter(List[UsageLimit])
+
+def encode_container(license_obj: License) -> bytes:
+    """将已签名的许可证编码为二进制容器
+
+    Raises:
+        ValueError: 许可证未签名
+    """
+    if not license_obj.signature:
+        raise ValueError("许可证未签名")
+    algorithm = (license_obj.signature_algorithm or DEFAULT_ALGORITHM).encode("ascii")
+    payload = license_obj.dump_for_sign()
+    signature = bytes.fromhex(license_obj.signature)
+    header = HEADER.pack(MAGIC, VERSION, 0, len(algorithm), len(payload), len(signature))
+    return b"".join((header, algorithm, payload, signature))
+
+def write_container(license_obj: License, path: str) -> str:
+    """将许可证写入二进制容器文件
+
+    Returns:
+        str: 文件路径
+    """
+    data = encode_container(license_obj)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+def convert_json_to_container(json_path: str, container_path: Optional[str] = None) -> str:
+    """将 JSON 格式的许可证文件转换为二进制容器
+
+    Args:
+        json_path: JSON 许可证文件路径
+        container_path: 输出路径，默认将扩展名替换为 .lic
+
+    Returns:
+        str: 容器文件路径
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        license_obj = License.model_validate(json.load(f))
+    if container_path is None:
+        container_path = os.path.splitext(json_path)[0] + CONTAINER_SUFFIX
+    return write_container(license_obj, container_path)
+
+class LicenseContainer:
+    """二进制许可证容器
+
+    从文件打开时使用只读内存映射，payload 为映射内存上的 memoryview，
+    验签直接在其上进行，不复制也不重新序列化。许可证字段在首次访问时
+    才从 payload 解码，features 等列表在首次访问时才构造模型对象。
+    """
+
+    def __init__(self, buffer: Union[bytes, bytearray, memoryview, mmap.mmap], _file=None):
+        """
+        Args:
+            buffer: 容器字节
+
+        Raises:
+            ValueError: 格式错误
+        """
+        self._mmap = buffer if isinstance(buffer, mmap.mmap) else None
+        self._file = _file
+        view = memoryview(buffer)
+        if len(view) < HEADER.size:
+            raise ValueError("许可证容器长度不足")
+        magic, version, _flags, alg_len, payload_len, sig_len = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("不是许可证容器文件")
+        if version != VERSION:
+            raise ValueError(f"不支持的许可证容器版本: {version}")
+        offset = HEADER.size
+        if len(view) != offset + alg_len + payload_len + sig_len:
+            raise ValueError("许可证容器长度与头部不一致")
+        self.algorithm = bytes(view[offset:offset + alg_len]).decode("ascii")
+        offset += alg_len
+        self.payload = view[offset:offset + payload_len]
+        offset += payload_len
+        self.signature = bytes(view[offset:offset + sig_len])
+        self._view = view
+        self._data: Optional[Dict[str, Any]] = None
+        self._decoded: Dict[str, Any] = {}
+
+    @classmethod
+    def open(cls, path: str) -> "LicenseContainer":
+        """以只读内存映射方式打开容器文件"""
+        f = open(path, "rb")
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return cls(mapped, _file=f)
+        except BaseException:
+            f.close()
+            raise
+
+    def close(self) -> None:
+        """释放内存映射"""
+        self.payload.release()
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self) -> "LicenseContainer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def verify(self, public_key) -> bool:
+        """直接在 payload 上验证签名
+
+        Args:
+            public_key: 公钥
+
+        Returns:
+            bool: 签名是否有效
+        """
+        try:
+            suite = get_suite(self.algorithm)
+            if not suite.supports_key(public_key):
+                return False
+            suite.verify(public_key, self.signature, self.payload)
+            return True
+        except Exception:
+            return False
+
+    def _fields(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = json.loads(bytes(self.payload))
+        return self._data
+
+    def _field(self, name: str, convert=None) -> Any:
+        if name not in self._decoded:
+            value = self._fields()[name]
+            self._decoded[name] = convert(value) if convert else value
+        return self._decoded[name]
+
+    @property
+    def license_id(self) -> str:
+        return self._field("license_id")
+
+    @property
+    def customer_id(self) -> str:
+        return self._field("customer_id")
+
+    @property
+    def not_before(self) -> datetime:
+        return self._field("not_before", datetime.fromisoformat)
+
+    @property
+    def not_after(self) -> datetime:
+        return self._field("not_after", datetime.fromisoformat)
+
+    @property
+    def metadata(self) -> Dict[str, str]:
+        return self._field("metadata")
+
+    @property
+    def features(self) -> list:
+        return self._field("features", _FEATURES_ADAPTER.validate_python)
+
+    @property
+    def usage_limits(self) -> List[UsageLimit]:
+        return self._field("usage_limits", _USAGE_LIMITS_ADAPTER.validate_python)
+
+    def to_license(self) -> License:
+        """构造完整的许可证对象
+
+        返回的许可证已冻结，且规范化签名字节直接取自容器，验签时不会重新序列化。
+        """
+        data = dict(self._fields())
+        data["signature"] = self.signature.hex()
+        data["signature_algorithm"] = self.algorithm
+        license_obj = License.model_validate(data).freeze()
+        license_obj.__pydantic_private__['_sign_cache'] = (
+            tuple(license_obj.__dict__.values()), bytes(self.payload)
+        )
+        return license_obj
+
+if __name__ == "__main__":
+    import sys
+
+    # 用法：python src/license_container.py licenses/xxx.json [...]
+    for path in sys.argv[1:]:
+        print(f"{path} -> {convert_json_to_container(path)}")
@@ -1,27 +1,48 @@
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Any, Iterable, List, NamedTuple, Optional, Tuple
+from cryptography.hazmat.primitives import serialization
 from license_models import (
     License, APIPermission, ServicePermission,
     UIPermission, ButtonPermission, FeatureType, UsageLimit
 )
+from signature_suites import get_suite, suite_for_key
 import uuid
 import os
 import json
+import time
+
+class BatchProgress(NamedTuple):
+    """批量生成进度"""
+    total_submitted: int   # 已提交的规格数
+    completed: int         # 已成功生成
+    failed: int            # 生成失败
+    skipped: int           # 根据断点记录跳过
+    elapsed: float         # 已耗时（秒）
+
+    @property
+    def throughput(self) -> float:
+        """每秒生成的许可证数"""
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
 
 class LicenseGenerator:
-    def __init__(self, private_key_path: str):
+    def __init__(self, private_key_path: str, algorithm: Optional[str] = None):
         """初始化许可证生成器
         
         Args:
             private_key_path: 私钥文件路径
+            algorithm: 签名算法（rsa-pss-sha256、ed25519、ecdsa-p256-sha256），
+                为None时根据私钥类型选择
         """
+        self.private_key_path = private_key_path
         with open(private_key_path, "rb") as key_file:
             self.private_key = serialization.load_pem_private_key(
                 key_file.read(),
                 password=None
             )
+        self.signature_suite = get_suite(algorithm) if algorithm else suite_for_key(self.private_key)
+        if not self.signature_suite.supports_key(self.private_key):
+            raise ValueError(f"私钥类型与签名算法 {self.signature_suite.name} 不匹配")
     
     def generate_license(
         self,
@@ -45,6 +66,31 @@ class LicenseGenerator:
         Returns:
             License: 生成的许可证对象
         """
+        license_obj = self._build_license(
+            customer_id, not_before, not_after, features, usage_limits, metadata
+        )
+        
+        # 签名许可证
+        self._sign_license(license_obj)
+        # 签名后不应再修改，冻结后验签可复用规范化字节
+        license_obj.freeze()
+        
+        # 保存许可证到文件
+        self._save_license(license_obj)
+        
+        return license_obj
+
+    def _build_license(
+        self,
+        customer_id: str,
+        not_before: datetime,
+        not_after: datetime,
+        features: List[Dict[str, Any]],
+        usage_limits: List[Dict[str, Any]],
+        metadata: Optional[Dict[str, Any]] = None,
+        license_id: Optional[str] = None
+    ) -> License:
+        """根据参数构造未签名的许可证对象，license_id 为None时随机生成"""
         # 创建功能特性对象
         feature_objects = []
         for feature in features:
@@ -98,7 +144,7 @@ class LicenseGenerator:
         
         # 创建许可证对象
         license_obj = License(
-            license_id=str(uuid.uuid4()),
+            license_id=license_id or str(uuid.uuid4()),
             customer_id=customer_id,
             not_before=not_before,
             not_after=not_after,
@@ -106,14 +152,128 @@ class LicenseGenerator:
             usage_limits=usage_limit_objects,
             metadata=metadata or {}
         )
+        return license_obj
+
+    def generate_many(
+        self,
+        specs: Iterable[Dict[str, Any]],
+        output_dir: str = "licenses",
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        journal_path: Optional[str] = None,
+        on_result: Optional[Callable[[str, str, str], None]] = None,
+        on_error: Optional[Callable[[Dict[str, Any], BaseException], None]] = None,
+        on_progress: Optional[Callable[[BatchProgress], None]] = None,
+        progress_interval: float = 1.0
+    ) -> BatchProgress:
+        """使用进程池批量生成许可证
         
-        # 签名许可证
-        self._sign_license(license_obj)
-        
-        # 保存许可证到文件
-        self._save_license(license_obj)
+        每个规格在工作进程中完成构造、签名和写文件，主进程只接收文件名，
+        并按提交窗口从 specs 中惰性读取，内存占用与规格总数无关。
         
-        return license_obj
+        Args:
+            specs: 许可证规格，每项包含 generate_license 的同名参数，可选的
+                spec_id 用于断点续传（默认为 customer_id，同一客户有多个规格时须指定）
+            output_dir: 许可证输出目录
+            max_workers: 工作进程数，默认为CPU核数
+            max_pending: 同时在途的规格数上限，默认为 max_workers 的4倍
+            journal_path: 断点记录文件（JSON Lines）。已记录的 spec_id 会被跳过，
+                失败的规格不记录，重新运行即可重试。许可证ID由记录中的批次ID与
+                spec_id 确定，写完文件而未及记录时重新运行会覆盖同一文件
+            on_result: 单个许可证生成成功时回调 (spec_id, license_id, filename)
+            on_error: 单个规格失败时回调 (spec, exception)；缺少 customer_id 等必填
+                字段的规格同样计入失败。断点记录中无法解析的行以
+                ({"journal_line": 该行内容}, exception) 回调
+            on_progress: 进度回调，最多每 progress_interval 秒一次，结束时必定回调一次
+            progress_interval: 进度回调间隔（秒）
+            
+        Returns:
+            BatchProgress: 最终统计
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        max_workers = max_workers or os.cpu_count() or 1
+        max_pending = max_pending or max_workers * 4
+
+        done_ids, batch_id = _load_journal(journal_path, on_error) if journal_path else (set(), None)
+        journal = open(journal_path, "a", encoding="utf-8") if journal_path else None
+        if journal and batch_id is None:
+            batch_id = str(uuid.uuid4())
+            journal.write(json.dumps({"batch_id": batch_id}) + "\n")
+            journal.flush()
+
+        start = time.monotonic()
+        last_report = start
+        submitted = completed = failed = skipped = 0
+
+        def progress() -> BatchProgress:
+            return BatchProgress(submitted, completed, failed, skipped, time.monotonic() - start)
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(self.private_key_path, self.signature_suite.name)
+            ) as executor:
+                pending = {}
+                spec_iter = iter(specs)
+                exhausted = False
+                while pending or not exhausted:
+                    # 补充提交窗口
+                    while not exhausted and len(pending) < max_pending:
+                        try:
+                            spec = next(spec_iter)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                        try:
+                            spec_id = _spec_id(spec)
+                        except ValueError as e:
+                            failed += 1
+                            if on_error:
+                                on_error(spec, e)
+                            continue
+                        if spec_id in done_ids:
+                            skipped += 1
+                            continue
+                        license_id = str(uuid.uuid5(uuid.UUID(batch_id), spec_id)) if batch_id else None
+                        future = executor.submit(_generate_in_worker, spec, output_dir, license_id)
+                        pending[future] = (spec_id, spec)
+                        submitted += 1
+                    if not pending:
+                        continue
+
+                    finished, _ = wait(pending, timeout=progress_interval, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        spec_id, spec = pending.pop(future)
+                        try:
+                            license_id, filename = future.result()
+                        except Exception as e:
+                            failed += 1
+                            if on_error:
+                                on_error(spec, e)
+                            continue
+                        completed += 1
+                        done_ids.add(spec_id)
+                        if journal:
+                            journal.write(json.dumps({
+                                "spec_id": spec_id, "license_id": license_id, "file": filename
+                            }) + "\n")
+                            journal.flush()
+                        if on_result:
+                            on_result(spec_id, license_id, filename)
+
+                    now = time.monotonic()
+                    if on_progress and now - last_report >= progress_interval:
+                        last_report = now
+                        on_progress(progress())
+        finally:
+            if journal:
+                journal.close()
+
+        result = progress()
+        if on_progress:
+            on_progress(result)
+        return result
     
     def _sign_license(self, license_obj: License) -> None:
         """签名许可证
@@ -125,16 +285,10 @@ class LicenseGenerator:
         license_bytes = license_obj.dump_for_sign()
 
         # 使用私钥签名
-        signature = self.private_key.sign(
-            license_bytes,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
+        signature = self.signature_suite.sign(self.private_key, license_bytes)
         # 设置签名
         license_obj.signature = signature.hex()
+        license_obj.signature_algorithm = self.signature_suite.name
 
     def _save_license(self, license_obj: License) -> None:
         """保存许可证到文件
@@ -142,11 +296,24 @@ class LicenseGenerator:
         Args:
             license_obj: 许可证对象
         """
+        filename = self._write_license_file(license_obj)
+        print(f"许可证已保存到: {filename}")
+
+    def _write_license_file(self, license_obj: License, output_dir: str = "licenses") -> str:
+        """将许可证写入输出目录
+        
+        Args:
+            license_obj: 许可证对象
+            output_dir: 输出目录
+            
+        Returns:
+            str: 文件路径
+        """
         # 创建 licenses 目录（如果不存在）
-        os.makedirs("licenses", exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
         
         # 生成文件名：customer_id_license_id.json
-        filename = f"licenses/{license_obj.customer_id}_{license_obj.license_id}.json"
+        filename = f"{output_dir}/{license_obj.customer_id}_{license_obj.license_id}.json"
         
         # 将许可证对象转换为字典
         license_dict = license_obj.model_dump()
@@ -158,8 +325,86 @@ class LicenseGenerator:
                     return obj.isoformat()
                 return super().default(obj)
         
-        # 保存为 JSON 文件
-        with open(filename, "w", encoding="utf-8") as f:
+        # 保存为 JSON 文件，先写临时文件再原子替换，重新生成时不会留下写了一半的文件
+        tmp_path = f"{filename}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(license_dict, f, ensure_ascii=False, indent=2, cls=DateTimeEncoder)
-        
-        print(f"许可证已保存到: {filename}")
+        os.replace(tmp_path, filename)
+
+        return filename
+
+# 工作进程内的生成器实例，由 _init_worker 创建
+_worker_generator: Optional[LicenseGenerator] = None
+
+_REQUIRED_SPEC_FIELDS = ("customer_id", "not_before", "not_after")
+
+def _spec_id(spec: Dict[str, Any]) -> str:
+    """校验规格的必填字段并返回 spec_id
+
+    Raises:
+        ValueError: 规格不是字典或缺少必填字段
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"许可证规格必须为字典: {type(spec).__name__}")
+    missing = [name for name in _REQUIRED_SPEC_FIELDS if name not in spec]
+    if missing:
+        raise ValueError(f"许可证规格缺少字段: {', '.join(missing)}")
+    return str(spec.get("spec_id", spec["customer_id"]))
+
+def _load_journal(
+    journal_path: str,
+    on_error: Optional[Callable[[Dict[str, Any], BaseException], None]] = None
+) -> Tuple[set, Optional[str]]:
+    """读取断点记录中已完成的 spec_id 与批次ID
+
+    进程在写入记录时退出会留下不完整的最后一行，读取时将其截掉，之后的
+    记录从新的一行开始追加。中间无法解析的行跳过（对应的规格会重新生成）。
+    截掉和跳过的行通过 on_error 报告。
+
+    Returns:
+        Tuple[set, Optional[str]]: (已完成的 spec_id, 批次ID)，没有批次记录时批次ID为None
+    """
+    done_ids = set()
+    batch_id = None
+    if not os.path.exists(journal_path):
+        return done_ids, batch_id
+    with open(journal_path, "rb+") as f:
+        offset = 0
+        for line in f:
+            try:
+                record = json.loads(line)
+                if "batch_id" in record:
+                    batch_id = batch_id or str(uuid.UUID(record["batch_id"]))
+                else:
+                    done_ids.add(record["spec_id"])
+            except (ValueError, KeyError, TypeError) as e:
+                if line.strip() and on_error:
+                    on_error({"journal_line": line.decode("utf-8", "replace")}, e)
+                if not line.endswith(b"\n"):
+                    f.truncate(offset)
+                    break
+            else:
+                if not line.endswith(b"\n"):
+                    # 记录完整但缺少换行符
+                    f.write(b"\n")
+            offset += len(line)
+    return done_ids, batch_id
+
+def _init_worker(private_key_path: str, algorithm: str) -> None:
+    global _worker_generator
+    _worker_generator = LicenseGenerator(private_key_path, algorithm)
+
+def _generate_in_worker(spec: Dict[str, Any], output_dir: str, license_id: Optional[str] = None):
+    """在工作进程中生成并保存单个许可证，返回 (license_id, filename)"""
+    license_obj = _worker_generator._build_license(
+        customer_id=spec["customer_id"],
+        not_before=spec["not_before"],
+        not_after=spec["not_after"],
+        features=spec.get("features", []),
+        usage_limits=spec.get("usage_limits", []),
+        metadata=spec.get("metadata"),
+        license_id=license_id
+    )
+    _worker_generator._sign_license(license_obj)
+    filename = _worker_generator._write_license_file(license_obj, output_dir)
+    return license_obj.license_id, filename
@@ -1,8 +1,18 @@
 from datetime import datetime
-from typing import Dict, List, Optional, Union
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple, Union
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 import json
+import codecs
+from json.encoder import encode_basestring_ascii
+
+try:
+    import orjson  # 可选，存在时用于加速规范化序列化
+except ImportError:
+    orjson = None
+
+from route_matcher import RouteMatcher, is_path_template
 
 class FeatureType(str, Enum):
     """功能类型枚举"""
@@ -11,7 +21,66 @@ class FeatureType(str, Enum):
     UI = "ui"            # UI组件级别
     BUTTON = "button"    # 按钮级别
 
-class FeaturePermission(BaseModel):
+class _FrozenList(list):
+    """冻结后的列表，拒绝原地修改"""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("许可证已冻结，不能原地修改")
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _readonly
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+
+    def __reduce_ex__(self, protocol):
+        # copy/pickle 默认逐项 append 重建，改为整体构造
+        return (type(self), (list(self),))
+
+class _FrozenDict(dict):
+    """冻结后的字典，拒绝原地修改"""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("许可证已冻结，不能原地修改")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce_ex__(self, protocol):
+        return (type(self), (dict(self),))
+
+def _freeze_value(value: Any) -> Any:
+    if isinstance(value, _FreezableModel):
+        value._freeze()
+        return value
+    if isinstance(value, list) and not isinstance(value, _FrozenList):
+        return _FrozenList(_freeze_value(item) for item in value)
+    if isinstance(value, dict) and not isinstance(value, _FrozenDict):
+        return _FrozenDict({key: _freeze_value(item) for key, item in value.items()})
+    return value
+
+class _FreezableModel(BaseModel):
+    """可冻结的模型：冻结后字段赋值抛出 TypeError，列表、字典与子模型一并冻结"""
+
+    _frozen: bool = PrivateAttr(default=False)
+
+    def _freeze(self) -> None:
+        private = self.__pydantic_private__
+        if private['_frozen']:
+            return
+        fields = self.__dict__
+        for name, value in fields.items():
+            fields[name] = _freeze_value(value)
+        private['_frozen'] = True
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        private = getattr(self, '__pydantic_private__', None)
+        if private and private.get('_frozen') and not name.startswith('_'):
+            raise TypeError(f"许可证已冻结，不能修改字段: {name}")
+        super().__setattr__(name, value)
+
+class FeaturePermission(_FreezableModel):
     """功能权限模型"""
     feature_id: str
     feature_name: str
@@ -20,11 +89,20 @@ class FeaturePermission(BaseModel):
     metadata: Dict[str, str] = Field(default_factory=dict)
 
 class APIPermission(FeaturePermission):
-    """API权限模型"""
+    """API权限模型
+
+    path 支持路径模板：{name} 匹配单个路径段，末尾的 * 匹配其后任意层级，
+    例如 /api/v1/users/{id}/orders、/api/v1/files/*。
+    """
     method: str  # HTTP方法
     path: str    # API路径
     rate_limit: Optional[int] = None  # 速率限制
 
+    @property
+    def is_template(self) -> bool:
+        """路径是否为模板（含路径参数或通配符）"""
+        return is_path_template(self.path)
+
 class ServicePermission(FeaturePermission):
     """微服务权限模型"""
     service_name: str
@@ -43,13 +121,75 @@ class ButtonPermission(FeaturePermission):
     action_type: str
     enabled: bool = True
 
-class UsageLimit(BaseModel):
+class UsageLimit(_FreezableModel):
     """使用限制模型"""
     metric_type: str  # 如 "nodes", "users", "api_calls"
     max_value: int
     current_value: int = 0
 
-class License(BaseModel):
+def _enum_value(value):
+    """取枚举值，使 FeatureType 与其字符串形式可互换地作为字典键"""
+    return value.value if isinstance(value, Enum) else value
+
+class PermissionIndex:
+    """许可证权限索引
+
+    由许可证功能列表一次性编译得到的只读查找表，使各类权限检查
+    从线性扫描变为字典查找。同一键出现多次时保留第一条，与线性
+    扫描的匹配顺序一致。
+    """
+
+    __slots__ = ('features', 'apis', 'api_features', 'api_routes', 'services', 'ui_components',
+                 'buttons', 'usage_limits', 'source')
+
+    def __init__(self, features: List[FeaturePermission], usage_limits: List[UsageLimit]):
+        """编译权限索引
+
+        Args:
+            features: 功能权限列表
+            usage_limits: 使用限制列表
+        """
+        features_map = {}
+        apis = {}
+        api_features = {}
+        api_routes = RouteMatcher()
+        services = {}
+        ui_components = {}
+        buttons = {}
+        for feature in features:
+            features_map.setdefault(
+                (feature.feature_id, _enum_value(feature.feature_type)), feature.enabled
+            )
+            if isinstance(feature, APIPermission):
+                if feature.is_template:
+                    api_routes.insert(feature.method, feature.path, feature)
+                else:
+                    apis.setdefault((feature.method, feature.path), feature.enabled)
+                    api_features.setdefault((feature.method, feature.path), feature)
+            elif isinstance(feature, ServicePermission):
+                for endpoint in feature.endpoints:
+                    services.setdefault((feature.service_name, endpoint), feature.enabled)
+            elif isinstance(feature, UIPermission):
+                ui_components.setdefault(feature.component_id, feature.visibility)
+            elif isinstance(feature, ButtonPermission):
+                buttons.setdefault(feature.button_id, feature.enabled)
+
+        limits = {}
+        for limit in usage_limits:
+            limits.setdefault(limit.metric_type, (limit.current_value, limit.max_value))
+
+        self.features = MappingProxyType(features_map)
+        self.apis = MappingProxyType(apis)
+        self.api_features = MappingProxyType(api_features)
+        self.api_routes = api_routes
+        self.services = MappingProxyType(services)
+        self.ui_components = MappingProxyType(ui_components)
+        self.buttons = MappingProxyType(buttons)
+        self.usage_limits = MappingProxyType(limits)
+        # 编译时引用的原始列表，用于发现整体替换（如 model_copy(update=...)）
+        self.source = (features, usage_limits)
+
+class License(_FreezableModel):
     """许可证主模型"""
     license_id: str
     customer_id: str
@@ -59,74 +199,223 @@ class License(BaseModel):
     usage_limits: List[UsageLimit] = Field(default_factory=list)
     metadata: Dict[str, str] = Field(default_factory=dict)
     signature: Optional[str] = None
+    signature_algorithm: Optional[str] = None  # 签名算法，为空时为 rsa-pss-sha256，不参与签名
+
+    _permission_index: Optional[PermissionIndex] = PrivateAttr(default=None)
+    _sign_cache: Optional[Tuple[tuple, bytes]] = PrivateAttr(default=None)
+
+    @property
+    def permission_index(self) -> PermissionIndex:
+        """权限索引
+
+        已冻结的许可证首次访问时编译并缓存。未冻结的许可证可能被原地修改
+        （features.append、feature.enabled = False 等），每次访问都重新编译，
+        其 check_* 方法不经过索引，直接线性扫描。
+        """
+        index = self._cached_index()
+        if index is None:
+            return PermissionIndex(self.features, self.usage_limits)
+        return index
+
+    def _cached_index(self) -> Optional[PermissionIndex]:
+        """已冻结许可证的缓存索引，未冻结时返回None"""
+        # 直接读取字段与私有属性字典，绕过 pydantic 的 __getattr__，这是每次检查的热路径
+        private = self.__pydantic_private__
+        if not private['_frozen']:
+            return None
+        fields = self.__dict__
+        index = private['_permission_index']
+        if (index is None or index.source[0] is not fields['features']
+                or index.source[1] is not fields['usage_limits']):
+            index = PermissionIndex(fields['features'], fields['usage_limits'])
+            private['_permission_index'] = index
+        return index
+
+    def invalidate_index(self) -> None:
+        """丢弃缓存的权限索引，下次检查时重新编译"""
+        self._permission_index = None
 
     def is_valid(self) -> bool:
         """检查许可证是否在有效期内"""
         now = datetime.utcnow()
         return self.not_before <= now <= self.not_after
 
+    # 以下检查对已冻结的许可证查索引，对未冻结的许可证线性扫描，匹配规则相同：
+    # 同一键出现多次时以第一条为准
+
     def check_feature(self, feature_id: str, feature_type: FeatureType) -> bool:
         """检查特定功能是否可用"""
+        index = self._cached_index()
+        if index is not None:
+            return index.features.get((feature_id, _enum_value(feature_type)), False)
+        feature_type = _enum_value(feature_type)
         for feature in self.features:
-            if feature.feature_id == feature_id and feature.feature_type == feature_type:
+            if feature.feature_id == feature_id and _enum_value(feature.feature_type) == feature_type:
                 return feature.enabled
         return False
 
     def check_api_permission(self, method: str, path: str) -> bool:
-        """检查API权限"""
+        """检查API权限
+
+        精确路径优先，其次按路径模板匹配（静态段 > 路径参数 > 前缀通配）。
+        """
+        index = self._cached_index()
+        if index is None:
+            feature = self._scan_api_permission(method, path)
+            return feature.enabled if feature is not None else False
+        enabled = index.apis.get((method, path))
+        if enabled is not None:
+            return enabled
+        if not index.api_routes:
+            return False
+        feature = index.api_routes.match(method, path)
+        return feature.enabled if feature is not None else False
+
+    def find_api_permission(self, method: str, path: str) -> Optional[APIPermission]:
+        """查找匹配请求的API权限，匹配规则与 check_api_permission 相同"""
+        index = self._cached_index()
+        if index is None:
+            return self._scan_api_permission(method, path)
+        feature = index.api_features.get((method, path))
+        if feature is not None or not index.api_routes:
+            return feature
+        return index.api_routes.match(method, path)
+
+    def _scan_api_permission(self, method: str, path: str) -> Optional[APIPermission]:
+        templates = None
         for feature in self.features:
-            if (isinstance(feature, APIPermission) and 
-                feature.method == method and 
-                feature.path == path):
-                return feature.enabled
-        return False
+            if not isinstance(feature, APIPermission):
+                continue
+            if feature.is_template:
+                if templates is None:
+                    templates = RouteMatcher()
+                templates.insert(feature.method, feature.path, feature)
+            elif feature.method == method and feature.path == path:
+                return feature
+        return templates.match(method, path) if templates is not None else None
 
     def check_service_permission(self, service_name: str, endpoint: str) -> bool:
         """检查微服务权限"""
+        index = self._cached_index()
+        if index is not None:
+            return index.services.get((service_name, endpoint), False)
         for feature in self.features:
-            if (isinstance(feature, ServicePermission) and 
-                feature.service_name == service_name and 
-                endpoint in feature.endpoints):
+            if (isinstance(feature, ServicePermission) and
+                    feature.service_name == service_name and
+                    endpoint in feature.endpoints):
                 return feature.enabled
         return False
 
     def check_ui_permission(self, component_id: str) -> bool:
         """检查UI组件权限"""
+        index = self._cached_index()
+        if index is not None:
+            return index.ui_components.get(component_id, False)
         for feature in self.features:
-            if (isinstance(feature, UIPermission) and 
-                feature.component_id == component_id):
+            if isinstance(feature, UIPermission) and feature.component_id == component_id:
                 return feature.visibility
         return False
 
     def check_button_permission(self, button_id: str) -> bool:
         """检查按钮权限"""
+        index = self._cached_index()
+        if index is not None:
+            return index.buttons.get(button_id, False)
         for feature in self.features:
-            if (isinstance(feature, ButtonPermission) and 
-                feature.button_id == button_id):
+            if isinstance(feature, ButtonPermission) and feature.button_id == button_id:
                 return feature.enabled
         return False
 
-    def check_usage_limit(self, metric_type: str, value: int = 1) -> bool:
-        """检查使用限制"""
+    def usage_limit(self, metric_type: str) -> Optional[Tuple[int, int]]:
+        """使用限制的 (当前值, 上限)，未设置时返回None"""
+        index = self._cached_index()
+        if index is not None:
+            return index.usage_limits.get(metric_type)
         for limit in self.usage_limits:
             if limit.metric_type == metric_type:
-                return limit.current_value + value <= limit.max_value
-        return True
-
-    def dump_for_sign(self):
-        data = self.model_dump(exclude={"signature"})
-        for k in ["not_before", "not_after"]:
-            v = data.get(k)
-            if isinstance(v, datetime):
-                data[k] = v.replace(microsecond=0).isoformat()
-        # 递归处理 features
-        def feature_to_dict(f):
-            if hasattr(f, 'model_dump'):
-                return f.model_dump()
-            elif isinstance(f, dict):
-                return f
-            else:
-                return dict(f)
-        data["features"] = [feature_to_dict(f) for f in self.features]
-        data["usage_limits"] = [l.model_dump() if hasattr(l, 'model_dump') else l for l in self.usage_limits]
-        return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8") 
\ No newline at end of file
+                return limit.current_value, limit.max_value
+        return None
+
+    def check_usage_limit(self, metric_type: str, value: int = 1) -> bool:
+        """检查使用限制"""
+        limit = self.usage_limit(metric_type)
+        if limit is None:
+            return True
+        current_value, max_value = limit
+        return current_value + value <= max_value
+
+    def freeze(self) -> "License":
+        """冻结许可证，之后不能再修改字段
+
+        features、usage_limits、metadata 等列表和字典替换为只读副本，其中的
+        功能权限与使用限制对象一并冻结，原地修改会抛出 TypeError。冻结后
+        dump_for_sign 的结果会被缓存，重复验签不再重新序列化。功能权限对象
+        被多个许可证共用时，冻结其中一个许可证也会冻结这些对象。
+
+        Returns:
+            License: 许可证对象本身
+        """
+        self._freeze()
+        return self
+
+    @property
+    def frozen(self) -> bool:
+        """是否已冻结"""
+        return self.__pydantic_private__['_frozen']
+
+    def dump_for_sign(self) -> bytes:
+        """生成签名所用的规范化字节
+
+        已冻结的许可证会缓存结果。model_copy(update=...) 等绕过赋值的修改
+        会替换字段对象，缓存按字段对象身份校验，此时会重新序列化。
+        """
+        private = self.__pydantic_private__
+        if not private['_frozen']:
+            return _canonical_license_bytes(self)
+        source = tuple(self.__dict__.values())
+        cached = private['_sign_cache']
+        if (cached is not None and len(cached[0]) == len(source) and
+                all(a is b for a, b in zip(cached[0], source))):
+            return cached[1]
+        data = _canonical_license_bytes(self)
+        private['_sign_cache'] = (source, data)
+        return data
+
+# 不参与签名的字段
+_UNSIGNED_FIELDS = frozenset({"signature", "signature_algorithm"})
+
+def _json_escape_errors(error: UnicodeEncodeError):
+    """编码错误处理器：将无法编码为ASCII的字符按 json.dumps(ensure_ascii=True) 的规则转义"""
+    # 由 json 模块的C实现转义，非BMP字符同样输出为UTF-16代理对
+    return encode_basestring_ascii(error.object[error.start:error.end])[1:-1], error.end
+
+codecs.register_error("license_json_escape", _json_escape_errors)
+
+def _canonical_license_bytes(license_obj: "License") -> bytes:
+    """生成许可证的规范化签名字节
+
+    只调用一次 model_dump，再序列化一次。输出与旧实现（model_dump 后逐项
+    重新 dump features/usage_limits，再 json.dumps(sort_keys=True, default=str)）
+    逐字节一致：生效/过期时间去掉微秒后取 isoformat，非ASCII字符转义为 \\uXXXX。
+    安装了 orjson 时使用 orjson 序列化并按 json 模块的规则转义。
+    """
+    data = license_obj.model_dump(exclude=_UNSIGNED_FIELDS)
+    for key in ("not_before", "not_after"):
+        value = data.get(key)
+        if isinstance(value, datetime):
+            data[key] = value.replace(microsecond=0).isoformat()
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(
+                data, default=str,
+                option=orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except TypeError:
+            # 超出64位的整数等 orjson 不支持的值
+            encoded = None
+        if encoded is not None:
+            if not encoded.isascii():
+                encoded = encoded.decode("utf-8").encode("ascii", "license_json_escape")
+            # DEL 是ASCII字符，但 json 模块同样会转义
+            return encoded.replace(b"\x7f", b"\\u007f")
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
@@ -0,0 +1,226 @@
+import os
+import json
+import threading
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from cryptography.hazmat.primitives.serialization import load_pem_public_key
+
+from license_models import License
+from license_container import CONTAINER_SUFFIX, LicenseContainer
+from secure_time_storage import _stat_signature
+from signature_suites import get_suite
+
+LICENSE_SUFFIXES = (".json", CONTAINER_SUFFIX)
+
+class StoreEntry(NamedTuple):
+    """已加载的许可证文件"""
+    license: License
+    path: str
+    stat: tuple    # 文件状态签名，未变化的文件在重新扫描时直接复用
+
+class StoreSnapshot:
+    """许可证目录的不可变快照
+
+    所有索引在构造时建立，之后只读；重新扫描时整体替换，读者拿到的
+    快照在其生命周期内不会变化。
+    """
+
+    __slots__ = ('by_path', 'by_id', 'by_customer', 'by_tenant', 'errors')
+
+    def __init__(self, entries: Dict[str, StoreEntry], errors: Dict[str, Tuple[tuple, str]], tenant_key: str):
+        self.by_path: Mapping[str, StoreEntry] = MappingProxyType(entries)
+        self.errors: Mapping[str, Tuple[tuple, str]] = MappingProxyType(errors)
+
+        by_id: Dict[str, StoreEntry] = {}
+        for entry in entries.values():
+            # 同一许可证同时存在 .json 与 .lic 时取较新的文件
+            existing = by_id.get(entry.license.license_id)
+            if existing is None or entry.stat[3] > existing.stat[3]:
+                by_id[entry.license.license_id] = entry
+
+        by_customer: Dict[str, List[License]] = {}
+        by_tenant: Dict[str, List[License]] = {}
+        for entry in by_id.values():
+            license_obj = entry.license
+            by_customer.setdefault(license_obj.customer_id, []).append(license_obj)
+            tenant_id = license_obj.metadata.get(tenant_key)
+            if tenant_id is not None:
+                by_tenant.setdefault(tenant_id, []).append(license_obj)
+
+        self.by_id: Mapping[str, License] = MappingProxyType({k: v.license for k, v in by_id.items()})
+        # 同一客户/租户的多个许可证按过期时间降序排列，第一个即有效期最长的
+        self.by_customer: Mapping[str, Tuple[License, ...]] = MappingProxyType({
+            k: tuple(sorted(v, key=lambda l: l.not_after, reverse=True)) for k, v in by_customer.items()
+        })
+        self.by_tenant: Mapping[str, Tuple[License, ...]] = MappingProxyType({
+            k: tuple(sorted(v, key=lambda l: l.not_after, reverse=True)) for k, v in by_tenant.items()
+        })
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+class LicenseStore:
+    """许可证目录索引
+
+    扫描 licenses/ 目录下的 .json 和 .lic 文件，按许可证ID、客户ID和租户ID
+    建立索引。重新扫描时按文件状态签名只重新加载和验签发生变化的文件，
+    构造新快照后整体替换，查询只读取当前快照，不加锁。
+
+    变更检测采用 mtime 轮询，不依赖 inotify 等平台相关机制。
+    """
+
+    def __init__(
+        self,
+        directory: str = "licenses",
+        public_key_path: Optional[str] = None,
+        tenant_key: str = "tenant_id",
+        poll_interval: float = 0.0,
+        on_reload: Optional[Callable[["StoreSnapshot"], None]] = None
+    ):
+        """初始化许可证目录索引
+
+        Args:
+            directory: 许可证目录
+            public_key_path: 公钥文件路径。提供时只收录签名有效的许可证，
+                验签失败的文件记录在快照的 errors 中
+            tenant_key: metadata 中表示租户ID的键
+            poll_interval: 后台轮询间隔（秒），0表示不启动后台线程，需手动调用 reload()
+            on_reload: 快照替换后的回调，在执行重新扫描的线程中调用
+        """
+        self.directory = directory
+        self.public_key = None
+        if public_key_path:
+            with open(public_key_path, "rb") as f:
+                self.public_key = load_pem_public_key(f.read())
+        self.tenant_key = tenant_key
+        self.poll_interval = poll_interval
+        self.on_reload = on_reload
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._poll_thread: Optional[threading.Thread] = None
+        self._snapshot = StoreSnapshot({}, {}, tenant_key)
+        self.reload()
+        if poll_interval > 0:
+            self.start_polling()
+
+    @property
+    def snapshot(self) -> StoreSnapshot:
+        """当前快照"""
+        return self._snapshot
+
+    def get(self, license_id: str) -> Optional[License]:
+        """按许可证ID查询"""
+        return self._snapshot.by_id.get(license_id)
+
+    def find_by_customer(self, customer_id: str) -> Tuple[License, ...]:
+        """查询客户的全部许可证，按过期时间降序"""
+        return self._snapshot.by_customer.get(customer_id, ())
+
+    def find_by_tenant(self, tenant_id: str) -> Tuple[License, ...]:
+        """查询租户的全部许可证，按过期时间降序"""
+        return self._snapshot.by_tenant.get(tenant_id, ())
+
+    def get_for_customer(self, customer_id: str) -> Optional[License]:
+        """获取客户过期时间最晚的许可证"""
+        licenses = self._snapshot.by_customer.get(customer_id)
+        return licenses[0] if licenses else None
+
+    def get_for_tenant(self, tenant_id: str) -> Optional[License]:
+        """获取租户过期时间最晚的许可证"""
+        licenses = self._snapshot.by_tenant.get(tenant_id)
+        return licenses[0] if licenses else None
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def _load_file(self, path: str) -> License:
+        """加载并验签单个许可证文件，返回冻结的许可证对象
+
+        Raises:
+            ValueError: 签名无效
+        """
+        if path.endswith(CONTAINER_SUFFIX):
+            with LicenseContainer.open(path) as container:
+                if self.public_key is not None and not container.verify(self.public_key):
+                    raise ValueError("签名无效")
+                return container.to_license()
+
+        with open(path, "r", encoding="utf-8") as f:
+            license_obj = License.model_validate(json.load(f)).freeze()
+        if self.public_key is not None:
+            suite = get_suite(license_obj.signature_algorithm)
+            if not license_obj.signature or not suite.supports_key(self.public_key):
+                raise ValueError("签名无效")
+            suite.verify(self.public_key, bytes.fromhex(license_obj.signature), license_obj.dump_for_sign())
+        return license_obj
+
+    def reload(self) -> bool:
+        """重新扫描目录
+
+        状态签名未变化的文件直接复用上一快照中的结果（包括加载失败的记录），
+        其余文件重新加载和验签。
+
+        Returns:
+            bool: 快照是否发生变化
+        """
+        with self._reload_lock:
+            previous = self._snapshot
+            entries: Dict[str, StoreEntry] = {}
+            errors: Dict[str, Tuple[tuple, str]] = {}
+            changed = False
+            try:
+                scan = list(os.scandir(self.directory))
+            except FileNotFoundError:
+                scan = []
+            for dir_entry in scan:
+                if not dir_entry.name.endswith(LICENSE_SUFFIXES) or not dir_entry.is_file():
+                    continue
+                path = dir_entry.path
+                stat = _stat_signature(dir_entry.stat())
+                old = previous.by_path.get(path)
+                if old is not None and old.stat == stat:
+                    entries[path] = old
+                    continue
+                old_error = previous.errors.get(path)
+                if old_error is not None and old_error[0] == stat:
+                    errors[path] = old_error
+                    continue
+                changed = True
+                try:
+                    entries[path] = StoreEntry(self._load_file(path), path, stat)
+                except Exception as e:
+                    # 写了一半的文件会在下次扫描时因状态签名变化而重试
+                    errors[path] = (stat, str(e) or type(e).__name__)
+
+            if not changed and len(entries) + len(errors) == len(previous.by_path) + len(previous.errors):
+                return False
+            self._snapshot = StoreSnapshot(entries, errors, self.tenant_key)
+
+        if self.on_reload:
+            self.on_reload(self._snapshot)
+        return True
+
+    def _poll_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"许可证目录扫描失败: {e}")
+
+    def start_polling(self):
+        """启动后台轮询线程"""
+        if self._poll_thread is not None and self._poll_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._poll_thread = threading.Thread(
+            target=self._poll_loop, name="license-store-poll", daemon=True
+        )
+        self._poll_thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台轮询线程"""
+        self._stop_event.set()
+        if self._poll_thread is not None:
+            self._poll_thread.join(timeout)
+            self._poll_thread = None
@@ -1,32 +1,415 @@
 import json
-from typing import Optional
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
 from datetime import datetime
 import time
 
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from cryptography.hazmat.primitives.serialization import load_pem_public_key
 
 from license_models import License, FeatureType
+from license_container import LicenseContainer
 from hardware_validator import BootTimeValidator, TimeSyncValidator
 from secure_time_storage import SecureTimeStorage
+from signature_suites import SIGNATURE_SUITES, DEFAULT_ALGORITHM
+from usage_meter import UsageMeter
+from rate_limiter import RateDecision, RateLimiter
+from validation_metrics import ValidationHook
+from validation_result import (
+    ValidationReason, ValidationResult, STORAGE_REASONS, STAGE_READY, STAGE_BOOT_TIME,
+    STAGE_TIME_SYNC, STAGE_STORAGE, STAGE_VALIDITY, STAGE_SIGNATURE, STAGE_UPDATE_TIMESTAMPS,
+    ENVIRONMENT_STAGES,
+)
+
+# 持有验证租约时的验证结果
+_LEASED = ValidationResult(True, ValidationReason.OK, None, {})
+
+# check_many 查询类型 -> License 上对应的检查方法
+PERMISSION_QUERIES = {
+    'feature': License.check_feature,
+    'api': License.check_api_permission,
+    'service': License.check_service_permission,
+    'ui': License.check_ui_permission,
+    'button': License.check_button_permission,
+    'usage': License.check_usage_limit,
+}
+
+def compile_permission_queries(queries: Sequence[Tuple]) -> List[Tuple[Callable, tuple]]:
+    """将 check_many 查询解析为 (检查方法, 参数) 列表
+    
+    Raises:
+        ValueError: 查询类型未知
+    """
+    checks = []
+    for query in queries:
+        kind = getattr(query[0], 'value', query[0])
+        check = PERMISSION_QUERIES.get(kind)
+        if check is None:
+            raise ValueError(f"未知的权限查询类型: {query[0]}")
+        checks.append((check, tuple(query[1:])))
+    return checks
+
+class SignatureCache:
+    """已验证签名缓存
+
+    以规范化签名内容与签名的摘要为键，记录验签通过的许可证，
+    使同一许可证的重复校验只需一次哈希查找。
+    """
+
+    def __init__(self, max_size: int = 1024):
+        """初始化签名缓存
+
+        Args:
+            max_size: 最大缓存条目数，超出时淘汰最久未使用的条目
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(license_bytes: Union[bytes, memoryview], signature: str, algorithm: str = DEFAULT_ALGORITHM) -> bytes:
+        """计算缓存键
+
+        Args:
+            license_bytes: 许可证规范化签名内容
+            signature: 十六进制签名
+            algorithm: 签名算法
+
+        Returns:
+            bytes: SHA256摘要
+        """
+        digest = hashlib.sha256(license_bytes)
+        digest.update(b"\x00")
+        digest.update(signature.encode("ascii", "replace"))
+        digest.update(b"\x00")
+        digest.update(algorithm.encode("ascii", "replace"))
+        return digest.digest()
+
+    def contains(self, key: bytes) -> bool:
+        """查询键是否已验证，并更新命中统计
+
+        查询不加锁，OrderedDict 的单个操作在 GIL 下是原子的；命中统计在并发
+        时可能少计。
+        """
+        entries = self._entries
+        if key in entries:
+            try:
+                entries.move_to_end(key)
+            except KeyError:
+                # 查询与移动之间被其他线程淘汰，本次仍视为命中
+                pass
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, key: bytes, license_id: str) -> None:
+        """记录验签通过的许可证
+
+        Args:
+            key: 缓存键
+            license_id: 许可证ID，用于按许可证失效
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = license_id
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, license_id: Optional[str] = None) -> int:
+        """使缓存失效
+
+        Args:
+            license_id: 许可证ID，为None时清空全部缓存
+
+        Returns:
+            int: 被移除的条目数
+        """
+        with self._lock:
+            if license_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            keys = [k for k, v in self._entries.items() if v == license_id]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def stats(self) -> dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+class DecisionCache:
+    """权限检查结果缓存
+
+    按许可证ID分组，以 (查询类型, 查询参数...) 为键缓存 check_* 的结果。每组
+    记录写入时许可证的签名，同一许可证ID出现不同签名（许可证被更换）时整组
+    失效。分组不区分签名内容，因此验证失败的结果只在失败与许可证内容无关
+    （启动时间、时间同步、时间戳存储）时缓存，否则沿用真实许可证ID与签名的
+    篡改对象会使真实许可证的检查被拒绝；条目有效期取 TTL 与许可证剩余有效期中的
+    较小者，按单调时钟计时。命中时只做两次字典查找，不加锁。
+    """
+
+    def __init__(self, ttl: float = 1.0, max_size: int = 65536):
+        """初始化权限检查结果缓存
+
+        Args:
+            ttl: 条目有效期（秒）
+            max_size: 最大条目数，超出时先清理过期条目，仍超出则淘汰最早写入的许可证分组
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        # 许可证ID -> (签名, {查询: (结果, 过期时间)})
+        self._entries: Dict[str, Tuple[Optional[str], Dict[tuple, Tuple[bool, float]]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, license_id: str, signature: Optional[str], query: tuple) -> Optional[bool]:
+        """查询缓存，未命中或已过期时返回None"""
+        group = self._entries.get(license_id)
+        if group is not None and group[0] == signature:
+            entry = group[1].get(query)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+        self.misses += 1
+        return None
+
+    def put(self, license_id: str, signature: Optional[str], query: tuple, result: bool, expires_at: float) -> None:
+        """写入检查结果
+
+        Args:
+            license_id: 许可证ID
+            signature: 许可证签名
+            query: 查询
+            result: 检查结果
+            expires_at: 过期时间（time.monotonic() 时间）
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            group = self._entries.get(license_id)
+            if group is None or group[0] != signature:
+                if group is not None:
+                    self._size -= len(group[1])
+                group = self._entries[license_id] = (signature, {})
+            if query not in group[1]:
+                self._size += 1
+            group[1][query] = (result, expires_at)
+            if self._size > self.max_size:
+                self._evict_locked()
+
+    def _evict_locked(self):
+        now = time.monotonic()
+        for _, decisions in self._entries.values():
+            for query in [q for q, entry in decisions.items() if entry[1] <= now]:
+                del decisions[query]
+                self._size -= 1
+        while self._size > self.max_size and self._entries:
+            _, (_, decisions) = next(iter(self._entries.items()))
+            del self._entries[next(iter(self._entries))]
+            self._size -= len(decisions)
+
+    def invalidate(self, license_id: Optional[str] = None) -> int:
+        """使缓存失效
+
+        Args:
+            license_id: 许可证ID，为None时清空全部缓存
+
+        Returns:
+            int: 被移除的条目数
+        """
+        with self._lock:
+            if license_id is None:
+                removed = self._size
+                self._entries = {}
+                self._size = 0
+                return removed
+            group = self._entries.pop(license_id, None)
+            removed = len(group[1]) if group is not None else 0
+            self._size -= removed
+            return removed
+
+    def stats(self) -> dict:
+        """获取缓存统计信息"""
+        return {
+            'size': self._size,
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+class EnvironmentState(NamedTuple):
+    """与许可证无关的环境校验（启动时间、时间同步、时间戳存储）结果快照"""
+    failure: Optional[ValidationResult]   # 校验失败时的结果，通过时为None
+    timings: Dict[str, float]             # 刷新时各阶段的耗时（秒）
+    expires: float                        # 过期的单调时间
+    offset: float                         # 刷新时系统时间与单调时钟之差
 
 class LicenseValidator:
-    def __init__(self, public_key_path: str, secret_key: bytes):
+    def __init__(
+        self,
+        public_key_path: str,
+        secret_key: bytes,
+        signature_cache_size: int = 1024,
+        timestamp_flush_interval: float = 0.0,
+        ntp_servers: Optional[List[str]] = None,
+        background_time_sync: bool = False,
+        lazy_init: bool = False,
+        usage_meter: Optional[UsageMeter] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        decision_cache_ttl: float = 0.0,
+        decision_cache_size: int = 65536,
+        hooks: Optional[Sequence[ValidationHook]] = None,
+        validation_lease: float = 0.0,
+        lease_skew_tolerance: float = 1.0,
+        environment_refresh_interval: float = 0.0
+    ):
         """初始化许可证验证器
         
         Args:
             public_key_path: 公钥文件路径
             secret_key: 密钥
+            signature_cache_size: 已验证签名缓存大小，0表示禁用缓存；验签失败的
+                许可证另记录在同样大小的无效签名缓存中，再次校验时不重复验签
+            timestamp_flush_interval: 时间戳文件最小写盘间隔（秒），0表示每次校验成功后立即写盘
+            ntp_servers: NTP服务器列表，为None时使用默认服务器
+            background_time_sync: 是否在后台线程中刷新时间同步源
+            lazy_init: 是否延迟初始化。开启后NTP探测、时间戳存储初始化和初始
+                状态校验在后台线程中执行，构造函数立即返回；就绪前所有校验
+                返回False，可通过 is_ready()/wait_until_ready() 查询就绪状态
+            usage_meter: 用量计数器。设置后 check_usage_limit 按实际已用量判断，
+                并可通过 consume_usage()/release_usage() 记录用量
+            rate_limiter: 限流器，设置后可通过 acquire_api() 按 APIPermission.rate_limit 限流
+            decision_cache_ttl: 权限检查结果缓存的有效期（秒），0表示禁用。开启后
+                check_* 在有效期内（且不超过许可证的 not_after）直接返回缓存的结果，
+                不再执行时间、存储与签名校验，也不推进时间戳
+            decision_cache_size: 权限检查结果缓存的最大条目数
+            hooks: 验证钩子，每次验证结束后收到验证结果，如 ValidationMetrics
+            validation_lease: 验证租约时长（秒），0表示禁用。冻结的许可证完整验证
+                通过后获得租约，租约内 validate_license 与 check_* 只比较单调时钟，
+                不再执行时间、存储与签名校验；租约不超过许可证的 not_after
+            lease_skew_tolerance: 租约期间系统时间相对单调时钟的最大漂移（秒），
+                超出（系统时间被修改、休眠唤醒等）时租约作废并重新完整验证；
+                同样用于环境快照
+            environment_refresh_interval: 环境快照的有效期（秒），0表示每次验证都
+                执行启动时间、时间同步与时间戳存储校验。开启后这些校验的结果作为
+                不可变快照发布，验证只读取快照、不加锁；快照过期时由一个线程刷新，
+                其余线程在刷新期间继续使用旧快照。时间戳在刷新快照时推进
         """
+        self._construct_started = time.monotonic()
+        self._ready = threading.Event()
+        self._init_done = threading.Event()
+        self._init_error: Optional[Exception] = None
+        self.startup_seconds: Optional[float] = None
+
         self.public_key = load_pem_public_key(open(public_key_path, 'rb').read())
+        self.signature_cache = SignatureCache(signature_cache_size)
+        self.rejected_signatures = SignatureCache(signature_cache_size)
+        self.usage_meter = usage_meter
+        self.rate_limiter = rate_limiter
+        self.decision_cache = DecisionCache(decision_cache_ttl, decision_cache_size) if decision_cache_ttl > 0 else None
+        self.hooks: List[ValidationHook] = list(hooks or ())
+        self.validation_lease = validation_lease
+        self.lease_skew_tolerance = lease_skew_tolerance
+        # id(license_obj) -> (许可证弱引用, 租约截止的单调时间, 授予时系统时间与单调时钟之差)
+        self._leases: Dict[int, Tuple[weakref.ref, float, float]] = {}
+        self.lease_hits = 0
+        self.lease_misses = 0
+        self.environment_refresh_interval = environment_refresh_interval
+        self._env_state: Optional[EnvironmentState] = None
+        self._env_lock = threading.Lock()
+        self._validated_since_refresh = False
         # self.env_validator = KubernetesHardwareValidator()  # 暂时注释掉
         self.boot_validator = BootTimeValidator()
-        self.time_sync = TimeSyncValidator()
-        self.time_storage = SecureTimeStorage(secret_key)
+        self.time_sync = TimeSyncValidator(
+            ntp_servers,
+            background_refresh=background_time_sync,
+            initial_sync=not lazy_init
+        )
+        self.time_storage = SecureTimeStorage(
+            secret_key,
+            flush_interval=timestamp_flush_interval,
+            defer_init=lazy_init
+        )
         
-        # 初始化验证状态
-        self._initialize_validation()
+        if lazy_init:
+            threading.Thread(
+                target=self._deferred_initialize, name="license-validator-init", daemon=True
+            ).start()
+        else:
+            # 初始化验证状态
+            self._initialize_validation()
+            self._mark_ready()
+
+    def _deferred_initialize(self):
+        """后台执行耗时的初始化探测"""
+        try:
+            if self.time_sync.background_refresh:
+                self.time_sync.wait_for_sync()
+            else:
+                self.time_sync.refresh()
+            self.time_storage.initialize()
+            self._initialize_validation()
+        except Exception as e:
+            self._init_error = e
+            self._init_done.set()
+            print(f"许可证验证器初始化失败: {e}")
+            return
+        self._mark_ready()
+
+    def _mark_ready(self):
+        self.startup_seconds = time.monotonic() - self._construct_started
+        self._ready.set()
+        self._init_done.set()
+
+    def is_ready(self) -> bool:
+        """验证器是否已完成初始化，可用于就绪探针"""
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待初始化完成
+        
+        Args:
+            timeout: 最长等待时间（秒），为None时一直等待
+            
+        Returns:
+            bool: 是否已就绪
+        """
+        self._init_done.wait(timeout)
+        return self._ready.is_set()
+
+    def readiness(self) -> dict:
+        """获取就绪状态详情
+        
+        Returns:
+            dict: 包含 ready、error、startup_seconds、time_synced、storage_initialized
+        """
+        return {
+            'ready': self._ready.is_set(),
+            'error': str(self._init_error) if self._init_error else None,
+            'startup_seconds': self.startup_seconds,
+            'time_synced': self.time_sync.synced,
+            'storage_initialized': self.time_storage.initialized
+        }
 
     def _initialize_validation(self):
         """初始化验证状态"""
@@ -60,38 +443,296 @@ class LicenseValidator:
         Returns:
             bool: 许可证是否有效
         """
-        # 获取当前时间
-        current_time = time.time()
+        if self.leased_result(license_obj) is not None:
+            return True
+        return self.validate_license_detailed(license_obj).valid
+
+    def validate_license_detailed(self, license_obj: License) -> ValidationResult:
+        """验证许可证并返回失败原因、失败阶段与各阶段耗时
         
-        # 验证时间合理性
-        if not self.boot_validator.validate_time(current_time):
-            return False
+        总是执行完整验证，不使用验证租约；验证通过时授予或续期租约。
+        
+        Args:
+            license_obj: 许可证对象
             
-        if not self.time_sync.validate_time(current_time):
+        Returns:
+            ValidationResult: 验证结果
+        """
+        result = self._validate(license_obj, self._verify_signature)
+        if self.validation_lease > 0:
+            self.lease_misses += 1
+            if result.valid:
+                self._grant_lease(license_obj)
+        return result
+
+    def leased_result(self, license_obj: License) -> Optional[ValidationResult]:
+        """许可证持有未过期的验证租约时返回通过的验证结果，否则返回None
+        
+        只读取内存，不会阻塞，异步封装据此决定是否需要进入线程池完整验证。
+        """
+        if self._leases and self._lease_valid(license_obj):
+            return _LEASED
+        return None
+
+    def _lease_valid(self, license_obj: License) -> bool:
+        """许可证是否持有未过期的验证租约"""
+        key = id(license_obj)
+        lease = self._leases.get(key)
+        if lease is None or lease[0]() is not license_obj:
             return False
+        now = time.monotonic()
+        if now < lease[1] and abs(time.time() - now - lease[2]) <= self.lease_skew_tolerance:
+            self.lease_hits += 1
+            return True
+        # 租约到期或系统时间与单调时钟出现漂移
+        self._leases.pop(key, None)
+        return False
+
+    def _grant_lease(self, license_obj: License) -> None:
+        # 只有冻结的许可证不会在租约期间被修改
+        if not license_obj.frozen:
+            return
+        now = time.monotonic()
+        wall = time.time()
+        remaining = (license_obj.not_after - datetime.fromtimestamp(wall)).total_seconds()
+        duration = min(self.validation_lease, remaining)
+        if duration <= 0:
+            return
+        key = id(license_obj)
+        leases = self._leases
+
+        def expire(ref, key=key):
+            # 许可证对象被回收时移除租约；id 可能已被新对象复用，只移除自己的条目
+            lease = leases.get(key)
+            if lease is not None and lease[0] is ref:
+                leases.pop(key, None)
+
+        leases[key] = (weakref.ref(license_obj, expire), now + duration, wall - now)
+
+    def revoke_leases(self, license_id: Optional[str] = None) -> int:
+        """作废验证租约，之后的校验重新完整验证
+        
+        Args:
+            license_id: 许可证ID，为None时作废全部租约
             
-        # 验证时间戳存储
-        if not self.time_storage.validate_storage():
-            return False
+        Returns:
+            int: 作废的租约数
+        """
+        if license_id is None:
+            removed = len(self._leases)
+            self._leases.clear()
+            return removed
+        removed = 0
+        for key, lease in list(self._leases.items()):
+            license_obj = lease[0]()
+            if license_obj is None or license_obj.license_id == license_id:
+                self._leases.pop(key, None)
+                removed += 1
+        return removed
+
+    def lease_stats(self) -> dict:
+        """获取验证租约统计信息
+        
+        Returns:
+            dict: 包含 size（当前租约数）、lease（租约时长）、hits（租约内直接放行的
+                校验数）、misses（完整验证数）
+        """
+        return {
+            'size': len(self._leases),
+            'lease': self.validation_lease,
+            'hits': self.lease_hits,
+            'misses': self.lease_misses
+        }
+
+    def validate_container(self, container: LicenseContainer) -> bool:
+        """验证二进制容器中的许可证
+        
+        签名直接在容器的 payload 上验证，不构造许可证模型。
+        
+        Args:
+            container: 许可证容器
             
-        # # 验证环境信息
-        # current_env = self.env_validator.get_environment_info()
-        # if not self._validate_environment(current_env):
-        #     return False
+        Returns:
+            bool: 许可证是否有效
+        """
+        return self._validate(container, self._verify_container_signature).valid
+
+    def validate_container_detailed(self, container: LicenseContainer) -> ValidationResult:
+        """验证二进制容器中的许可证并返回详细结果"""
+        return self._validate(container, self._verify_container_signature)
+
+    def add_hook(self, hook: ValidationHook) -> None:
+        """注册验证钩子"""
+        self.hooks = self.hooks + [hook]
+
+    def remove_hook(self, hook: ValidationHook) -> None:
+        """移除验证钩子"""
+        self.hooks = [h for h in self.hooks if h is not hook]
+
+    def _validate(self, license_obj: Union[License, LicenseContainer], verify_signature: Callable) -> ValidationResult:
+        """执行时间、存储、有效期与签名校验，并将结果通知验证钩子"""
+        # 未完成初始化时拒绝
+        if not self._ready.is_set():
+            result = ValidationResult(False, ValidationReason.NOT_READY, STAGE_READY, {})
+        else:
+            result = self._run_stages(license_obj, verify_signature)
+        hooks = self.hooks
+        if hooks:
+            for hook in hooks:
+                try:
+                    hook.on_validation(license_obj.license_id, result)
+                except Exception as e:
+                    print(f"验证钩子异常: {e}")
+        return result
+
+    def _run_stages(
+        self,
+        license_obj: Union[License, LicenseContainer],
+        verify_signature: Callable
+    ) -> ValidationResult:
+        """依次执行各校验阶段，在第一个失败的阶段停止
+
+        开启环境快照时，启动时间、时间同步与时间戳存储三个阶段的结果取自
+        快照，timings 中只包含本次实际执行的阶段。
+
+        Args:
+            license_obj: 许可证对象或容器
+            verify_signature: 签名校验函数，通过时返回None，否则返回失败原因
+        """
+        clock = time.perf_counter
+        timings = {}
+        snapshot_mode = self.environment_refresh_interval > 0
+        if snapshot_mode:
+            failure = self._environment_state().failure
+            if failure is not None:
+                return failure
+
+        # 获取当前时间
+        current_time = time.time()
+        if not snapshot_mode:
+            failure = self._check_environment(current_time, timings)
+            if failure is not None:
+                return failure
             
         # 验证许可证时间
+        start = clock()
         now = datetime.fromtimestamp(current_time)
-        if not (license_obj.not_before <= now <= license_obj.not_after):
-            return False
+        failure = None
+        if now < license_obj.not_before:
+            failure = ValidationReason.NOT_YET_VALID
+        elif now > license_obj.not_after:
+            failure = ValidationReason.EXPIRED
+        end = clock()
+        timings[STAGE_VALIDITY] = end - start
+        if failure is not None:
+            return ValidationResult(False, failure, STAGE_VALIDITY, timings)
             
         # 验证签名
-        if not self._verify_signature(license_obj):
-            return False
+        start = end
+        failure = verify_signature(license_obj)
+        end = clock()
+        timings[STAGE_SIGNATURE] = end - start
+        if failure is not None:
+            return ValidationResult(False, failure, STAGE_SIGNATURE, timings)
             
-        # 更新时间戳
-        self.time_storage.update_timestamps()
+        # 更新时间戳，环境快照模式下由刷新快照的线程统一推进
+        if snapshot_mode:
+            self._validated_since_refresh = True
+        else:
+            start = end
+            self.time_storage.update_timestamps()
+            timings[STAGE_UPDATE_TIMESTAMPS] = clock() - start
+        
+        return ValidationResult(True, ValidationReason.OK, None, timings)
+
+    def _check_environment(self, current_time: float, timings: Dict[str, float]) -> Optional[ValidationResult]:
+        """执行与许可证无关的启动时间、时间同步与时间戳存储校验
+
+        Args:
+            current_time: 当前时间
+            timings: 写入各阶段耗时
+
+        Returns:
+            Optional[ValidationResult]: 通过时返回None，否则为失败结果
+        """
+        clock = time.perf_counter
         
-        return True
+        # 验证时间合理性
+        start = clock()
+        ok = self.boot_validator.validate_time(current_time)
+        end = clock()
+        timings[STAGE_BOOT_TIME] = end - start
+        if not ok:
+            return ValidationResult(False, ValidationReason.CLOCK_BEFORE_BOOT, STAGE_BOOT_TIME, timings)
+
+        start = end
+        ok = self.time_sync.validate_time(current_time)
+        end = clock()
+        timings[STAGE_TIME_SYNC] = end - start
+        if not ok:
+            return ValidationResult(False, ValidationReason.CLOCK_SKEW, STAGE_TIME_SYNC, timings)
+            
+        # 验证时间戳存储
+        start = end
+        failure = self.time_storage.inspect_storage()
+        timings[STAGE_STORAGE] = clock() - start
+        if failure is not None:
+            return ValidationResult(False, STORAGE_REASONS[failure], STAGE_STORAGE, timings)
+            
+        # # 验证环境信息
+        # current_env = self.env_validator.get_environment_info()
+        # if not self._validate_environment(current_env):
+        #     return False
+
+        return None
+
+    def _environment_state(self) -> EnvironmentState:
+        """获取有效的环境快照，过期时由一个线程刷新
+
+        快照过期不足一个有效期且系统时间未发生漂移时，其他线程在刷新期间
+        继续使用旧快照；否则等待刷新完成。
+        """
+        state = self._env_state
+        now = time.monotonic()
+        usable = False
+        if state is not None:
+            drifted = abs(time.time() - now - state.offset) > self.lease_skew_tolerance
+            if now < state.expires and not drifted:
+                return state
+            usable = not drifted and now < state.expires + self.environment_refresh_interval
+        if self._env_lock.acquire(blocking=not usable):
+            try:
+                # 等待期间其他线程可能已完成刷新
+                if self._env_state is state:
+                    self._refresh_environment()
+            finally:
+                self._env_lock.release()
+        return self._env_state
+
+    def _refresh_environment(self) -> EnvironmentState:
+        timings = {}
+        failure = self._check_environment(time.time(), timings)
+        if failure is None and self._validated_since_refresh:
+            # 上一个快照期间有许可证验证通过，推进时间戳
+            self._validated_since_refresh = False
+            start = time.perf_counter()
+            self.time_storage.update_timestamps()
+            timings[STAGE_UPDATE_TIMESTAMPS] = time.perf_counter() - start
+        now = time.monotonic()
+        state = EnvironmentState(failure, timings, now + self.environment_refresh_interval, time.time() - now)
+        self._env_state = state
+        return state
+
+    def refresh_environment(self) -> Optional[ValidationResult]:
+        """立即刷新环境快照，未开启环境快照时不做任何事
+
+        Returns:
+            Optional[ValidationResult]: 环境校验通过时返回None，否则为失败结果
+        """
+        if self.environment_refresh_interval <= 0:
+            return None
+        with self._env_lock:
+            return self._refresh_environment().failure
         
     def check_feature(self, license_obj: License, feature_id: str, feature_type: FeatureType) -> bool:
         """检查特定功能是否可用
@@ -104,10 +745,7 @@ class LicenseValidator:
         Returns:
             bool: 功能是否可用
         """
-        if not self.validate_license(license_obj):
-            return False
-            
-        return license_obj.check_feature(feature_id, feature_type)
+        return self._check(license_obj, ('feature', feature_id, feature_type))
         
     def check_api_permission(self, license_obj: License, method: str, path: str) -> bool:
         """检查API权限
@@ -120,10 +758,26 @@ class LicenseValidator:
         Returns:
             bool: 是否有权限访问API
         """
-        if not self.validate_license(license_obj):
-            return False
+        return self._check(license_obj, ('api', method, path))
+        
+    def acquire_api(self, license_obj: License, method: str, path: str, tokens: float = 1) -> RateDecision:
+        """检查API权限并按 rate_limit 申请令牌
+        
+        Args:
+            license_obj: 许可证对象
+            method: HTTP方法
+            path: API路径
+            tokens: 申请的令牌数
             
-        return license_obj.check_api_permission(method, path)
+        Returns:
+            RateDecision: 许可证无效或无权限时 allowed 为False且 retry_after 为None；
+                被限流时 retry_after 为建议的重试等待时间（秒）
+        """
+        if not self.check_api_permission(license_obj, method, path):
+            return RateDecision(False, None, None)
+        if self.rate_limiter is None:
+            return RateDecision(True, None, None)
+        return self.rate_limiter.acquire(license_obj, method, path, tokens)
         
     def check_service_permission(self, license_obj: License, service_name: str, endpoint: str) -> bool:
         """检查微服务权限
@@ -136,10 +790,7 @@ class LicenseValidator:
         Returns:
             bool: 是否有权限访问服务
         """
-        if not self.validate_license(license_obj):
-            return False
-            
-        return license_obj.check_service_permission(service_name, endpoint)
+        return self._check(license_obj, ('service', service_name, endpoint))
         
     def check_ui_permission(self, license_obj: License, component_id: str) -> bool:
         """检查UI组件权限
@@ -151,10 +802,7 @@ class LicenseValidator:
         Returns:
             bool: 组件是否可见
         """
-        if not self.validate_license(license_obj):
-            return False
-            
-        return license_obj.check_ui_permission(component_id)
+        return self._check(license_obj, ('ui', component_id))
         
     def check_button_permission(self, license_obj: License, button_id: str) -> bool:
         """检查按钮权限
@@ -166,10 +814,7 @@ class LicenseValidator:
         Returns:
             bool: 按钮是否可用
         """
-        if not self.validate_license(license_obj):
-            return False
-            
-        return license_obj.check_button_permission(button_id)
+        return self._check(license_obj, ('button', button_id))
         
     def check_usage_limit(self, license_obj: License, metric_type: str, value: int = 1) -> bool:
         """检查使用限制
@@ -182,42 +827,273 @@ class LicenseValidator:
         Returns:
             bool: 是否在限制范围内
         """
+        return self._check(license_obj, ('usage', metric_type, value))
+
+    def _check(self, license_obj: License, query: tuple) -> bool:
+        """验证许可证后执行单项检查，开启结果缓存时先查缓存"""
+        result = self.cached_decision(license_obj, query)
+        if result is not None:
+            return result
+        return self.decide(license_obj, query, self._validate_for_decision(license_obj))
+
+    def _decision_cacheable(self, kind: str) -> bool:
+        # 配置了用量计数器时用量查询的结果随实际用量变化，不缓存
+        return self.decision_cache is not None and not (kind == 'usage' and self.usage_meter is not None)
+
+    def cached_decision(self, license_obj: License, query: tuple) -> Optional[bool]:
+        """查询权限检查结果缓存
+        
+        只读取内存，不会阻塞。
+        
+        Args:
+            license_obj: 许可证对象
+            query: 单项查询，格式见 check_many
+            
+        Returns:
+            Optional[bool]: 缓存的结果；未开启缓存、未命中或该查询不缓存时为None
+        """
+        kind = getattr(query[0], 'value', query[0])
+        if not self._decision_cacheable(kind):
+            return None
+        return self.decision_cache.get(license_obj.license_id, license_obj.signature, (kind,) + tuple(query[1:]))
+
+    def decide(self, license_obj: License, query: tuple, validation: ValidationResult) -> bool:
+        """按已完成的验证结果执行单项检查，并按规则写入结果缓存
+        
+        validation 应来自 leased_result 或 validate_license_detailed。除配置了用量
+        计数器时的用量查询需要读计数器外，只做内存查找。
+        
+        Args:
+            license_obj: 许可证对象
+            query: 单项查询，格式见 check_many
+            validation: 许可证的验证结果
+            
+        Returns:
+            bool: 许可证有效且检查通过
+            
+        Raises:
+            ValueError: 查询类型未知
+        """
+        kind = getattr(query[0], 'value', query[0])
+        check = self._check_usage if kind == 'usage' else PERMISSION_QUERIES.get(kind)
+        if check is None:
+            raise ValueError(f"未知的权限查询类型: {query[0]}")
+        result = validation.valid and check(license_obj, *query[1:])
+        if self._decision_cacheable(kind):
+            self._store_decision(license_obj, (kind,) + tuple(query[1:]), result, validation)
+        return result
+
+    def _validate_for_decision(self, license_obj: License) -> ValidationResult:
+        """与 validate_license 相同，但返回验证结果，供写入结果缓存时判断失败阶段"""
+        leased = self.leased_result(license_obj)
+        if leased is not None:
+            return leased
+        return self.validate_license_detailed(license_obj)
+
+    def _store_decision(
+        self, license_obj: License, query: tuple, result: bool, validation: ValidationResult
+    ) -> None:
+        # 未就绪等暂时的失败，以及有效期、签名等随许可证内容而定的失败不缓存
+        if not validation.valid and validation.stage not in ENVIRONMENT_STAGES:
+            return
+        remaining = (license_obj.not_after - datetime.now()).total_seconds()
+        ttl = min(self.decision_cache.ttl, remaining) if validation.valid else self.decision_cache.ttl
+        if ttl > 0:
+            self.decision_cache.put(
+                license_obj.license_id, license_obj.signature, query, result, time.monotonic() + ttl
+            )
+
+    def _check_usage(self, license_obj: License, metric_type: str, value: int = 1) -> bool:
+        if self.usage_meter is not None:
+            return self.usage_meter.check(license_obj, metric_type, value)
+        return license_obj.check_usage_limit(metric_type, value)
+
+    def consume_usage(self, license_obj: License, metric_type: str, value: int = 1) -> bool:
+        """验证许可证并占用用量
+        
+        Args:
+            license_obj: 许可证对象
+            metric_type: 指标类型
+            value: 占用量
+            
+        Returns:
+            bool: 许可证有效且占用后未超过上限
+            
+        Raises:
+            RuntimeError: 未配置用量计数器
+        """
+        if self.usage_meter is None:
+            raise RuntimeError("未配置用量计数器")
         if not self.validate_license(license_obj):
             return False
             
-        return license_obj.check_usage_limit(metric_type, value)
+        return self.usage_meter.consume(license_obj, metric_type, value)
+
+    def release_usage(self, license_obj: License, metric_type: str, value: int = 1) -> None:
+        """释放用量
+        
+        Args:
+            license_obj: 许可证对象
+            metric_type: 指标类型
+            value: 释放量
+            
+        Raises:
+            RuntimeError: 未配置用量计数器
+        """
+        if self.usage_meter is None:
+            raise RuntimeError("未配置用量计数器")
+        self.usage_meter.release(license_obj, metric_type, value)
+
+    def check_many(self, license_obj: License, queries: Sequence[Tuple]) -> List[bool]:
+        """批量检查权限，许可证只验证一次
+        
+        Args:
+            license_obj: 许可证对象
+            queries: 查询列表，每项为 (类型, 参数...)，类型与参数对应单项检查方法：
+                ("feature", feature_id, feature_type)
+                ("api", method, path)
+                ("service", service_name, endpoint)
+                ("ui", component_id)
+                ("button", button_id)
+                ("usage", metric_type[, value])
+                类型也可以是 FeatureType 枚举值
+                
+        Returns:
+            List[bool]: 与 queries 顺序一致的检查结果，许可证无效时全部为False
+        """
+        checks = compile_permission_queries(queries)
+        cache = self.decision_cache
+        if cache is None:
+            if not self.validate_license(license_obj):
+                return [False] * len(checks)
+            return [check(license_obj, *args) for check, args in self._bind_checks(checks)]
+
+        # 开启结果缓存时全部命中则直接返回，否则验证一次并写回各项结果
+        keys = [(getattr(query[0], 'value', query[0]),) + tuple(query[1:]) for query in queries]
+        license_id = license_obj.license_id
+        signature = license_obj.signature
+        results = [cache.get(license_id, signature, key) for key in keys]
+        if None not in results:
+            return results
+        validation = self._validate_for_decision(license_obj)
+        valid = validation.valid
+        bound = self._bind_checks(checks)
+        for i, (check, args) in enumerate(bound):
+            if results[i] is not None and valid:
+                continue
+            results[i] = valid and check(license_obj, *args)
+            if not (self.usage_meter is not None and keys[i][0] == 'usage'):
+                self._store_decision(license_obj, keys[i], results[i], validation)
+        return results
+
+    def _bind_checks(self, checks: List[Tuple[Callable, tuple]]) -> List[Tuple[Callable, tuple]]:
+        """配置了用量计数器时，将用量查询改为按实际已用量判断"""
+        if self.usage_meter is None:
+            return checks
+        return [
+            (self._check_usage if check is License.check_usage_limit else check, args)
+            for check, args in checks
+        ]
         
-    def _verify_signature(self, license_obj: License) -> bool:
+    def _verify_signature(self, license_obj: License) -> Optional[ValidationReason]:
         """验证许可证签名
         
         Args:
             license_obj: 许可证对象
             
         Returns:
-            bool: 签名是否有效
+            Optional[ValidationReason]: 签名有效时返回None，否则为失败原因
         """
         if not license_obj.signature:
-            return False
+            return ValidationReason.MISSING_SIGNATURE
+
+        # 按许可证记录的算法选择验证套件，公钥类型必须与之匹配
+        algorithm = license_obj.signature_algorithm or DEFAULT_ALGORITHM
+        suite = SIGNATURE_SUITES.get(algorithm)
+        if suite is None or not suite.supports_key(self.public_key):
+            return ValidationReason.UNSUPPORTED_ALGORITHM
             
-        try:
-            # 将许可证对象转换为字节
-            license_bytes = license_obj.dump_for_sign()
+        # 将许可证对象转换为字节
+        license_bytes = license_obj.dump_for_sign()
+
+        # 命中已验证或已知无效的缓存则跳过验签
+        cache_key = SignatureCache.make_key(license_bytes, license_obj.signature, algorithm)
+        if self.signature_cache.contains(cache_key):
+            return None
+        if self.rejected_signatures.contains(cache_key):
+            return ValidationReason.BAD_SIGNATURE
 
+        try:
             # 使用公钥验证签名
-            self.public_key.verify(
-                bytes.fromhex(license_obj.signature),
-                license_bytes,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
+            suite.verify(self.public_key, bytes.fromhex(license_obj.signature), license_bytes)
+        except Exception:
+            self.rejected_signatures.add(cache_key, license_obj.license_id)
+            return ValidationReason.BAD_SIGNATURE
 
-            return True
-        except Exception as e:
-            print('签名校验异常:', e)
-            return False
+        self.signature_cache.add(cache_key, license_obj.license_id)
+        return None
+
+    def _verify_container_signature(self, container: LicenseContainer) -> Optional[ValidationReason]:
+        """在容器 payload 上验证签名，结果同样进入已验证签名缓存与无效签名缓存"""
+        suite = SIGNATURE_SUITES.get(container.algorithm)
+        if suite is None or not suite.supports_key(self.public_key):
+            return ValidationReason.UNSUPPORTED_ALGORITHM
+        signature = container.signature.hex()
+        cache_key = SignatureCache.make_key(container.payload, signature, container.algorithm)
+        if self.signature_cache.contains(cache_key):
+            return None
+        if self.rejected_signatures.contains(cache_key):
+            return ValidationReason.BAD_SIGNATURE
+        if not container.verify(self.public_key):
+            self.rejected_signatures.add(cache_key, container.license_id)
+            return ValidationReason.BAD_SIGNATURE
+        self.signature_cache.add(cache_key, container.license_id)
+        return None
+
+    def close(self) -> None:
+        """关闭验证器，停止后台刷新并写入未落盘的时间戳"""
+        self.time_sync.stop()
+        if self._validated_since_refresh:
+            self._validated_since_refresh = False
+            self.time_storage.update_timestamps()
+        self.time_storage.close()
+        if self.usage_meter is not None:
+            self.usage_meter.close()
+
+    def invalidate_signature_cache(self, license_id: Optional[str] = None) -> int:
+        """使已验证签名缓存与无效签名缓存失效，同时清除对应的权限检查结果缓存
+        
+        Args:
+            license_id: 许可证ID，为None时清空全部缓存
+            
+        Returns:
+            int: 被移除的签名缓存条目数
+        """
+        self.invalidate_decisions(license_id)
+        self.rejected_signatures.invalidate(license_id)
+        return self.signature_cache.invalidate(license_id)
+
+    def invalidate_decisions(self, license_id: Optional[str] = None) -> int:
+        """使权限检查结果缓存失效并作废验证租约，许可证吊销、更换或时间戳存储被重置后调用
+        
+        Args:
+            license_id: 许可证ID，为None时清空全部缓存
+            
+        Returns:
+            int: 被移除的条目数
+        """
+        self.revoke_leases(license_id)
+        if self.decision_cache is None:
+            return 0
+        return self.decision_cache.invalidate(license_id)
+
+    def get_cache_stats(self) -> dict:
+        """获取签名缓存统计信息
+        
+        Returns:
+            dict: 包含 size、max_size、hits、misses、evictions
+        """
+        return self.signature_cache.stats()
 
     def _validate_environment(self, current_env: dict) -> bool:
         """验证环境信息
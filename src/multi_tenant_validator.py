@@ -0,0 +1,227 @@
+import sys
+import threading
+from collections import OrderedDict
+from enum import Enum
+from types import FunctionType, MappingProxyType, ModuleType
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from license_models import License, FeatureType
+from license_validator import LicenseValidator, compile_permission_queries
+
+TenantLoader = Callable[[str], Optional[License]]
+
+def estimate_size(obj) -> int:
+    """估算对象及其引用的全部对象占用的内存（字节）
+
+    按 sys.getsizeof 递归累加，同一对象只计一次；类型、函数、模块和枚举成员
+    为全局共享对象，不计入。
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, (type, FunctionType, ModuleType, Enum)):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, (dict, MappingProxyType)):
+            for key, value in item.items():
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        if hasattr(item, '__dict__'):
+            stack.append(item.__dict__)
+        for cls in type(item).__mro__:
+            for slot in cls.__dict__.get('__slots__', ()):
+                if hasattr(item, slot) and not slot.startswith('__'):
+                    stack.append(getattr(item, slot))
+        private = getattr(item, '__pydantic_private__', None)
+        if isinstance(private, dict):
+            stack.append(private)
+    return total
+
+class TenantContext:
+    """租户的已编译许可证上下文"""
+
+    __slots__ = ('tenant_id', 'license', 'size')
+
+    def __init__(self, tenant_id: str, license_obj: License):
+        self.tenant_id = tenant_id
+        # 冻结后签名字节与权限索引都会缓存在许可证对象上
+        self.license = license_obj.freeze()
+        self.license.permission_index
+        self.license.dump_for_sign()
+        self.size = estimate_size(self.license)
+
+class MultiTenantValidator:
+    """多租户许可证验证器
+
+    按租户ID加载许可证，并将编译后的上下文（冻结的许可证、权限索引、规范化
+    签名字节）保存在有界的LRU中，超出条目数或内存预算时淘汰最久未使用的
+    租户，之后再次访问时由 loader 重新加载。签名验证结果由底层
+    LicenseValidator 的签名缓存复用。
+    """
+
+    def __init__(
+        self,
+        validator: LicenseValidator,
+        loader: TenantLoader,
+        max_tenants: int = 1024,
+        max_bytes: Optional[int] = None
+    ):
+        """初始化多租户验证器
+
+        Args:
+            validator: 底层验证器
+            loader: 根据租户ID加载许可证，租户不存在时返回None
+            max_tenants: 最多常驻的租户上下文数
+            max_bytes: 常驻上下文的估算内存上限（字节），为None时只按条目数淘汰
+        """
+        self.validator = validator
+        self.loader = loader
+        self.max_tenants = max_tenants
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.load_failures = 0
+        self.evictions = 0
+        self.resident_bytes = 0
+        self._contexts: "OrderedDict[str, TenantContext]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_context(self, tenant_id: str) -> Optional[TenantContext]:
+        """获取租户上下文，未命中时加载
+
+        Returns:
+            TenantContext: 租户上下文，租户不存在或加载失败时返回None
+        """
+        with self._lock:
+            context = self._contexts.get(tenant_id)
+            if context is not None:
+                self._contexts.move_to_end(tenant_id)
+                self.hits += 1
+                return context
+            self.misses += 1
+
+        # 加载在锁外进行，不阻塞其他租户的查询
+        try:
+            license_obj = self.loader(tenant_id)
+        except Exception as e:
+            print(f"租户许可证加载失败: {tenant_id}: {e}")
+            license_obj = None
+        if license_obj is None:
+            with self._lock:
+                self.load_failures += 1
+            return None
+        context = TenantContext(tenant_id, license_obj)
+
+        with self._lock:
+            existing = self._contexts.get(tenant_id)
+            if existing is not None:
+                # 其他线程已先完成加载
+                self._contexts.move_to_end(tenant_id)
+                return existing
+            self._contexts[tenant_id] = context
+            self.resident_bytes += context.size
+            self._evict_locked()
+        return context
+
+    def _evict_locked(self):
+        while len(self._contexts) > 1 and (
+            len(self._contexts) > self.max_tenants or
+            (self.max_bytes is not None and self.resident_bytes > self.max_bytes)
+        ):
+            _, evicted = self._contexts.popitem(last=False)
+            self.resident_bytes -= evicted.size
+            self.evictions += 1
+
+    def invalidate(self, tenant_id: Optional[str] = None) -> int:
+        """使租户上下文失效，许可证更新或吊销后调用
+
+        Args:
+            tenant_id: 租户ID，为None时清空全部上下文
+
+        Returns:
+            int: 被移除的上下文数
+        """
+        with self._lock:
+            if tenant_id is None:
+                removed = len(self._contexts)
+                self._contexts.clear()
+                self.resident_bytes = 0
+                return removed
+            context = self._contexts.pop(tenant_id, None)
+            if context is None:
+                return 0
+            self.resident_bytes -= context.size
+            return 1
+
+    def get_license(self, tenant_id: str) -> Optional[License]:
+        """获取租户的许可证对象"""
+        context = self.get_context(tenant_id)
+        return context.license if context is not None else None
+
+    def validate_tenant(self, tenant_id: str) -> bool:
+        """验证租户许可证的有效性"""
+        license_obj = self.get_license(tenant_id)
+        return license_obj is not None and self.validator.validate_license(license_obj)
+
+    def check_feature(self, tenant_id: str, feature_id: str, feature_type: FeatureType) -> bool:
+        """检查租户的功能是否可用"""
+        license_obj = self.get_license(tenant_id)
+        return license_obj is not None and self.validator.check_feature(license_obj, feature_id, feature_type)
+
+    def check_api_permission(self, tenant_id: str, method: str, path: str) -> bool:
+        """检查租户的API权限"""
+        license_obj = self.get_license(tenant_id)
+        return license_obj is not None and self.validator.check_api_permission(license_obj, method, path)
+
+    def check_service_permission(self, tenant_id: str, service_name: str, endpoint: str) -> bool:
+        """检查租户的微服务权限"""
+        license_obj = self.get_license(tenant_id)
+        return license_obj is not None and self.validator.check_service_permission(license_obj, service_name, endpoint)
+
+    def check_ui_permission(self, tenant_id: str, component_id: str) -> bool:
+        """检查租户的UI组件权限"""
+        license_obj = self.get_license(tenant_id)
+        return license_obj is not None and self.validator.check_ui_permission(license_obj, component_id)
+
+    def check_button_permission(self, tenant_id: str, button_id: str) -> bool:
+        """检查租户的按钮权限"""
+        license_obj = self.get_license(tenant_id)
+        return license_obj is not None and self.validator.check_button_permission(license_obj, button_id)
+
+    def check_usage_limit(self, tenant_id: str, metric_type: str, value: int = 1) -> bool:
+        """检查租户的使用限制"""
+        license_obj = self.get_license(tenant_id)
+        return license_obj is not None and self.validator.check_usage_limit(license_obj, metric_type, value)
+
+    def check_many(self, tenant_id: str, queries: Sequence[Tuple]) -> List[bool]:
+        """批量检查租户权限，查询格式见 LicenseValidator.check_many"""
+        license_obj = self.get_license(tenant_id)
+        if license_obj is None:
+            return [False] * len(compile_permission_queries(queries))
+        return self.validator.check_many(license_obj, queries)
+
+    def stats(self) -> dict:
+        """获取缓存统计信息
+
+        Returns:
+            dict: 包含 tenants、max_tenants、resident_bytes、max_bytes、hits、
+                misses、hit_rate、load_failures、evictions
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'tenants': len(self._contexts),
+                'max_tenants': self.max_tenants,
+                'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'load_failures': self.load_failures,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,106 @@
+import time
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from license_models import License
+
+class RateDecision(NamedTuple):
+    """限流判定结果"""
+    allowed: bool
+    retry_after: Optional[float]   # 被拒绝时建议的重试等待时间（秒），无法通过重试放行时为None
+    remaining: Optional[float]     # 放行后桶内剩余令牌数，未限流时为None
+
+_UNLIMITED = RateDecision(True, None, None)
+
+class RateLimiter:
+    """按 APIPermission.rate_limit 执行的令牌桶限流器
+
+    每个许可证的每条API权限对应一个令牌桶，容量为 rate_limit，按
+    rate_limit / period 的速率补充。令牌桶按键哈希分布到多个分片，每个分片
+    一把锁，多线程服务中不同API的请求不会在同一把锁上串行。
+
+    请求先按 check_api_permission 的规则匹配到API权限（精确路径优先，其次
+    路径模板），同一模板下的所有路径共享一个令牌桶。未匹配或未设置
+    rate_limit 的请求不限流。
+    """
+
+    def __init__(self, period: float = 60.0, burst_ratio: float = 1.0, shards: int = 16):
+        """初始化限流器
+
+        Args:
+            period: rate_limit 对应的时间窗口（秒），默认 rate_limit 表示每分钟请求数
+            burst_ratio: 桶容量相对 rate_limit 的倍数，决定允许的突发量
+            shards: 分片数
+        """
+        self.period = period
+        self.burst_ratio = burst_ratio
+        self._shards: List[Tuple[threading.Lock, Dict[tuple, list]]] = [
+            (threading.Lock(), {}) for _ in range(max(1, shards))
+        ]
+
+    def acquire(self, license_obj: License, method: str, path: str, tokens: float = 1) -> RateDecision:
+        """申请令牌
+
+        Args:
+            license_obj: 许可证对象
+            method: HTTP方法
+            path: API路径
+            tokens: 申请的令牌数
+
+        Returns:
+            RateDecision: 判定结果
+        """
+        feature = license_obj.find_api_permission(method, path)
+        if feature is None or not feature.rate_limit:
+            return _UNLIMITED
+        capacity = max(1.0, feature.rate_limit * self.burst_ratio)
+        rate = feature.rate_limit / self.period
+        return self.take((license_obj.license_id, feature.method, feature.path), capacity, rate, tokens)
+
+    def take(self, key: tuple, capacity: float, rate: float, tokens: float = 1) -> RateDecision:
+        """从指定令牌桶取令牌，桶不存在时按容量装满创建
+
+        Args:
+            key: 令牌桶键，第一个元素为许可证ID
+            capacity: 桶容量
+            rate: 每秒补充的令牌数
+            tokens: 申请的令牌数
+
+        Returns:
+            RateDecision: 判定结果
+        """
+        if tokens > capacity:
+            return RateDecision(False, None, 0.0)
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            # 在锁内读取时钟，否则先读时钟的线程后拿到锁时会把补充时间往回拨
+            now = time.monotonic()
+            # 桶状态为 [令牌数, 上次补充时间]
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [capacity, now]
+            else:
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            available = bucket[0]
+            if available >= tokens:
+                bucket[0] = available - tokens
+                return RateDecision(True, None, bucket[0])
+        return RateDecision(False, (tokens - available) / rate, available)
+
+    def reset(self, license_id: Optional[str] = None) -> None:
+        """清空令牌桶，许可证更新后调用
+
+        Args:
+            license_id: 许可证ID，为None时清空全部
+        """
+        for lock, buckets in self._shards:
+            with lock:
+                if license_id is None:
+                    buckets.clear()
+                else:
+                    for key in [k for k in buckets if k[0] == license_id]:
+                        del buckets[key]
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for _, buckets in self._shards)
@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+# 路径模板语法：
+#   /api/v1/users/{id}/orders   {name} 匹配任意单个路径段
+#   /api/v1/files/*             末尾的 * 匹配其后一个或多个路径段（前缀通配）
+#   /api/v1/*/status            非末尾的 * 与 {name} 相同，匹配单个路径段
+WILDCARD = "*"
+
+def split_path(path: str) -> List[str]:
+    """将路径拆分为路径段，忽略首尾及重复的斜杠"""
+    return [segment for segment in path.split("/") if segment]
+
+def is_path_template(path: str) -> bool:
+    """判断路径是否包含路径参数或通配符"""
+    return any(_is_param(segment) or segment == WILDCARD for segment in split_path(path))
+
+def _is_param(segment: str) -> bool:
+    return len(segment) > 2 and segment[0] == "{" and segment[-1] == "}"
+
+class _Node:
+    """路由树节点"""
+
+    __slots__ = ('static', 'param', 'rest', 'value', 'has_value')
+
+    def __init__(self):
+        self.static: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        # 前缀通配 * 的取值
+        self.rest: Tuple[bool, Any] = (False, None)
+        self.value: Any = None
+        self.has_value = False
+
+class RouteMatcher:
+    """按路径段组织的路由前缀树
+
+    每个HTTP方法一棵树。匹配时按静态段、路径参数、前缀通配的优先级
+    逐段下降，必要时回溯，耗时取决于路径深度而与路由数量无关。
+    同一模板重复插入时保留第一次插入的值。
+    """
+
+    def __init__(self):
+        self._roots: Dict[str, _Node] = {}
+        self.size = 0
+
+    def insert(self, method: str, template: str, value: Any) -> None:
+        """插入路由模板
+
+        Args:
+            method: HTTP方法
+            template: 路径模板
+            value: 匹配成功时返回的值
+        """
+        node = self._roots.setdefault(method, _Node())
+        segments = split_path(template)
+        for i, segment in enumerate(segments):
+            if segment == WILDCARD and i == len(segments) - 1:
+                if not node.rest[0]:
+                    node.rest = (True, value)
+                    self.size += 1
+                return
+            if segment == WILDCARD or _is_param(segment):
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+            else:
+                child = node.static.get(segment)
+                if child is None:
+                    child = node.static[segment] = _Node()
+                node = child
+        if not node.has_value:
+            node.value = value
+            node.has_value = True
+            self.size += 1
+
+    def match(self, method: str, path: str, default: Any = None) -> Any:
+        """匹配路径
+
+        Args:
+            method: HTTP方法
+            path: 请求路径
+            default: 未匹配时的返回值
+
+        Returns:
+            匹配到的路由值，未匹配时返回 default
+        """
+        root = self._roots.get(method)
+        if root is None:
+            return default
+        found, value = self._match(root, split_path(path), 0)
+        return value if found else default
+
+    def _match(self, node: _Node, segments: List[str], i: int) -> Tuple[bool, Any]:
+        if i == len(segments):
+            return node.has_value, node.value
+        child = node.static.get(segments[i])
+        if child is not None:
+            found, value = self._match(child, segments, i + 1)
+            if found:
+                return found, value
+        if node.param is not None:
+            found, value = self._match(node.param, segments, i + 1)
+            if found:
+                return found, value
+        return node.rest
+
+    def __len__(self) -> int:
+        return self.size
@@ -1,32 +1,113 @@
 import os
 import time
+import atexit
 import tempfile
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
 from cryptography.fernet import Fernet
 from pathlib import Path
 
+try:
+    import fcntl  # 可选，存在时用文件锁串行化多进程对时间戳文件的写入
+except ImportError:
+    fcntl = None
+
+def _stat_signature(st: os.stat_result) -> Tuple[int, int, int, int, int]:
+    """文件状态签名，任一字段变化即视为文件被修改或替换"""
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
 class SecureTimeStorage:
-    def __init__(self, secret_key: bytes):
+    def __init__(
+        self,
+        secret_key: bytes,
+        flush_interval: float = 0.0,
+        cache_timestamps: bool = True,
+        defer_init: bool = False
+    ):
         """初始化安全时间戳存储
         
         Args:
             secret_key: 用于加密的密钥
+            flush_interval: 时间戳落盘的最小间隔（秒）。为0时每次更新立即写入；
+                大于0时只在内存中推进时间戳高水位，最多每隔该时间写盘一次，
+                并在 close() 或进程退出时写入
+            cache_timestamps: 是否在内存中缓存解密后的时间戳。开启后校验时只
+                stat 时间戳文件，文件状态签名未变化时不再读取和解密
+            defer_init: 是否推迟创建存储目录和时间戳文件，需随后调用 initialize()
         """
         self.secret_key = secret_key
         self.fernet = Fernet(secret_key)
         self.storage_dir = Path("secure_storage")
-        self._initialize_storage()
+        self.flush_interval = flush_interval
+        # 内存中的时间戳高水位及在磁盘上见到过的最大值
+        self._high_water = 0.0
+        self._observed = 0.0
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.cache_timestamps = cache_timestamps
+        # 文件名 -> (文件状态签名, 解密后的时间戳)
+        self._timestamp_cache: Dict[str, Tuple[tuple, float]] = {}
+        self.initialized = False
+        if not defer_init:
+            self.initialize()
+        if flush_interval > 0:
+            atexit.register(self.close)
         
-    def _initialize_storage(self):
+    def initialize(self):
         """初始化存储"""
         # 创建存储目录
         os.makedirs(self.storage_dir, exist_ok=True)
         # 创建多个时间戳文件
-        self._create_encrypted_files()
+        with self._lock:
+            self._create_encrypted_files()
+        self.initialized = True
+        
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        """跨进程的存储目录锁，共用 secure_storage 的进程之间串行化写入"""
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.storage_dir / ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _disk_maximum(self) -> float:
+        """磁盘上可读的时间戳中的最大值，没有可读文件时为0"""
+        try:
+            return max(self._load_timestamps(), default=0.0)
+        except Exception:
+            pass
+        # 有文件无法解密时逐个读取，跳过损坏的文件
+        maximum = 0.0
+        for file in self.storage_dir.glob("timestamp_*.dat"):
+            try:
+                maximum = max(maximum, self._read_timestamp(file))
+            except Exception:
+                continue
+        return maximum
+
+    def _create_encrypted_files(self, timestamp: Optional[float] = None):
+        """创建加密的时间戳文件
+        
+        多个进程共用存储目录时，在目录锁内重新读取磁盘上的时间戳，写入值
+        不低于其中的最大值，进程退出时落盘的旧高水位不会覆盖其他进程写入
+        的较新时间戳。
         
-    def _create_encrypted_files(self):
-        """创建加密的时间戳文件"""
-        timestamp = time.time()
+        Args:
+            timestamp: 要写入的时间戳，为None时使用当前时间
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._file_lock():
+            self._write_encrypted_files(max(timestamp, self._disk_maximum()))
+
+    def _write_encrypted_files(self, timestamp: float):
         # 在多个位置创建加密的时间戳
         locations = [
             self.storage_dir / "timestamp_1.dat",
@@ -37,45 +118,154 @@ class SecureTimeStorage:
         for location in locations:
             # 加密时间戳
             encrypted_time = self.fernet.encrypt(str(timestamp).encode())
-            # 写入文件
-            with open(location, "wb") as f:
-                f.write(encrypted_time)
-            # 设置文件权限
-            os.chmod(location, 0o600)
+            # 先写临时文件再原子替换，避免其他进程读到写了一半的文件
+            fd, tmp_path = tempfile.mkstemp(dir=self.storage_dir, prefix=".timestamp_")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(encrypted_time)
+                    written_ino = os.fstat(f.fileno()).st_ino
+                # 设置文件权限
+                os.chmod(tmp_path, 0o600)
+                os.replace(tmp_path, location)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._remember_written(location, written_ino, timestamp)
+        self._high_water = max(self._high_water, timestamp)
+        self._observed = max(self._observed, timestamp)
                 
+    def _remember_written(self, location: Path, written_ino: int, timestamp: float):
+        """记录本进程刚写入的时间戳，避免下次校验时重新解密"""
+        if not self.cache_timestamps:
+            return
+        try:
+            st = os.stat(location)
+        except OSError:
+            return
+        # 替换后若已被其他进程再次替换，则不缓存，交由下次校验读取
+        if st.st_ino == written_ino:
+            self._timestamp_cache[location.name] = (_stat_signature(st), timestamp)
+        else:
+            self._timestamp_cache.pop(location.name, None)
+
+    def _read_timestamp(self, path: Path) -> float:
+        """读取并解密单个时间戳文件"""
+        with open(path, "rb") as f:
+            encrypted_data = f.read()
+        # 解密时间戳
+        decrypted_data = self.fernet.decrypt(encrypted_data)
+        return float(decrypted_data.decode())
+
+    def _load_timestamps(self) -> list:
+        """读取所有时间戳文件
+
+        开启缓存时逐个 stat 文件，状态签名与缓存一致的直接使用缓存值，
+        只有新增或被修改的文件才会读取和解密。
+        """
+        if not self.cache_timestamps:
+            return [self._read_timestamp(file) for file in self.storage_dir.glob("timestamp_*.dat")]
+
+        timestamps = []
+        seen = set()
+        with os.scandir(self.storage_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if not (name.startswith("timestamp_") and name.endswith(".dat")):
+                    continue
+                seen.add(name)
+                signature = _stat_signature(entry.stat())
+                cached = self._timestamp_cache.get(name)
+                if cached is not None and cached[0] == signature:
+                    timestamps.append(cached[1])
+                    continue
+                timestamp = self._read_timestamp(Path(entry.path))
+                self._timestamp_cache[name] = (signature, timestamp)
+                timestamps.append(timestamp)
+        for name in list(self._timestamp_cache):
+            if name not in seen:
+                # 其他线程可能已删除，不能用 del
+                self._timestamp_cache.pop(name, None)
+        return timestamps
+
     def validate_storage(self) -> bool:
         """验证存储的时间戳
         
         Returns:
             bool: 时间戳是否有效
         """
+        return self.inspect_storage() is None
+
+    def inspect_storage(self) -> Optional[str]:
+        """验证存储的时间戳并返回失败原因
+        
+        校验不加锁。其他线程或进程正在逐个替换时间戳文件时可能读到新旧
+        混合的文件，因此失败时在写锁与目录锁内重新校验一次，以无写入进行
+        时的结果为准。
+        
+        Returns:
+            Optional[str]: 时间戳有效时返回None，否则为失败代码：missing（有效文件
+                不足两个）、inconsistent（文件之间不一致）、rolled_back（文件被替换
+                为旧副本）、error（读取出错）
+        """
+        failure = self._inspect_storage()
+        if failure is None:
+            return None
+        with self._lock, self._file_lock(shared=True):
+            return self._inspect_storage()
+
+    def _inspect_storage(self) -> Optional[str]:
         try:
-            timestamps = []
             # 读取所有时间戳文件
-            for file in self.storage_dir.glob("timestamp_*.dat"):
-                with open(file, "rb") as f:
-                    encrypted_data = f.read()
-                # 解密时间戳
-                decrypted_data = self.fernet.decrypt(encrypted_data)
-                timestamp = float(decrypted_data.decode())
-                timestamps.append(timestamp)
+            timestamps = self._load_timestamps()
             
             # 检查是否至少有两个有效的时间戳
             if len(timestamps) < 2:
-                return False
+                return "missing"
                 
             # 检查时间戳是否一致
             first_timestamp = timestamps[0]
             for timestamp in timestamps[1:]:
                 if abs(timestamp - first_timestamp) > 1.0:  # 允许1秒的误差
-                    return False
+                    return "inconsistent"
+
+            # 写入不会降低磁盘上的时间戳，因此它不应早于曾在磁盘上见到过的
+            # 最大值，否则文件被替换为旧副本
+            latest = max(timestamps)
+            if latest < self._observed - 1.0:
+                return "rolled_back"
+            self._observed = max(self._observed, latest)
                     
-            return True
+            return None
             
-        except Exception as e:
-            print(f"时间戳验证失败: {e}")
-            return False
+        except Exception:
+            return "error"
         
     def update_timestamps(self):
-        """更新所有时间戳"""
-        self._create_encrypted_files() 
\ No newline at end of file
+        """更新所有时间戳
+        
+        写回模式下只推进内存高水位，距上次落盘超过 flush_interval 时才写盘。
+        """
+        with self._lock:
+            self._high_water = max(self._high_water, time.time())
+            self._dirty = True
+            if (self.flush_interval > 0 and
+                    time.monotonic() - self._last_flush < self.flush_interval):
+                return
+            self._flush_locked()
+
+    def flush(self):
+        """将内存中的时间戳高水位立即写盘"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._dirty:
+            return
+        self._create_encrypted_files(self._high_water)
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """写入未落盘的时间戳，在服务关闭时调用"""
+        self.flush() 
\ No newline at end of file
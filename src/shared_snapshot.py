@@ -0,0 +1,583 @@
+"""预派生（pre-fork）部署下的共享许可证快照
+
+主进程用 LicenseValidator 完整验证全部许可证（时间、存储、签名），将权限
+索引编译为紧凑的只读哈希表写入快照文件；各工作进程以只读内存映射方式
+打开该文件，直接在映射内存上查找，不构造许可证模型、不验签，也不各自
+探测NTP或读写时间戳文件。映射页由操作系统在进程间共享，每个工作进程的
+额外内存与许可证数量无关。
+
+文件格式（所有整数为网络字节序）：
+    头部        HEADER，见下
+    HMAC        32字节，HMAC-SHA256(密钥, 头部 + 槽位表 + 条目)
+    槽位表      n_slots 个4字节的条目偏移，0表示空槽；按 crc32(键) 开放寻址
+    条目        key_len(2) value_len(4) 键 值
+
+键以一个字节的类型开头，其后各部分以 \\0 分隔：
+    L 许可证ID                           -> not_before(8) not_after(8) JSON（客户、metadata、路径模板）
+    R 许可证ID                           -> 验证失败的 JSON {stage, reason}
+    C 客户ID / T 租户ID                   -> 过期时间最晚的有效许可证ID
+    F 许可证ID 功能ID 功能类型             -> 1字节启用状态
+    A 许可证ID 方法 路径 / S 许可证ID 服务 端点 / U 许可证ID 组件 / B 许可证ID 按钮 -> 1字节
+    M 许可证ID 指标                       -> current_value(8) max_value(8)
+
+快照必须带 HMAC：能写入快照目录的进程不一定可信，工作进程只接受用共享
+密钥校验通过的快照，打开时还会检查全部槽位和条目都落在文件范围内。
+
+用法（gunicorn）：
+    def on_starting(server):
+        server.publisher = SnapshotPublisher("run/licenses.snap", validator, store, snapshot_key, ttl=60.0)
+        server.publisher.start()
+
+    def post_fork(server, worker):
+        global licenses
+        licenses = SharedLicenseView("run/licenses.snap", snapshot_key)
+"""
+import hashlib
+import hmac
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from license_models import License, APIPermission, FeatureType, _enum_value
+from license_validator import LicenseValidator
+from route_matcher import RouteMatcher
+from secure_time_storage import _stat_signature
+from validation_result import ValidationReason, ValidationResult, STAGE_SNAPSHOT, STAGE_VALIDITY
+
+MAGIC = b"NCLS"
+VERSION = 1
+FLAG_HMAC = 0x01
+# magic version flags reserved 发布时系统时间 发布时单调时间 有效期 槽位数 条目数
+HEADER = struct.Struct("!4sBBHdddII")
+MAC_SIZE = 32
+SLOT = struct.Struct("!I")
+ENTRY = struct.Struct("!HI")
+RECORD = struct.Struct("!dd")
+LIMIT = struct.Struct("!qq")
+
+_TRUE = b"\x01"
+_FALSE = b"\x00"
+
+LicenseSource = Union[Iterable[License], Callable[[], Iterable[License]]]
+
+def _key(kind: bytes, *parts: str) -> bytes:
+    return kind + b"\x00".join(part.encode("utf-8") for part in parts)
+
+def _compile_license(license_obj: License) -> List[Tuple[bytes, bytes]]:
+    """将已验证的许可证编译为快照条目，匹配规则与 PermissionIndex 一致"""
+    license_id = license_obj.license_id
+    index = license_obj.permission_index
+    entries = []
+    templates = [
+        [f.method, f.path, f.enabled] for f in license_obj.features
+        if isinstance(f, APIPermission) and f.is_template
+    ]
+    record = {
+        'customer_id': license_obj.customer_id,
+        'metadata': license_obj.metadata,
+        'templates': templates,
+    }
+    entries.append((
+        _key(b"L", license_id),
+        RECORD.pack(license_obj.not_before.timestamp(), license_obj.not_after.timestamp()) +
+        json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    ))
+    for (feature_id, feature_type), enabled in index.features.items():
+        entries.append((_key(b"F", license_id, feature_id, feature_type), _TRUE if enabled else _FALSE))
+    for (method, path), enabled in index.apis.items():
+        entries.append((_key(b"A", license_id, method, path), _TRUE if enabled else _FALSE))
+    for (service_name, endpoint), enabled in index.services.items():
+        entries.append((_key(b"S", license_id, service_name, endpoint), _TRUE if enabled else _FALSE))
+    for component_id, visible in index.ui_components.items():
+        entries.append((_key(b"U", license_id, component_id), _TRUE if visible else _FALSE))
+    for button_id, enabled in index.buttons.items():
+        entries.append((_key(b"B", license_id, button_id), _TRUE if enabled else _FALSE))
+    for metric_type, (current_value, max_value) in index.usage_limits.items():
+        entries.append((_key(b"M", license_id, metric_type), LIMIT.pack(current_value, max_value)))
+    return entries
+
+def _require_key(secret_key: Optional[bytes]) -> bytes:
+    if not secret_key:
+        raise ValueError("许可证快照必须设置 secret_key")
+    return secret_key
+
+def build_snapshot(entries: List[Tuple[bytes, bytes]], ttl: float, secret_key: bytes) -> bytes:
+    """将条目编码为快照文件内容
+
+    Args:
+        entries: (键, 值) 列表，键不能重复
+        ttl: 快照有效期（秒），从发布时起算
+        secret_key: HMAC 密钥
+
+    Returns:
+        bytes: 文件内容
+
+    Raises:
+        ValueError: 快照超过4GB
+    """
+    n_slots = 8
+    while n_slots < len(entries) * 2:
+        n_slots *= 2
+    slots = [0] * n_slots
+    data_offset = HEADER.size + MAC_SIZE + SLOT.size * n_slots
+    chunks = []
+    offset = data_offset
+    for key, value in entries:
+        i = zlib.crc32(key) % n_slots
+        while slots[i]:
+            i = (i + 1) % n_slots
+        slots[i] = offset
+        chunk = ENTRY.pack(len(key), len(value)) + key + value
+        chunks.append(chunk)
+        offset += len(chunk)
+    if offset >= 1 << 32:
+        raise ValueError("许可证快照超过4GB")
+
+    header = HEADER.pack(
+        MAGIC, VERSION, FLAG_HMAC, 0, time.time(), time.monotonic(), ttl, n_slots, len(entries)
+    )
+    body = struct.pack(f"!{n_slots}I", *slots) + b"".join(chunks)
+    mac = hmac.new(_require_key(secret_key), header + body, hashlib.sha256).digest()
+    return header + mac + body
+
+class SnapshotPublisher:
+    """在主进程中验证许可证并发布共享快照
+
+    每次发布都通过 LicenseValidator 完整验证全部许可证，签名验证结果由其
+    签名缓存复用，重新发布时通常只执行时间与存储校验。快照先写入临时
+    文件再原子替换，已打开旧快照的工作进程不受影响，并会在下次检查时
+    切换到新快照。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        validator: LicenseValidator,
+        source: LicenseSource,
+        secret_key: bytes,
+        ttl: float = 60.0,
+        interval: Optional[float] = None,
+        tenant_key: str = "tenant_id"
+    ):
+        """初始化快照发布者
+
+        Args:
+            path: 快照文件路径
+            validator: 主进程的验证器
+            source: 许可证列表，或返回许可证列表的无参函数（如
+                lambda: store.snapshot.by_id.values()），每次发布时重新读取
+            secret_key: HMAC 密钥，工作进程使用同一密钥打开快照
+            ttl: 快照有效期（秒）。主进程停止发布超过该时间后，工作进程的
+                检查全部失败
+            interval: 后台重新发布的间隔（秒），默认为 ttl 的三分之一
+            tenant_key: metadata 中表示租户ID的键
+
+        Raises:
+            ValueError: 未设置 secret_key
+        """
+        self.secret_key = _require_key(secret_key)
+        self.path = path
+        self.validator = validator
+        self.source = source
+        self.ttl = ttl
+        self.interval = interval if interval is not None else ttl / 3
+        self.tenant_key = tenant_key
+        self.published = 0
+        self.last_results: Dict[str, ValidationResult] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self) -> Dict[str, ValidationResult]:
+        """验证全部许可证并发布新快照
+
+        Returns:
+            Dict[str, ValidationResult]: 许可证ID -> 验证结果
+        """
+        with self._lock:
+            licenses = self.source() if callable(self.source) else self.source
+            entries: List[Tuple[bytes, bytes]] = []
+            results: Dict[str, ValidationResult] = {}
+            latest: Dict[bytes, License] = {}
+            for license_obj in licenses:
+                if license_obj.license_id in results:
+                    continue
+                result = self.validator.validate_license_detailed(license_obj)
+                results[license_obj.license_id] = result
+                if not result.valid:
+                    entries.append((
+                        _key(b"R", license_obj.license_id),
+                        json.dumps({'stage': result.stage, 'reason': result.reason.value}).encode("utf-8")
+                    ))
+                    continue
+                entries.extend(_compile_license(license_obj))
+                lookups = [_key(b"C", license_obj.customer_id)]
+                tenant_id = license_obj.metadata.get(self.tenant_key)
+                if tenant_id is not None:
+                    lookups.append(_key(b"T", tenant_id))
+                for key in lookups:
+                    # 同一客户/租户取过期时间最晚的许可证
+                    current = latest.get(key)
+                    if current is None or license_obj.not_after > current.not_after:
+                        latest[key] = license_obj
+            for key, license_obj in latest.items():
+                entries.append((key, license_obj.license_id.encode("utf-8")))
+
+            data = build_snapshot(entries, self.ttl, self.secret_key)
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot_")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self.published += 1
+            self.last_results = results
+            return results
+
+    def _publish_loop(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"许可证快照发布失败: {e}")
+
+    def start(self):
+        """立即发布一次并启动后台重新发布线程"""
+        self.publish()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._publish_loop, name="license-snapshot-publish", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台重新发布线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+class _MappedSnapshot:
+    """已打开的快照文件"""
+
+    __slots__ = ('mm', 'stat', 'published_at', 'expires', 'offset', 'n_slots', 'n_entries', 'data_offset')
+
+    def __init__(self, path: str, secret_key: bytes):
+        with open(path, "rb") as f:
+            self.stat = _stat_signature(os.fstat(f.fileno()))
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self.mm) < HEADER.size + MAC_SIZE:
+                raise ValueError("许可证快照长度不足")
+            magic, version, flags, _, published_at, published_mono, ttl, n_slots, n_entries = \
+                HEADER.unpack_from(self.mm)
+            if magic != MAGIC:
+                raise ValueError("不是许可证快照文件")
+            if version != VERSION:
+                raise ValueError(f"不支持的许可证快照版本: {version}")
+            if not flags & FLAG_HMAC:
+                raise ValueError("许可证快照未签名")
+            mac = hmac.new(secret_key, self.mm[:HEADER.size], hashlib.sha256)
+            with memoryview(self.mm) as view:
+                mac.update(view[HEADER.size + MAC_SIZE:])
+            if not hmac.compare_digest(mac.digest(), self.mm[HEADER.size:HEADER.size + MAC_SIZE]):
+                raise ValueError("许可证快照完整性校验失败")
+            self._check_bounds(n_slots, n_entries)
+        except BaseException:
+            self.mm.close()
+            raise
+        self.published_at = published_at
+        # 单调时钟在同一主机的进程间一致
+        self.expires = published_mono + ttl
+        self.offset = published_at - published_mono
+        self.n_slots = n_slots
+        self.n_entries = n_entries
+
+    def _check_bounds(self, n_slots: int, n_entries: int) -> None:
+        """检查槽位表在文件范围内、留有空槽（查找不会死循环），且槽位偏移不越界
+
+        条目内的键、值长度在查找时检查。
+        """
+        size = len(self.mm)
+        data_offset = HEADER.size + MAC_SIZE + SLOT.size * n_slots
+        if not 0 <= n_entries < n_slots or data_offset > size:
+            raise ValueError("许可证快照槽位表无效")
+        slots = array("I", self.mm[HEADER.size + MAC_SIZE:data_offset])
+        if sys.byteorder == "little":
+            slots.byteswap()
+        if slots.count(0) != n_slots - n_entries:
+            raise ValueError("许可证快照条目数不一致")
+        if n_entries and max(slots) > size - ENTRY.size:
+            raise ValueError("许可证快照条目偏移越界")
+        self.data_offset = data_offset
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        mm = self.mm
+        n_slots = self.n_slots
+        i = zlib.crc32(key) % n_slots
+        slots_offset = HEADER.size + MAC_SIZE
+        while True:
+            offset = SLOT.unpack_from(mm, slots_offset + i * 4)[0]
+            if not offset:
+                return None
+            if offset < self.data_offset:
+                return None
+            key_len, value_len = ENTRY.unpack_from(mm, offset)
+            start = offset + ENTRY.size
+            if start + key_len + value_len > len(mm):
+                return None
+            if key_len == len(key) and mm[start:start + key_len] == key:
+                return mm[start + key_len:start + key_len + value_len]
+            i = (i + 1) % n_slots
+
+    def close(self):
+        self.mm.close()
+
+class SharedLicenseView:
+    """在工作进程中读取主进程发布的共享快照
+
+    检查直接在内存映射上完成，不构造许可证模型、不验签。快照过期（主进程
+    停止发布）或系统时间相对单调时钟的漂移超过容差时，所有检查失败，直到
+    主进程发布新快照。路径模板按许可证在首次使用时编译，保留在有界的
+    缓存中。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        secret_key: bytes,
+        check_interval: float = 1.0,
+        skew_tolerance: float = 1.0,
+        max_route_cache: int = 64
+    ):
+        """打开共享快照
+
+        Args:
+            path: 快照文件路径
+            secret_key: HMAC 密钥，与发布者一致
+            check_interval: 检查快照文件是否被替换的最小间隔（秒）
+            skew_tolerance: 系统时间相对单调时钟的最大漂移（秒）
+            max_route_cache: 最多缓存路径模板的许可证数
+
+        Raises:
+            ValueError: 未设置 secret_key
+        """
+        self.path = path
+        self.secret_key = _require_key(secret_key)
+        self.check_interval = check_interval
+        self.skew_tolerance = skew_tolerance
+        self.max_route_cache = max_route_cache
+        self.reloads = 0
+        self._snapshot: Optional[_MappedSnapshot] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._routes: "OrderedDict[Tuple[tuple, str], Optional[RouteMatcher]]" = OrderedDict()
+        self._current()
+
+    def _reload(self) -> None:
+        with self._lock:
+            try:
+                stat = _stat_signature(os.stat(self.path))
+            except FileNotFoundError:
+                return
+            if self._snapshot is not None and self._snapshot.stat == stat:
+                return
+            try:
+                snapshot = _MappedSnapshot(self.path, self.secret_key)
+            except (OSError, ValueError) as e:
+                print(f"许可证快照打开失败: {e}")
+                return
+            # 旧映射不主动关闭，可能仍有线程在读取，由垃圾回收释放
+            self._snapshot = snapshot
+            self._routes.clear()
+            self.reloads += 1
+
+    def _current(self) -> Optional[_MappedSnapshot]:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self._reload()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.expires < now:
+            # 已过期，可能刚发布了新快照
+            self._reload()
+            snapshot = self._snapshot
+        return snapshot
+
+    def _stale_reason(self, snapshot: Optional[_MappedSnapshot]) -> Optional[ValidationReason]:
+        """快照不可用的原因，可用时返回None"""
+        if snapshot is None:
+            return ValidationReason.SNAPSHOT_STALE
+        now = time.monotonic()
+        if now >= snapshot.expires:
+            return ValidationReason.SNAPSHOT_STALE
+        if abs(time.time() - now - snapshot.offset) > self.skew_tolerance:
+            # 发布后系统时间被调整，快照中的有效期判断不再可信
+            return ValidationReason.CLOCK_SKEW
+        return None
+
+    def _fresh(self) -> Optional[_MappedSnapshot]:
+        """当前未过期且时钟无漂移的快照"""
+        snapshot = self._current()
+        return snapshot if self._stale_reason(snapshot) is None else None
+
+    def validate_license_detailed(self, license_id: str) -> ValidationResult:
+        """检查许可证在快照中是否有效且当前在有效期内
+
+        Returns:
+            ValidationResult: 验证结果，timings 为空
+        """
+        snapshot = self._current()
+        reason = self._stale_reason(snapshot)
+        if reason is not None:
+            return ValidationResult(False, reason, STAGE_SNAPSHOT, {})
+        record = snapshot.get(_key(b"L", license_id))
+        if record is None:
+            rejected = snapshot.get(_key(b"R", license_id))
+            if rejected is None:
+                return ValidationResult(False, ValidationReason.UNKNOWN_LICENSE, STAGE_SNAPSHOT, {})
+            info = json.loads(rejected)
+            return ValidationResult(False, ValidationReason(info['reason']), info['stage'], {})
+        not_before, not_after = RECORD.unpack_from(record)
+        now = time.time()
+        if now < not_before:
+            return ValidationResult(False, ValidationReason.NOT_YET_VALID, STAGE_VALIDITY, {})
+        if now > not_after:
+            return ValidationResult(False, ValidationReason.EXPIRED, STAGE_VALIDITY, {})
+        return ValidationResult(True, ValidationReason.OK, None, {})
+
+    def validate_license(self, license_id: str) -> bool:
+        """检查许可证是否有效"""
+        return self._valid_snapshot(license_id) is not None
+
+    def _valid_snapshot(self, license_id: str) -> Optional[_MappedSnapshot]:
+        snapshot = self._fresh()
+        if snapshot is None:
+            return None
+        record = snapshot.get(_key(b"L", license_id))
+        if record is None:
+            return None
+        not_before, not_after = RECORD.unpack_from(record)
+        if not (not_before <= time.time() <= not_after):
+            return None
+        return snapshot
+
+    def _flag(self, license_id: str, key: bytes) -> bool:
+        snapshot = self._valid_snapshot(license_id)
+        return snapshot is not None and snapshot.get(key) == _TRUE
+
+    def check_feature(self, license_id: str, feature_id: str, feature_type: FeatureType) -> bool:
+        """检查特定功能是否可用"""
+        return self._flag(license_id, _key(b"F", license_id, feature_id, _enum_value(feature_type)))
+
+    def check_api_permission(self, license_id: str, method: str, path: str) -> bool:
+        """检查API权限，精确路径优先，其次按路径模板匹配"""
+        snapshot = self._valid_snapshot(license_id)
+        if snapshot is None:
+            return False
+        enabled = snapshot.get(_key(b"A", license_id, method, path))
+        if enabled is not None:
+            return enabled == _TRUE
+        routes = self._route_matcher(snapshot, license_id)
+        return routes is not None and routes.match(method, path, False)
+
+    def _route_matcher(self, snapshot: _MappedSnapshot, license_id: str) -> Optional[RouteMatcher]:
+        cache_key = (snapshot.stat, license_id)
+        try:
+            return self._routes[cache_key]
+        except KeyError:
+            pass
+        record = snapshot.get(_key(b"L", license_id))
+        templates = json.loads(record[RECORD.size:])['templates']
+        routes = None
+        if templates:
+            routes = RouteMatcher()
+            for method, template, enabled in templates:
+                routes.insert(method, template, enabled)
+        with self._lock:
+            self._routes[cache_key] = routes
+            while len(self._routes) > self.max_route_cache:
+                self._routes.popitem(last=False)
+        return routes
+
+    def check_service_permission(self, license_id: str, service_name: str, endpoint: str) -> bool:
+        """检查微服务权限"""
+        return self._flag(license_id, _key(b"S", license_id, service_name, endpoint))
+
+    def check_ui_permission(self, license_id: str, component_id: str) -> bool:
+        """检查UI组件权限"""
+        return self._flag(license_id, _key(b"U", license_id, component_id))
+
+    def check_button_permission(self, license_id: str, button_id: str) -> bool:
+        """检查按钮权限"""
+        return self._flag(license_id, _key(b"B", license_id, button_id))
+
+    def check_usage_limit(self, license_id: str, metric_type: str, value: int = 1) -> bool:
+        """检查使用限制（按许可证中的 current_value，未设置限制时视为通过）"""
+        snapshot = self._valid_snapshot(license_id)
+        if snapshot is None:
+            return False
+        limit = snapshot.get(_key(b"M", license_id, metric_type))
+        if limit is None:
+            return True
+        current_value, max_value = LIMIT.unpack(limit)
+        return current_value + value <= max_value
+
+    def license_for_customer(self, customer_id: str) -> Optional[str]:
+        """客户过期时间最晚的有效许可证ID"""
+        snapshot = self._fresh()
+        value = snapshot.get(_key(b"C", customer_id)) if snapshot is not None else None
+        return value.decode("utf-8") if value is not None else None
+
+    def license_for_tenant(self, tenant_id: str) -> Optional[str]:
+        """租户过期时间最晚的有效许可证ID"""
+        snapshot = self._fresh()
+        value = snapshot.get(_key(b"T", tenant_id)) if snapshot is not None else None
+        return value.decode("utf-8") if value is not None else None
+
+    def metadata(self, license_id: str) -> Optional[Dict[str, str]]:
+        """许可证的 metadata，许可证不在快照中时返回None"""
+        snapshot = self._fresh()
+        record = snapshot.get(_key(b"L", license_id)) if snapshot is not None else None
+        return json.loads(record[RECORD.size:])['metadata'] if record is not None else None
+
+    def stats(self) -> dict:
+        """获取快照信息
+
+        Returns:
+            dict: 包含 attached、published_at、expires_in、entries、size、reloads
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'attached': False, 'reloads': self.reloads}
+        return {
+            'attached': True,
+            'published_at': datetime.fromtimestamp(snapshot.published_at).isoformat(),
+            'expires_in': snapshot.expires - time.monotonic(),
+            'entries': snapshot.n_entries,
+            'size': len(snapshot.mm),
+            'reloads': self.reloads
+        }
+
+    def close(self) -> None:
+        """释放内存映射"""
+        with self._lock:
+            if self._snapshot is not None:
+                self._snapshot.close()
+                self._snapshot = None
@@ -0,0 +1,128 @@
+from typing import Dict, Optional
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, padding, rsa
+
+class SignatureSuite:
+    """签名算法套件
+
+    许可证通过 signature_algorithm 字段记录套件名称，验证器据此直接选择
+    验证算法，并要求公钥类型与套件匹配。
+    """
+
+    name = ""
+
+    def supports_key(self, key) -> bool:
+        """密钥（公钥或私钥）类型是否适用于本套件"""
+        raise NotImplementedError
+
+    def sign(self, private_key, data: bytes) -> bytes:
+        """签名
+
+        Args:
+            private_key: 私钥
+            data: 待签名内容
+
+        Returns:
+            bytes: 签名
+        """
+        raise NotImplementedError
+
+    def verify(self, public_key, signature: bytes, data: bytes) -> None:
+        """验证签名
+
+        Raises:
+            cryptography.exceptions.InvalidSignature: 签名无效
+        """
+        raise NotImplementedError
+
+    def generate_private_key(self):
+        """生成适用于本套件的私钥"""
+        raise NotImplementedError
+
+class RSAPSSSuite(SignatureSuite):
+    """RSA-PSS / SHA256，盐长度取最大值"""
+
+    name = "rsa-pss-sha256"
+
+    def __init__(self):
+        self._padding = padding.PSS(
+            mgf=padding.MGF1(hashes.SHA256()),
+            salt_length=padding.PSS.MAX_LENGTH
+        )
+
+    def supports_key(self, key) -> bool:
+        return isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey))
+
+    def sign(self, private_key, data: bytes) -> bytes:
+        return private_key.sign(data, self._padding, hashes.SHA256())
+
+    def verify(self, public_key, signature: bytes, data: bytes) -> None:
+        public_key.verify(signature, data, self._padding, hashes.SHA256())
+
+    def generate_private_key(self):
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+class Ed25519Suite(SignatureSuite):
+    """Ed25519"""
+
+    name = "ed25519"
+
+    def supports_key(self, key) -> bool:
+        return isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey))
+
+    def sign(self, private_key, data: bytes) -> bytes:
+        return private_key.sign(data)
+
+    def verify(self, public_key, signature: bytes, data: bytes) -> None:
+        public_key.verify(signature, data)
+
+    def generate_private_key(self):
+        return ed25519.Ed25519PrivateKey.generate()
+
+class ECDSAP256Suite(SignatureSuite):
+    """ECDSA P-256 / SHA256"""
+
+    name = "ecdsa-p256-sha256"
+
+    def supports_key(self, key) -> bool:
+        return (isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)) and
+                isinstance(key.curve, ec.SECP256R1))
+
+    def sign(self, private_key, data: bytes) -> bytes:
+        return private_key.sign(data, ec.ECDSA(hashes.SHA256()))
+
+    def verify(self, public_key, signature: bytes, data: bytes) -> None:
+        public_key.verify(signature, data, ec.ECDSA(hashes.SHA256()))
+
+    def generate_private_key(self):
+        return ec.generate_private_key(ec.SECP256R1())
+
+SIGNATURE_SUITES: Dict[str, SignatureSuite] = {
+    suite.name: suite for suite in (RSAPSSSuite(), Ed25519Suite(), ECDSAP256Suite())
+}
+
+# 未记录 signature_algorithm 的许可证均为 RSA-PSS 签名
+DEFAULT_ALGORITHM = RSAPSSSuite.name
+
+def get_suite(name: Optional[str]) -> SignatureSuite:
+    """按名称获取签名套件，名称为空时返回默认套件
+
+    Raises:
+        ValueError: 未知的签名算法
+    """
+    suite = SIGNATURE_SUITES.get(name or DEFAULT_ALGORITHM)
+    if suite is None:
+        raise ValueError(f"未知的签名算法: {name}")
+    return suite
+
+def suite_for_key(key) -> SignatureSuite:
+    """根据密钥类型选择签名套件
+
+    Raises:
+        ValueError: 不支持的密钥类型
+    """
+    for suite in SIGNATURE_SUITES.values():
+        if suite.supports_key(key):
+            return suite
+    raise ValueError(f"不支持的密钥类型: {type(key).__name__}")
@@ -0,0 +1,707 @@
+"""跨副本的用量与限流汇总
+
+多个副本各自持有 LicenseValidator 时，按副本计数会使许可证级的 UsageLimit 与
+rate_limit 被放大为副本数倍。汇总模式下由一个协调进程（AggregatorServer）
+统一执行许可证级的上限，各副本通过 TCP 或 Unix 套接字以 JSON Lines 协议向其
+批量预留用量和令牌，之后在本地扣减；协调进程不可达时，各副本退回到本地的
+保底额度（上限的 fallback_share 比例），恢复连接后补记离线期间的用量。
+
+协调进程与副本共享一个密钥：连接建立时协调进程下发随机 nonce，之后每条
+请求和响应都附带 HMAC-SHA256(密钥, nonce + 方向 + 序号 + 内容)，无法伪造、
+重放或跨连接转发。用量上限与速率取自协调进程自己加载并验签的许可证
+（--licenses）；未配置时以副本首次上报的值为准并保存在用量数据库中，之后
+（包括协调进程重启后）不再接受修改。
+
+启动协调进程：
+    python src/usage_aggregator.py --listen unix:///run/license/aggregator.sock \
+        --secret-file /etc/license/aggregator.key \
+        --licenses /etc/license/licenses --public-key /etc/license/public_key.pem
+"""
+import os
+import hmac
+import json
+import hashlib
+import secrets
+import sqlite3
+import time
+import socket
+import argparse
+import threading
+import socketserver
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from license_models import License, APIPermission
+from rate_limiter import RateDecision, RateLimiter
+from usage_meter import UsageMeter
+
+DEFAULT_ADDRESS = "tcp://127.0.0.1:7380"
+
+_PINNED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pinned_limits (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+# 协调进程不可达或返回错误（如数据库被锁）时，副本均按不可达处理，使用本地保底额度
+AGGREGATOR_ERRORS = (ConnectionError, RuntimeError)
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """解析 tcp://host:port、host:port 或 unix:///path 形式的地址
+
+    Returns:
+        Tuple[int, Any]: (套接字地址族, 地址)
+    """
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address[len("unix://"):]
+    if address.startswith("tcp://"):
+        address = address[len("tcp://"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+def _sign(secret_key: bytes, nonce: bytes, direction: bytes, seq: int, payload: bytes) -> bytes:
+    """消息认证码（十六进制），绑定连接 nonce、方向与序号"""
+    message = b"%s\x00%s\x00%d\x00%s" % (nonce, direction, seq, payload)
+    return hmac.new(secret_key, message, hashlib.sha256).hexdigest().encode("ascii")
+
+def _check_amount(value: Any) -> int:
+    if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+        raise ValueError(f"数量必须为正整数: {value!r}")
+    return value
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.server.aggregator._connections.add(self.connection)
+
+    def finish(self):
+        self.server.aggregator._connections.discard(self.connection)
+        super().finish()
+
+    def handle(self):
+        aggregator = self.server.aggregator
+        secret_key = aggregator.secret_key
+        nonce = secrets.token_hex(16).encode("ascii")
+        self.wfile.write(json.dumps({"nonce": nonce.decode("ascii")}).encode("utf-8") + b"\n")
+        self.wfile.flush()
+        seq = 0
+        for line in self.rfile:
+            mac, _, payload = line.rstrip(b"\n").partition(b" ")
+            if not hmac.compare_digest(mac, _sign(secret_key, nonce, b"req", seq, payload)):
+                # 认证失败即断开，不响应
+                aggregator.auth_failures += 1
+                return
+            try:
+                response = aggregator.handle(json.loads(payload))
+            except Exception as e:
+                response = {"error": str(e) or type(e).__name__}
+            body = json.dumps(response).encode("utf-8")
+            self.wfile.write(_sign(secret_key, nonce, b"resp", seq, body) + b" " + body + b"\n")
+            self.wfile.flush()
+            seq += 1
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:
+    _UnixServer = None
+
+class AggregatorServer:
+    """用量与限流协调进程
+
+    用量计数保存在 UsageMeter 的 SQLite 数据库中，协调进程重启后不丢失；
+    令牌桶只保存在内存中，重启后按满桶重新开始。
+
+    上限与速率不信任副本上报的值：配置了 license_lookup 时取自协调进程自己
+    验签的许可证，查不到的许可证不分配额度；未配置时按 (许可证, 指标) 或
+    令牌桶键固定为首次上报的值，保存在用量数据库的 pinned_limits 表中，
+    重启后仍然有效。不带上限的请求（如旧版本副本的补记）不会固定上限。
+    """
+
+    def __init__(
+        self,
+        address: str = DEFAULT_ADDRESS,
+        db_path: str = "aggregator/usage.db",
+        secret_key: Optional[bytes] = None,
+        license_lookup: Optional[Callable[[str], Optional[License]]] = None,
+        period: float = 60.0,
+        burst_ratio: float = 1.0,
+        allow_reset: bool = False
+    ):
+        """初始化协调进程
+
+        Args:
+            address: 监听地址，tcp://host:port 或 unix:///path，端口为0时自动分配
+            db_path: 用量数据库路径
+            secret_key: 与副本共享的认证密钥，必填
+            license_lookup: 按许可证ID返回已验签许可证的函数（如 LicenseStore.get），
+                提供时上限与速率取自该许可证
+            period: rate_limit 对应的时间窗口（秒），与副本的 AggregatedRateLimiter 一致
+            burst_ratio: 桶容量相对 rate_limit 的倍数
+            allow_reset: 是否接受副本的 reset_usage 请求
+
+        Raises:
+            ValueError: 未设置 secret_key
+        """
+        if not secret_key:
+            raise ValueError("用量汇总服务必须设置 secret_key")
+        self.secret_key = secret_key
+        self.license_lookup = license_lookup
+        self.period = period
+        self.burst_ratio = burst_ratio
+        self.allow_reset = allow_reset
+        self.auth_failures = 0
+        self.meter = UsageMeter(db_path)
+        self.rate_limiter = RateLimiter()
+        self._connections = set()
+        self._lock = threading.Lock()
+        # 未配置 license_lookup 时首次上报的上限与速率，落库并在内存中缓存
+        self._pinned: Dict[tuple, tuple] = {}
+        self._pinned_db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._pinned_db.execute(_PINNED_SCHEMA)
+        family, bind_address = parse_address(address)
+        if family == socket.AF_UNIX:
+            if _UnixServer is None:
+                raise ValueError("当前平台不支持 Unix 套接字")
+            if os.path.exists(bind_address):
+                os.unlink(bind_address)
+            # 套接字只允许属主连接
+            umask = os.umask(0o177)
+            try:
+                self._server = _UnixServer(bind_address, _RequestHandler)
+            finally:
+                os.umask(umask)
+        else:
+            self._server = _TCPServer(bind_address, _RequestHandler)
+        self._server.aggregator = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        """实际监听的地址"""
+        bound = self._server.server_address
+        if isinstance(bound, tuple):
+            return f"tcp://{bound[0]}:{bound[1]}"
+        return f"unix://{bound}"
+
+    def _pin(self, key: tuple, value: Optional[tuple]) -> Optional[tuple]:
+        """返回已固定的值；尚未固定且 value 不为None时固定为 value"""
+        with self._lock:
+            pinned = self._pinned.get(key)
+            if pinned is not None:
+                return pinned
+            db_key = json.dumps(key)
+            if value is not None:
+                self._pinned_db.execute(
+                    "INSERT OR IGNORE INTO pinned_limits (key, value) VALUES (?, ?)", (db_key, json.dumps(value))
+                )
+            row = self._pinned_db.execute("SELECT value FROM pinned_limits WHERE key = ?", (db_key,)).fetchone()
+            if row is None:
+                return None
+            pinned = self._pinned[key] = tuple(json.loads(row[0]))
+            return pinned
+
+    def _usage_limit(self, request: Dict[str, Any]) -> Optional[Tuple[int, Optional[int]]]:
+        """(初始用量, 上限)，许可证未知时返回None"""
+        license_id, metric_type = request["license_id"], request["metric_type"]
+        if self.license_lookup is None:
+            initial = int(request.get("initial", 0))
+            if "max_value" not in request:
+                # 不带上限的请求只读取已固定的值，不能把上限固定为不限
+                return self._pin(("usage", license_id, metric_type), None) or (initial, None)
+            max_value = request["max_value"]
+            return self._pin(
+                ("usage", license_id, metric_type), (initial, None if max_value is None else int(max_value))
+            )
+        license_obj = self.license_lookup(license_id)
+        if license_obj is None:
+            return None
+        limit = license_obj.usage_limit(metric_type)
+        return limit if limit is not None else (0, None)
+
+    def _rate_limit(self, key: tuple, request: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """(桶容量, 每秒补充的令牌数)，许可证未知时返回None，未设置 rate_limit 时容量为0"""
+        if self.license_lookup is None:
+            return self._pin(("rate",) + key, (float(request["capacity"]), float(request["rate"])))
+        license_obj = self.license_lookup(key[0])
+        if license_obj is None:
+            return None
+        for feature in license_obj.features:
+            if isinstance(feature, APIPermission) and (feature.method, feature.path) == key[1:]:
+                if not feature.rate_limit:
+                    return (0.0, 0.0)
+                return max(1.0, feature.rate_limit * self.burst_ratio), feature.rate_limit / self.period
+        return None
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """处理单个已认证的请求"""
+        op = request.get("op")
+        if op == "batch":
+            return {"results": [self.handle(item) for item in request["items"]]}
+        if op == "ping":
+            return {"ok": True}
+        if op == "lease_usage":
+            limit = self._usage_limit(request)
+            if limit is None:
+                return {"granted": 0}
+            args = (request["license_id"], request["metric_type"])
+            # 先按请求量预留，接近上限时退回最小量
+            for amount in (_check_amount(request["amount"]), _check_amount(request["min_amount"])):
+                if self.meter.consume_counter(*args, amount, *limit):
+                    return {"granted": amount}
+            return {"granted": 0}
+        if op == "release_usage":
+            self.meter.release_counter(
+                request["license_id"], request["metric_type"], _check_amount(request["amount"])
+            )
+            return {"ok": True}
+        if op == "add_usage":
+            limit = self._usage_limit(request)
+            if limit is None:
+                return {"ok": False}
+            self.meter.add_counter(
+                request["license_id"], request["metric_type"], _check_amount(request["amount"]), limit[0]
+            )
+            return {"ok": True}
+        if op == "usage":
+            return {"used": self.meter.counter_value(request["license_id"], request["metric_type"])}
+        if op == "reset_usage":
+            if not self.allow_reset:
+                raise ValueError("协调进程未开启 reset_usage")
+            self.meter.reset_counter(request["license_id"], request.get("metric_type"))
+            return {"ok": True}
+        if op == "lease_rate":
+            key = tuple(request["key"])
+            limit = self._rate_limit(key, request)
+            if limit is None:
+                return {"granted": 0}
+            amount, min_amount = _check_amount(request["amount"]), _check_amount(request["min_amount"])
+            if not limit[0]:
+                return {"granted": amount}
+            decision = None
+            for amount in (amount, min_amount):
+                decision = self.rate_limiter.take(key, limit[0], limit[1], amount)
+                if decision.allowed:
+                    return {"granted": amount}
+            return {"granted": 0, "retry_after": decision.retry_after}
+        raise ValueError(f"未知的操作: {op}")
+
+    def serve_forever(self):
+        """在当前线程中处理请求，直到 stop()"""
+        self._server.serve_forever()
+
+    def start(self) -> "AggregatorServer":
+        """在后台线程中处理请求"""
+        self._thread = threading.Thread(target=self.serve_forever, name="usage-aggregator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务并关闭数据库"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        # 断开已建立的连接，客户端随即进入保底模式
+        for connection in list(self._connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if isinstance(self._server.server_address, str) and os.path.exists(self._server.server_address):
+            os.unlink(self._server.server_address)
+        self.meter.close()
+        self._pinned_db.close()
+
+class AggregatorClient:
+    """协调进程客户端
+
+    持有一条长连接，请求串行发送。连接失败后在 retry_interval 秒内不再尝试，
+    直接抛出 ConnectionError，由调用方使用本地保底额度。
+    """
+
+    def __init__(
+        self,
+        address: str = DEFAULT_ADDRESS,
+        timeout: float = 1.0,
+        retry_interval: float = 5.0,
+        secret_key: Optional[bytes] = None
+    ):
+        """
+        Args:
+            address: 协调进程地址
+            timeout: 连接与请求超时（秒）
+            retry_interval: 连接失败后的重试间隔（秒）
+            secret_key: 与协调进程共享的认证密钥，必填
+
+        Raises:
+            ValueError: 未设置 secret_key
+        """
+        if not secret_key:
+            raise ValueError("用量汇总客户端必须设置 secret_key")
+        self.secret_key = secret_key
+        self.address = address
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._nonce = b""
+        self._seq = 0
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """是否不在失败退避期内"""
+        return time.monotonic() >= self._down_until
+
+    def _connect(self):
+        family, address = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except BaseException:
+            sock.close()
+            raise
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+        try:
+            greeting = self._file.readline()
+            if not greeting:
+                raise ConnectionResetError("连接已关闭")
+            self._nonce = json.loads(greeting)["nonce"].encode("ascii")
+        except (ValueError, KeyError, AttributeError) as e:
+            self._disconnect()
+            raise ConnectionResetError(f"协调进程握手无效: {e}") from e
+        except BaseException:
+            self._disconnect()
+            raise
+        self._seq = 0
+
+    def _disconnect(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+        self._file = None
+
+    def request(self, op: str, **fields: Any) -> Dict[str, Any]:
+        """发送请求并等待响应
+
+        Raises:
+            ConnectionError: 协调进程不可达
+            RuntimeError: 协调进程返回错误
+        """
+        with self._lock:
+            if not self.available:
+                raise ConnectionError(f"用量汇总服务不可用: {self.address}")
+            payload = json.dumps(dict(fields, op=op)).encode("utf-8")
+            # 复用的连接可能已被对端关闭（如协调进程重启），失败时重连一次
+            for attempt in (0, 1):
+                reused = self._file is not None
+                try:
+                    if not reused:
+                        self._connect()
+                    seq = self._seq
+                    self._file.write(_sign(self.secret_key, self._nonce, b"req", seq, payload) + b" " + payload + b"\n")
+                    self._file.flush()
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionResetError("连接已关闭")
+                    mac, _, line = line.rstrip(b"\n").partition(b" ")
+                    if not hmac.compare_digest(mac, _sign(self.secret_key, self._nonce, b"resp", seq, line)):
+                        raise ConnectionResetError("响应认证失败")
+                    self._seq = seq + 1
+                    break
+                except OSError as e:
+                    self._disconnect()
+                    if reused and attempt == 0:
+                        continue
+                    self._down_until = time.monotonic() + self.retry_interval
+                    raise ConnectionError(f"用量汇总服务不可用: {self.address}: {e}") from e
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+class AggregatedUsageMeter:
+    """经协调进程汇总的用量计数器，接口与 UsageMeter 相同
+
+    每次向协调进程预留 lease_size 个单位并在本地扣减。协调进程不可达或返回
+    错误时，每个指标在本地最多放行上限的 fallback_share 比例，恢复后补记。
+    """
+
+    def __init__(self, client: AggregatorClient, lease_size: int = 10, fallback_share: float = 0.1):
+        """
+        Args:
+            client: 协调进程客户端
+            lease_size: 每次预留的单位数
+            fallback_share: 协调进程不可达时本副本可放行的上限比例，通常取 1 / 副本数
+        """
+        self.client = client
+        self.lease_size = max(1, lease_size)
+        self.fallback_share = fallback_share
+        self._lock = threading.Lock()
+        # (license_id, metric_type) -> 已预留未使用的单位数
+        self._leases: Dict[Tuple[str, str], int] = {}
+        # (license_id, metric_type) -> (离线期间的用量, 初始用量, 上限)，待补记
+        self._offline: Dict[Tuple[str, str], Tuple[int, int, Optional[int]]] = {}
+        # (license_id, metric_type) -> 本次不可用期间按保底额度放行的用量，预留成功后清零
+        self._fallback: Dict[Tuple[str, str], int] = {}
+
+    def _reconcile_locked(self):
+        """补记离线期间的用量"""
+        if not self._offline:
+            return
+        # 带上上限，协调进程重启后首先收到补记时也按许可证的上限固定
+        items = [
+            {"op": "add_usage", "license_id": key[0], "metric_type": key[1], "amount": amount,
+             "initial": initial, "max_value": max_value}
+            for key, (amount, initial, max_value) in self._offline.items() if amount > 0
+        ]
+        if items:
+            self.client.request("batch", items=items)
+        self._offline.clear()
+
+    def consume(self, license_obj: License, metric_type: str, value: int = 1) -> bool:
+        """占用用量，见 UsageMeter.consume"""
+        if value <= 0:
+            raise ValueError(f"占用量必须为正数: {value}")
+        limit = license_obj.usage_limit(metric_type)
+        initial, max_value = limit if limit is not None else (0, None)
+        key = (license_obj.license_id, metric_type)
+        with self._lock:
+            available = self._leases.get(key, 0)
+            if available >= value:
+                self._leases[key] = available - value
+                return True
+            need = value - available
+            try:
+                self._reconcile_locked()
+                granted = self.client.request(
+                    "lease_usage", license_id=key[0], metric_type=metric_type,
+                    initial=initial, max_value=max_value,
+                    amount=max(need, self.lease_size), min_amount=need
+                )["granted"]
+            except AGGREGATOR_ERRORS:
+                # 补记可能成功而预留失败（协调进程返回错误），保底额度单独计算
+                fallback = self._fallback.get(key, 0)
+                if max_value is not None and fallback + need > int(max_value * self.fallback_share):
+                    return False
+                offline = self._offline.get(key, (0,))[0]
+                self._offline[key] = (offline + need, initial, max_value)
+                self._fallback[key] = fallback + need
+                # 本次占用先用完已预留的 available 个单位（协调进程已计为已用，
+                # 不需归还也不需补记），不足的 need 个单位由保底额度放行
+                self._leases.pop(key, None)
+                return True
+            self._fallback.pop(key, None)
+            if granted < need:
+                return False
+            self._leases[key] = available + granted - value
+            return True
+
+    def release(self, license_obj: License, metric_type: str, value: int = 1) -> None:
+        """释放用量，见 UsageMeter.release"""
+        if value <= 0:
+            raise ValueError(f"释放量必须为正数: {value}")
+        key = (license_obj.license_id, metric_type)
+        with self._lock:
+            offline, initial, max_value = self._offline.get(key, (0, 0, None))
+            if offline:
+                # 优先抵消尚未补记的离线用量
+                offset = min(offline, value)
+                self._offline[key] = (offline - offset, initial, max_value)
+                value -= offset
+            available = self._leases.get(key, 0) + value
+            keep = min(available, self.lease_size - 1)
+            if available > keep:
+                try:
+                    self.client.request(
+                        "release_usage", license_id=key[0], metric_type=metric_type, amount=available - keep
+                    )
+                except AGGREGATOR_ERRORS:
+                    keep = available
+            self._leases[key] = keep
+
+    def used(self, license_obj: License, metric_type: str) -> int:
+        """许可证范围内的已用量，协调进程不可达时只能返回本地估计值"""
+        limit = license_obj.usage_limit(metric_type)
+        initial = limit[0] if limit is not None else 0
+        key = (license_obj.license_id, metric_type)
+        with self._lock:
+            offline = self._offline.get(key, (0, 0))[0]
+            leased = self._leases.get(key, 0)
+            try:
+                used = self.client.request("usage", license_id=key[0], metric_type=metric_type)["used"]
+            except AGGREGATOR_ERRORS:
+                return initial + offline
+        return (initial if used is None else used) - leased + offline
+
+    def check(self, license_obj: License, metric_type: str, value: int = 1) -> bool:
+        """检查再占用 value 是否仍在上限内，不占用"""
+        limit = license_obj.usage_limit(metric_type)
+        if limit is None:
+            return True
+        return self.used(license_obj, metric_type) + value <= limit[1]
+
+    def reset(self, license_obj: License, metric_type: Optional[str] = None) -> None:
+        """重置许可证范围内的用量"""
+        with self._lock:
+            self.client.request("reset_usage", license_id=license_obj.license_id, metric_type=metric_type)
+            for key in [k for k in list(self._leases) + list(self._offline)
+                        if k[0] == license_obj.license_id and metric_type in (None, k[1])]:
+                self._leases.pop(key, None)
+                self._offline.pop(key, None)
+                self._fallback.pop(key, None)
+
+    def flush(self) -> None:
+        """补记离线用量并归还预留的单位"""
+        with self._lock:
+            self._reconcile_locked()
+            items = [
+                {"op": "release_usage", "license_id": key[0], "metric_type": key[1], "amount": amount}
+                for key, amount in self._leases.items() if amount > 0
+            ]
+            if items:
+                self.client.request("batch", items=items)
+            self._leases.clear()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        except AGGREGATOR_ERRORS as e:
+            print(f"用量归还失败: {e}")
+        self.client.close()
+
+class AggregatedRateLimiter:
+    """经协调进程汇总的令牌桶限流器，接口与 RateLimiter 相同
+
+    令牌桶在协调进程中按许可证范围的 rate_limit 补充，副本每次预留
+    lease_size 个令牌，在 lease_ttl 秒内于本地使用，过期作废。协调进程
+    不可达时使用本地令牌桶，速率与容量为许可证值的 fallback_share 比例。
+    """
+
+    def __init__(
+        self,
+        client: AggregatorClient,
+        period: float = 60.0,
+        burst_ratio: float = 1.0,
+        lease_size: int = 10,
+        lease_ttl: float = 1.0,
+        fallback_share: float = 0.1
+    ):
+        """
+        Args:
+            client: 协调进程客户端
+            period: rate_limit 对应的时间窗口（秒）
+            burst_ratio: 桶容量相对 rate_limit 的倍数
+            lease_size: 每次预留的令牌数
+            lease_ttl: 预留令牌的有效期（秒）
+            fallback_share: 协调进程不可达时本副本可用的速率比例，通常取 1 / 副本数
+        """
+        self.client = client
+        self.period = period
+        self.burst_ratio = burst_ratio
+        self.lease_size = lease_size
+        self.lease_ttl = lease_ttl
+        self.fallback = RateLimiter(period=period / fallback_share, burst_ratio=burst_ratio * fallback_share)
+        self._lock = threading.Lock()
+        # 令牌桶键 -> [预留未使用的令牌数, 过期时间]
+        self._leases: Dict[tuple, list] = {}
+
+    def acquire(self, license_obj: License, method: str, path: str, tokens: float = 1) -> RateDecision:
+        """申请令牌，见 RateLimiter.acquire"""
+        feature = license_obj.find_api_permission(method, path)
+        if feature is None or not feature.rate_limit:
+            return RateDecision(True, None, None)
+        key = (license_obj.license_id, feature.method, feature.path)
+        now = time.monotonic()
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[1] > now and lease[0] >= tokens:
+                lease[0] -= tokens
+                return RateDecision(True, None, lease[0])
+
+        try:
+            response = self.client.request(
+                "lease_rate", key=list(key),
+                capacity=max(1.0, feature.rate_limit * self.burst_ratio),
+                rate=feature.rate_limit / self.period,
+                amount=max(tokens, self.lease_size), min_amount=tokens
+            )
+        except AGGREGATOR_ERRORS:
+            return self.fallback.acquire(license_obj, method, path, tokens)
+        granted = response["granted"]
+        if granted < tokens:
+            return RateDecision(False, response.get("retry_after"), 0.0)
+        with self._lock:
+            lease = self._leases.get(key)
+            remaining = granted - tokens
+            if lease is not None and lease[1] > now:
+                remaining += lease[0]
+            self._leases[key] = [remaining, now + self.lease_ttl]
+        return RateDecision(True, None, remaining)
+
+    def reset(self, license_id: Optional[str] = None) -> None:
+        """清空本地预留的令牌"""
+        with self._lock:
+            for key in [k for k in self._leases if license_id is None or k[0] == license_id]:
+                del self._leases[key]
+        self.fallback.reset(license_id)
+
+    def __len__(self) -> int:
+        return len(self._leases)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="许可证用量与限流协调进程")
+    parser.add_argument("--listen", default=DEFAULT_ADDRESS, help="监听地址，tcp://host:port 或 unix:///path")
+    parser.add_argument("--db", default="aggregator/usage.db", help="用量数据库路径")
+    parser.add_argument("--secret-file", help="认证密钥文件，未指定时读取环境变量 LICENSE_AGGREGATOR_SECRET")
+    parser.add_argument("--licenses", help="许可证目录，上限与速率取自其中验签通过的许可证")
+    parser.add_argument("--public-key", help="验证 --licenses 中许可证签名的公钥")
+    parser.add_argument("--period", type=float, default=60.0, help="rate_limit 对应的时间窗口（秒）")
+    parser.add_argument("--allow-reset", action="store_true", help="接受副本的 reset_usage 请求")
+    args = parser.parse_args(argv)
+    if args.secret_file:
+        with open(args.secret_file, "rb") as f:
+            secret_key = f.read().strip()
+    else:
+        secret_key = os.environ.get("LICENSE_AGGREGATOR_SECRET", "").encode("utf-8")
+    if not secret_key:
+        parser.error("需要通过 --secret-file 或 LICENSE_AGGREGATOR_SECRET 提供认证密钥")
+    license_lookup = None
+    if args.licenses:
+        if not args.public_key:
+            parser.error("--licenses 需要同时指定 --public-key")
+        from license_store import LicenseStore
+        store = LicenseStore(args.licenses, public_key_path=args.public_key, poll_interval=5.0)
+        license_lookup = store.get
+    server = AggregatorServer(
+        args.listen, args.db, secret_key, license_lookup,
+        period=args.period, allow_reset=args.allow_reset
+    )
+    print(f"用量汇总服务已启动: {server.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
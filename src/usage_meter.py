@@ -0,0 +1,260 @@
+import os
+import atexit
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+from license_models import License
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    license_id TEXT NOT NULL,
+    metric_type TEXT NOT NULL,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (license_id, metric_type)
+) WITHOUT ROWID
+"""
+
+class UsageMeter:
+    """跨进程的用量计数器
+
+    计数保存在 SQLite 数据库中（WAL 模式，synchronous=NORMAL，提交时不逐次
+    fsync），同一主机上的多个进程共享同一数据库文件即可共享计数。上限始终
+    取自已签名许可证中的 UsageLimit.max_value，数据库只保存已用量；
+    UsageLimit.current_value 作为首次计量时的初始用量。
+
+    lease_size 大于1时，本进程一次从数据库预留多个单位，之后的 consume
+    在内存中扣减，数据库写入次数降为原来的 1/lease_size。预留而未使用的
+    单位在 close() 时归还；进程异常退出时这些单位保持已用状态，只会少放行、
+    不会超限。
+    """
+
+    def __init__(self, path: str = "secure_storage/usage.db", lease_size: int = 1, timeout: float = 5.0):
+        """初始化用量计数器
+
+        Args:
+            path: 数据库文件路径
+            lease_size: 每次从数据库预留的单位数，1表示每次 consume 都写数据库
+            timeout: 等待其他进程释放数据库锁的时间（秒）
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lease_size = max(1, lease_size)
+        # 自动提交模式，每条 UPDATE 单独成为一个原子事务
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._lock = threading.Lock()
+        # (license_id, metric_type) -> 本进程已预留未使用的单位数
+        self._leases: Dict[Tuple[str, str], int] = {}
+        self._closed = False
+        atexit.register(self.close)
+
+    @staticmethod
+    def _limit(license_obj: License, metric_type: str) -> Optional[Tuple[int, int]]:
+        """许可证中的 (初始用量, 上限)，未设置限制时返回None"""
+        return license_obj.usage_limit(metric_type)
+
+    def _insert_row(self, key: Tuple[str, str], initial: int) -> bool:
+        """计数行不存在时按初始用量创建，返回是否新建"""
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO usage (license_id, metric_type, used) VALUES (?, ?, ?)",
+            (key[0], key[1], initial)
+        )
+        return cursor.rowcount == 1
+
+    def _reserve(self, key: Tuple[str, str], amount: int, max_value: Optional[int], initial: int = 0) -> bool:
+        """在数据库中原子地增加已用量，超过上限时不修改并返回False
+
+        计数行不存在（首次计量，或被其他进程 reset 删除）时按初始用量创建后重试。
+        """
+        if max_value is None:
+            sql, params = (
+                "UPDATE usage SET used = used + ? WHERE license_id = ? AND metric_type = ?",
+                (amount, key[0], key[1])
+            )
+        else:
+            sql, params = (
+                "UPDATE usage SET used = used + ? WHERE license_id = ? AND metric_type = ? AND used + ? <= ?",
+                (amount, key[0], key[1], amount, max_value)
+            )
+        if self._conn.execute(sql, params).rowcount == 1:
+            return True
+        return self._insert_row(key, initial) and self._conn.execute(sql, params).rowcount == 1
+
+    def _return(self, key: Tuple[str, str], amount: int) -> None:
+        self._conn.execute(
+            "UPDATE usage SET used = MAX(used - ?, 0) WHERE license_id = ? AND metric_type = ?",
+            (amount, key[0], key[1])
+        )
+
+    def consume(self, license_obj: License, metric_type: str, value: int = 1) -> bool:
+        """占用用量，超过许可证上限时不占用
+
+        Args:
+            license_obj: 许可证对象
+            metric_type: 指标类型
+            value: 占用量
+
+        Returns:
+            bool: 是否占用成功
+
+        Raises:
+            ValueError: value 不是正数
+        """
+        limit = self._limit(license_obj, metric_type)
+        initial, max_value = limit if limit is not None else (0, None)
+        return self.consume_counter(license_obj.license_id, metric_type, value, initial, max_value)
+
+    def consume_counter(
+        self,
+        license_id: str,
+        metric_type: str,
+        value: int = 1,
+        initial: int = 0,
+        max_value: Optional[int] = None
+    ) -> bool:
+        """按计数键占用用量，供不持有许可证对象的调用方（如用量汇总服务）使用
+
+        Args:
+            license_id: 许可证ID
+            metric_type: 指标类型
+            value: 占用量
+            initial: 计数不存在时的初始用量
+            max_value: 上限，为None时不限制
+
+        Returns:
+            bool: 是否占用成功
+
+        Raises:
+            ValueError: value 不是正数
+        """
+        if value <= 0:
+            raise ValueError(f"占用量必须为正数: {value}")
+        key = (license_id, metric_type)
+        with self._lock:
+            available = self._leases.get(key, 0)
+            if available >= value:
+                self._leases[key] = available - value
+                return True
+            need = value - available
+            # 先按 lease_size 预留，接近上限时退回只预留所需的量
+            for amount in ((max(need, self.lease_size), need) if self.lease_size > need else (need,)):
+                if self._reserve(key, amount, max_value, initial):
+                    self._leases[key] = available + amount - value
+                    return True
+            return False
+
+    def release(self, license_obj: License, metric_type: str, value: int = 1) -> None:
+        """释放已占用的用量（如节点下线、用户删除）
+
+        Args:
+            license_obj: 许可证对象
+            metric_type: 指标类型
+            value: 释放量
+
+        Raises:
+            ValueError: value 不是正数
+        """
+        self.release_counter(license_obj.license_id, metric_type, value)
+
+    def release_counter(self, license_id: str, metric_type: str, value: int = 1) -> None:
+        """按计数键释放用量
+
+        Raises:
+            ValueError: value 不是正数
+        """
+        if value <= 0:
+            raise ValueError(f"释放量必须为正数: {value}")
+        key = (license_id, metric_type)
+        with self._lock:
+            available = self._leases.get(key, 0) + value
+            # 本进程保留至多 lease_size 个单位，其余归还数据库供其他进程使用
+            keep = min(available, self.lease_size - 1)
+            if available > keep:
+                self._return(key, available - keep)
+            self._leases[key] = keep
+
+    def add_counter(self, license_id: str, metric_type: str, value: int, initial: int = 0) -> None:
+        """不检查上限地增加用量，用于补记离线期间已发生的用量"""
+        key = (license_id, metric_type)
+        with self._lock:
+            self._reserve(key, value, None, initial)
+
+    def counter_value(self, license_id: str, metric_type: str) -> Optional[int]:
+        """按计数键查询已用量（含本进程预留未使用的单位），计数不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT used FROM usage WHERE license_id = ? AND metric_type = ?", (license_id, metric_type)
+            ).fetchone()
+            return row[0] if row is not None else None
+
+    def used(self, license_obj: License, metric_type: str) -> int:
+        """当前已用量
+
+        包含其他进程已预留但尚未使用的单位，不含本进程预留未使用的单位。
+        """
+        key = (license_obj.license_id, metric_type)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT used FROM usage WHERE license_id = ? AND metric_type = ?", key
+            ).fetchone()
+            if row is None:
+                limit = self._limit(license_obj, metric_type)
+                return limit[0] if limit is not None else 0
+            return row[0] - self._leases.get(key, 0)
+
+    def check(self, license_obj: License, metric_type: str, value: int = 1) -> bool:
+        """检查再占用 value 是否仍在上限内，不占用
+
+        Returns:
+            bool: 是否在限制范围内，许可证未设置该指标的限制时返回True
+        """
+        limit = self._limit(license_obj, metric_type)
+        if limit is None:
+            return True
+        return self.used(license_obj, metric_type) + value <= limit[1]
+
+    def reset(self, license_obj: License, metric_type: Optional[str] = None) -> None:
+        """重置计数为许可证中的初始用量（如按计费周期清零 api_calls）
+
+        Args:
+            license_obj: 许可证对象
+            metric_type: 指标类型，为None时重置该许可证的全部指标
+        """
+        self.reset_counter(license_obj.license_id, metric_type)
+
+    def reset_counter(self, license_id: str, metric_type: Optional[str] = None) -> None:
+        """按计数键重置用量"""
+        with self._lock:
+            if metric_type is None:
+                self._conn.execute("DELETE FROM usage WHERE license_id = ?", (license_id,))
+                for key in [k for k in self._leases if k[0] == license_id]:
+                    del self._leases[key]
+                return
+            key = (license_id, metric_type)
+            self._conn.execute(
+                "DELETE FROM usage WHERE license_id = ? AND metric_type = ?", key
+            )
+            self._leases.pop(key, None)
+
+    def flush(self) -> None:
+        """将本进程预留未使用的单位全部归还数据库"""
+        with self._lock:
+            for key, amount in self._leases.items():
+                if amount > 0:
+                    self._return(key, amount)
+            self._leases.clear()
+
+    def close(self) -> None:
+        """归还预留的单位并关闭数据库连接"""
+        if self._closed:
+            return
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+        atexit.unregister(self.close)
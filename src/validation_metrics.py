@@ -0,0 +1,229 @@
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence, Tuple
+
+from validation_result import VALIDATION_STAGES, ValidationResult
+
+# 默认直方图桶上界（秒），覆盖缓存命中的微秒级到 NTP 超时的秒级
+DEFAULT_BUCKETS = (
+    1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0,
+)
+
+class ValidationHook:
+    """验证过程钩子
+
+    通过 LicenseValidator(hooks=[...]) 或 add_hook() 注册，每次验证结束后在
+    验证线程中同步调用，实现应尽快返回；抛出的异常会被捕获并打印，不影响
+    验证结果。
+    """
+
+    def on_validation(self, license_id: str, result: ValidationResult) -> None:
+        """一次验证结束
+
+        Args:
+            license_id: 许可证ID
+            result: 验证结果，包含原因、失败阶段与各阶段耗时
+        """
+
+class LatencyHistogram:
+    """固定桶的耗时直方图，不自带锁，由持有者加锁"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # 每个桶的非累计计数，最后一个为 +Inf 桶
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(桶上界, 累计计数) 列表，最后一项上界为 inf"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """按桶上界估算分位数"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        for bound, total in self.cumulative():
+            if total >= target:
+                return bound
+        return float("inf")
+
+class ValidationMetrics(ValidationHook):
+    """验证指标收集器
+
+    按阶段记录耗时直方图（另有 total 表示整次验证），并按失败阶段与原因
+    统计失败次数。每次验证只加一次锁。
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """初始化指标收集器
+
+        Args:
+            buckets: 直方图桶上界（秒），升序
+        """
+        self.buckets = tuple(buckets)
+        self.stage_latency: Dict[str, LatencyHistogram] = {
+            stage: LatencyHistogram(self.buckets) for stage in VALIDATION_STAGES + ("total",)
+        }
+        self.outcomes = {'valid': 0, 'invalid': 0}
+        # (失败阶段, 原因) -> 次数
+        self.failures: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def on_validation(self, license_id: str, result: ValidationResult) -> None:
+        with self._lock:
+            total = 0.0
+            for stage, seconds in result.timings.items():
+                histogram = self.stage_latency.get(stage)
+                if histogram is None:
+                    histogram = self.stage_latency[stage] = LatencyHistogram(self.buckets)
+                histogram.observe(seconds)
+                total += seconds
+            self.stage_latency["total"].observe(total)
+            if result.valid:
+                self.outcomes['valid'] += 1
+            else:
+                self.outcomes['invalid'] += 1
+                key = (result.stage, result.reason.value)
+                self.failures[key] = self.failures.get(key, 0) + 1
+
+    def reset(self) -> None:
+        """清零全部指标"""
+        with self._lock:
+            for histogram in self.stage_latency.values():
+                histogram.counts = [0] * len(histogram.counts)
+                histogram.sum = 0.0
+                histogram.count = 0
+            self.outcomes = {'valid': 0, 'invalid': 0}
+            self.failures = {}
+
+    def snapshot(self) -> dict:
+        """获取指标快照
+
+        Returns:
+            dict: 包含 outcomes、failures（"阶段/原因" -> 次数），以及
+                stages（阶段 -> count、sum、p50、p99）
+        """
+        with self._lock:
+            return {
+                'outcomes': dict(self.outcomes),
+                'failures': {f"{stage}/{reason}": count for (stage, reason), count in self.failures.items()},
+                'stages': {
+                    stage: {
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'p50': histogram.quantile(0.5),
+                        'p99': histogram.quantile(0.99)
+                    }
+                    for stage, histogram in self.stage_latency.items()
+                }
+            }
+
+    def render_prometheus(self, validator=None, namespace: str = "license") -> str:
+        """以 Prometheus 文本格式导出指标
+
+        Args:
+            validator: LicenseValidator，提供时一并导出就绪状态与签名缓存、
+                无效签名缓存、权限检查结果缓存与验证租约的统计
+            namespace: 指标名前缀
+
+        Returns:
+            str: Prometheus 文本格式（0.0.4）
+        """
+        lines = []
+        name = f"{namespace}_validation_stage_seconds"
+        lines.append(f"# HELP {name} Latency of each license validation stage.")
+        lines.append(f"# TYPE {name} histogram")
+        with self._lock:
+            for stage, histogram in self.stage_latency.items():
+                for bound, total in histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {total}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum!r}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            outcomes = dict(self.outcomes)
+            failures = dict(self.failures)
+
+        name = f"{namespace}_validations_total"
+        lines.append(f"# HELP {name} License validations by outcome.")
+        lines.append(f"# TYPE {name} counter")
+        for outcome, count in outcomes.items():
+            lines.append(f'{name}{{outcome="{outcome}"}} {count}')
+
+        name = f"{namespace}_validation_failures_total"
+        lines.append(f"# HELP {name} Failed license validations by failing stage and reason.")
+        lines.append(f"# TYPE {name} counter")
+        for (stage, reason), count in sorted(failures.items()):
+            lines.append(f'{name}{{stage="{stage}",reason="{reason}"}} {count}')
+
+        if validator is not None:
+            lines.append(f"# HELP {namespace}_validator_ready Whether the validator finished initialization.")
+            lines.append(f"# TYPE {namespace}_validator_ready gauge")
+            lines.append(f"{namespace}_validator_ready {int(validator.is_ready())}")
+            caches = [
+                ('signature', validator.get_cache_stats()),
+                ('rejected_signature', validator.rejected_signatures.stats()),
+            ]
+            if validator.decision_cache is not None:
+                caches.append(('decision', validator.decision_cache.stats()))
+            if validator.validation_lease > 0:
+                caches.append(('lease', validator.lease_stats()))
+            for key, kind in (('hits', 'counter'), ('misses', 'counter'), ('size', 'gauge')):
+                name = f"{namespace}_cache_{key}" + ("_total" if kind == 'counter' else "")
+                lines.append(f"# HELP {name} Validator cache {key}.")
+                lines.append(f"# TYPE {name} {kind}")
+                for cache, stats in caches:
+                    lines.append(f'{name}{{cache="{cache}"}} {stats[key]}')
+        return "\n".join(lines) + "\n"
+
+def serve_metrics(
+    metrics: ValidationMetrics,
+    validator=None,
+    address: Tuple[str, int] = ("127.0.0.1", 9108),
+    namespace: str = "license"
+) -> ThreadingHTTPServer:
+    """在后台线程中启动 /metrics HTTP 端点
+
+    Args:
+        metrics: 指标收集器
+        validator: 一并导出其缓存统计的 LicenseValidator
+        address: 监听地址，默认只监听本机回环地址；需要由其他主机抓取时
+            显式传入，例如 ("0.0.0.0", 9108)
+        namespace: 指标名前缀
+
+    Returns:
+        ThreadingHTTPServer: 已启动的服务器，调用 shutdown() 停止
+    """
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus(validator, namespace).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(address, _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="license-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,77 @@
+from enum import Enum
+from typing import Dict, NamedTuple, Optional
+
+# validate_license 依次执行的阶段，ready 为验证器尚未完成初始化
+STAGE_READY = "ready"
+STAGE_BOOT_TIME = "boot_time"
+STAGE_TIME_SYNC = "time_sync"
+STAGE_STORAGE = "storage"
+STAGE_VALIDITY = "validity"
+STAGE_SIGNATURE = "signature"
+STAGE_UPDATE_TIMESTAMPS = "update_timestamps"
+STAGE_SNAPSHOT = "snapshot"   # 工作进程读取主进程发布的共享快照
+
+VALIDATION_STAGES = (
+    STAGE_BOOT_TIME, STAGE_TIME_SYNC, STAGE_STORAGE, STAGE_VALIDITY, STAGE_SIGNATURE, STAGE_UPDATE_TIMESTAMPS,
+)
+
+# 与许可证内容无关的阶段，在这些阶段失败时同一时刻任何许可证都会失败
+ENVIRONMENT_STAGES = frozenset({STAGE_BOOT_TIME, STAGE_TIME_SYNC, STAGE_STORAGE, STAGE_UPDATE_TIMESTAMPS})
+
+class ValidationReason(str, Enum):
+    """验证结果原因枚举"""
+    OK = "ok"
+    NOT_READY = "not_ready"                          # 验证器尚未完成初始化
+    CLOCK_BEFORE_BOOT = "clock_before_boot"          # 当前时间早于系统启动时间
+    CLOCK_SKEW = "clock_skew"                        # 与时间同步源差异过大
+    STORAGE_MISSING = "storage_missing"              # 有效的时间戳文件不足两个
+    STORAGE_INCONSISTENT = "storage_inconsistent"    # 时间戳文件之间不一致
+    STORAGE_ROLLBACK = "storage_rollback"            # 时间戳文件被替换为旧副本
+    STORAGE_ERROR = "storage_error"                  # 读取时间戳文件出错
+    NOT_YET_VALID = "not_yet_valid"                  # 未到生效时间
+    EXPIRED = "expired"                              # 已过期
+    MISSING_SIGNATURE = "missing_signature"          # 许可证未签名
+    UNSUPPORTED_ALGORITHM = "unsupported_algorithm"  # 签名算法不受支持或与公钥不匹配
+    BAD_SIGNATURE = "bad_signature"                  # 签名无效
+    SNAPSHOT_STALE = "snapshot_stale"                # 共享快照不存在或已过期
+    UNKNOWN_LICENSE = "unknown_license"              # 共享快照中没有该许可证
+
+# 稍后重试可能成功的原因，其余原因在许可证或运行环境改变前重试不会成功
+RETRYABLE_REASONS = frozenset({
+    ValidationReason.NOT_READY,
+    ValidationReason.CLOCK_SKEW,
+    ValidationReason.STORAGE_ERROR,
+    ValidationReason.NOT_YET_VALID,
+    ValidationReason.SNAPSHOT_STALE,
+})
+
+# SecureTimeStorage.inspect_storage 返回的失败代码 -> 原因
+STORAGE_REASONS = {
+    "missing": ValidationReason.STORAGE_MISSING,
+    "inconsistent": ValidationReason.STORAGE_INCONSISTENT,
+    "rolled_back": ValidationReason.STORAGE_ROLLBACK,
+    "error": ValidationReason.STORAGE_ERROR,
+}
+
+class ValidationResult(NamedTuple):
+    """许可证验证结果
+
+    布尔值与 valid 一致，可直接用于条件判断。
+    """
+    valid: bool
+    reason: ValidationReason
+    stage: Optional[str]           # 失败的阶段，验证通过时为None
+    timings: Dict[str, float]      # 已执行阶段的耗时（秒），失败阶段之后的阶段不出现
+
+    def __bool__(self) -> bool:
+        return self.valid
+
+    @property
+    def retryable(self) -> bool:
+        """稍后重试是否可能成功"""
+        return self.reason in RETRYABLE_REASONS
+
+    @property
+    def elapsed(self) -> float:
+        """各阶段耗时之和（秒）"""
+        return sum(self.timings.values())
@@ -0,0 +1,181 @@
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import ntplib
+import pytest
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+# 源码为 src 下的平铺模块，测试时以顶层模块名导入
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from license_generator import LicenseGenerator  # noqa: E402
+from license_validator import LicenseValidator  # noqa: E402
+
+class LocalNTPServer:
+    """本地UDP NTP应答器，代替公网NTP服务器
+
+    delay、offset、respond 可在运行中修改，request_times 记录每次收到请求
+    时的单调时钟读数。
+    """
+
+    def __init__(self, delay: float = 0.0, offset: float = 0.0, respond: bool = True):
+        """
+        Args:
+            delay: 每次应答前的等待时间（秒）
+            offset: 应答时间相对本机时间的偏移（秒）
+            respond: 为False时只接收不应答，模拟无法访问的服务器
+        """
+        self.delay = delay
+        self.offset = offset
+        self.respond = respond
+        self.request_times = []
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.settimeout(0.1)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self) -> str:
+        host, port = self._sock.getsockname()
+        return f"{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        return len(self.request_times)
+
+    def wait_for_requests(self, count: int, timeout: float = 5.0) -> bool:
+        """等待累计收到 count 个请求"""
+        deadline = time.monotonic() + timeout
+        while self.requests < count:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+        self._sock.close()
+
+    def _serve(self):
+        while self._running:
+            try:
+                data, addr = self._sock.recvfrom(256)
+            except socket.timeout:
+                continue
+            self.request_times.append(time.monotonic())
+            if not self.respond:
+                continue
+            if self.delay:
+                time.sleep(self.delay)
+            request = ntplib.NTPPacket()
+            request.from_data(data)
+            now = time.time() + self.offset
+            response = ntplib.NTPPacket(version=request.version, mode=4, tx_timestamp=ntplib.system_to_ntp_time(now))
+            response.stratum = 1
+            response.orig_timestamp = request.tx_timestamp
+            response.recv_timestamp = ntplib.system_to_ntp_time(now)
+            self._sock.sendto(response.to_data(), addr)
+
+@pytest.fixture
+def ntp_server():
+    """创建本地NTP应答器的工厂，测试结束时全部停止"""
+    servers = []
+
+    def make(**kwargs) -> LocalNTPServer:
+        server = LocalNTPServer(**kwargs)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.stop()
+
+@pytest.fixture(scope="session")
+def key_paths(tmp_path_factory):
+    """RSA密钥对文件路径，整个测试会话共用"""
+    directory = tmp_path_factory.mktemp("keys")
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    paths = {
+        "private_key": str(directory / "private_key.pem"),
+        "public_key": str(directory / "public_key.pem"),
+    }
+    with open(paths["private_key"], "wb") as f:
+        f.write(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        ))
+    with open(paths["public_key"], "wb") as f:
+        f.write(private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        ))
+    return paths
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """切换到临时目录，secure_storage 与 licenses 写在其中"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def generator(key_paths):
+    return LicenseGenerator(key_paths["private_key"])
+
+def license_spec(customer_id: str = "test_customer", days: int = 30) -> dict:
+    """generate_license 的参数：每类权限各一项，api_calls 上限为10"""
+    now = datetime.utcnow()
+    return {
+        "customer_id": customer_id,
+        "not_before": now - timedelta(days=1),
+        "not_after": now + timedelta(days=days),
+        "features": [
+            {"feature_id": "api_users", "feature_name": "用户API", "feature_type": "api",
+             "method": "GET", "path": "/api/v1/users/{user_id}", "rate_limit": 600},
+            {"feature_id": "api_orders", "feature_name": "订单API", "feature_type": "api",
+             "method": "POST", "path": "/api/v1/orders"},
+            {"feature_id": "service_orders", "feature_name": "订单服务", "feature_type": "service",
+             "service_name": "orders", "version": "1.0.0", "endpoints": ["/orders"]},
+            {"feature_id": "ui_dashboard", "feature_name": "仪表盘", "feature_type": "ui",
+             "component_id": "dashboard", "component_type": "panel", "visibility": True},
+            {"feature_id": "button_export", "feature_name": "导出", "feature_type": "button",
+             "button_id": "export", "action_type": "click", "enabled": True},
+        ],
+        "usage_limits": [
+            {"metric_type": "api_calls", "max_value": 10, "current_value": 0},
+        ],
+    }
+
+@pytest.fixture
+def make_license(workdir, generator):
+    """生成已签名、已冻结的许可证，参数同 license_spec"""
+    def make(**kwargs):
+        return generator.generate_license(**license_spec(**kwargs))
+    return make
+
+@pytest.fixture
+def make_validator(workdir, key_paths, ntp_server):
+    """创建使用本地NTP应答器的验证器，测试结束时关闭"""
+    validators = []
+    server = ntp_server()
+    # 同一测试中的验证器共用 secure_storage，需使用同一密钥
+    secret_key = Fernet.generate_key()
+
+    def make(**kwargs) -> LicenseValidator:
+        kwargs.setdefault("ntp_servers", [server.address])
+        validator = LicenseValidator(key_paths["public_key"], secret_key, **kwargs)
+        validators.append(validator)
+        return validator
+
+    yield make
+    for validator in validators:
+        validator.close()
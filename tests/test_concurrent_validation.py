@@ -0,0 +1,47 @@
+"""多线程并发校验的压力测试：有效许可证在任何配置下都不应被拒绝"""
+import threading
+import time
+
+import pytest
+
+from license_models import FeatureType
+
+def _run_concurrent_validation(validator, license_obj, n_threads: int, duration: float):
+    """多线程同时交替调用 validate_license 与 check_feature，返回 (调用次数, 失败次数)
+
+    开始前先空闲超过1秒，使时间戳文件之间的差距超过一致性检查的容差。
+    """
+    assert validator.validate_license(license_obj)
+    time.sleep(1.2)
+    counts = [[0, 0] for _ in range(n_threads)]
+    barrier = threading.Barrier(n_threads + 1)
+    stop = threading.Event()
+
+    def worker(count):
+        barrier.wait()
+        while not stop.is_set():
+            for ok in (validator.validate_license(license_obj),
+                       validator.check_feature(license_obj, "ui_dashboard", FeatureType.UI)):
+                count[0 if ok else 1] += 1
+
+    threads = [threading.Thread(target=worker, args=(count,)) for count in counts]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(c[0] + c[1] for c in counts), sum(c[1] for c in counts)
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {'timestamp_flush_interval': 5.0},
+    {'environment_refresh_interval': 1.0},
+], ids=["per_call", "write_behind", "snapshot"])
+def test_concurrent_validation_has_no_failures(make_license, make_validator, kwargs):
+    license_obj = make_license()
+    validator = make_validator(**kwargs)
+    calls, failures = _run_concurrent_validation(validator, license_obj, 8, 0.5)
+    assert calls > 0
+    assert failures == 0
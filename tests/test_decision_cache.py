@@ -0,0 +1,79 @@
+"""权限检查结果缓存与验证租约测试，同步与异步接口行为一致"""
+import asyncio
+
+from async_license_validator import AsyncLicenseValidator
+from license_models import FeatureType, License
+
+QUERIES = [("ui", "dashboard"), ("api", "GET", "/api/v1/users/42"), (FeatureType.BUTTON, "export")]
+
+def _tampered(license_obj: License) -> License:
+    """沿用原许可证ID与签名、内容被修改的副本"""
+    data = license_obj.model_dump()
+    data["features"] = data["features"][:1]
+    return License.model_validate(data)
+
+def test_decisions_are_cached_until_invalidated(make_license, make_validator):
+    license_obj = make_license()
+    validator = make_validator(decision_cache_ttl=60.0)
+    assert validator.check_ui_permission(license_obj, "dashboard")
+    assert validator.check_ui_permission(license_obj, "dashboard")
+    assert validator.decision_cache.stats()['hits'] == 1
+    # 单项检查写入的结果同样被 check_many 命中
+    assert validator.check_many(license_obj, QUERIES) == [True, True, True]
+    assert validator.decision_cache.stats()['hits'] == 2
+    assert validator.check_many(license_obj, QUERIES) == [True, True, True]
+    assert validator.decision_cache.stats()['hits'] == 5
+    assert validator.invalidate_decisions(license_obj.license_id) == 3
+    assert validator.check_ui_permission(license_obj, "dashboard")
+    assert validator.decision_cache.stats()['size'] == 1
+
+def test_tampered_copy_does_not_poison_the_cache(make_license, make_validator):
+    license_obj = make_license()
+    validator = make_validator(decision_cache_ttl=60.0)
+    tampered = _tampered(license_obj)
+    assert not validator.check_ui_permission(tampered, "dashboard")
+    assert validator.check_many(tampered, QUERIES) == [False, False, False]
+    assert validator.decision_cache.stats()['size'] == 0
+    assert validator.check_ui_permission(license_obj, "dashboard")
+    assert validator.check_many(license_obj, QUERIES) == [True, True, True]
+
+def test_async_check_many_reads_the_decision_cache(make_license, make_validator):
+    license_obj = make_license()
+    validator = make_validator(decision_cache_ttl=60.0)
+
+    async def run():
+        async_validator = AsyncLicenseValidator(validator)
+        try:
+            first = await async_validator.check_many(license_obj, QUERIES)
+            second = await async_validator.check_many(license_obj, QUERIES)
+            ui = await async_validator.check_ui_permission(license_obj, "dashboard")
+            return first, second, ui
+        finally:
+            async_validator._executor.shutdown(wait=True)
+
+    first, second, ui = asyncio.run(run())
+    assert first == second == [True, True, True]
+    assert ui is True
+    assert validator.decision_cache.stats()['hits'] == 4
+
+def test_lease_skips_full_validation_until_revoked(make_license, make_validator):
+    license_obj = make_license()
+    validator = make_validator(validation_lease=60.0)
+    assert validator.validate_license(license_obj)
+    assert validator.check_feature(license_obj, "api_users", FeatureType.API)
+    assert validator.check_button_permission(license_obj, "export")
+    assert validator.lease_stats()['hits'] == 2
+    assert validator.lease_stats()['misses'] == 1
+    assert validator.revoke_leases(license_obj.license_id) == 1
+    assert validator.validate_license(license_obj)
+    assert validator.lease_stats()['misses'] == 2
+
+def test_lease_not_granted_to_unfrozen_or_tampered_license(make_license, make_validator):
+    license_obj = make_license()
+    validator = make_validator(validation_lease=60.0)
+    unfrozen = License.model_validate(license_obj.model_dump())
+    assert validator.validate_license(unfrozen)
+    assert validator.lease_stats()['size'] == 0
+    tampered = _tampered(license_obj).freeze()
+    assert not validator.validate_license(tampered)
+    assert validator.lease_stats()['size'] == 0
@@ -0,0 +1,76 @@
+"""批量生成测试：规格校验、断点记录与重新运行"""
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from license_generator import LicenseGenerator
+
+@pytest.fixture
+def generator(tmp_path):
+    key_path = tmp_path / "private_key.pem"
+    key_path.write_bytes(ed25519.Ed25519PrivateKey.generate().private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    ))
+    return LicenseGenerator(str(key_path))
+
+def _spec(customer_id: str) -> dict:
+    now = datetime.utcnow()
+    return {"customer_id": customer_id, "not_before": now, "not_after": now + timedelta(days=30)}
+
+def test_invalid_spec_is_reported_without_aborting(generator, tmp_path):
+    errors = []
+    result = generator.generate_many(
+        [_spec("c1"), {"spec_id": "broken"}, "not a spec", _spec("c2")],
+        output_dir=str(tmp_path / "out"), max_workers=1,
+        on_error=lambda spec, e: errors.append((spec, e))
+    )
+    assert (result.completed, result.failed) == (2, 2)
+    assert all(isinstance(e, ValueError) for _, e in errors)
+    assert len(os.listdir(tmp_path / "out")) == 2
+
+def test_rerun_after_unjournaled_write_reuses_the_file(generator, tmp_path):
+    journal_path = tmp_path / "batch.journal"
+    out = tmp_path / "out"
+    specs = [_spec(f"c{i}") for i in range(3)]
+    generator.generate_many(specs, output_dir=str(out), max_workers=1, journal_path=str(journal_path))
+    files = sorted(os.listdir(out))
+    # 模拟最后一个规格写完文件后、写入记录前进程退出
+    lines = journal_path.read_bytes().splitlines(keepends=True)
+    journal_path.write_bytes(b"".join(lines[:-1]))
+    result = generator.generate_many(specs, output_dir=str(out), max_workers=1, journal_path=str(journal_path))
+    assert (result.completed, result.skipped) == (1, 2)
+    assert sorted(os.listdir(out)) == files
+
+def test_corrupt_journal_lines_go_to_on_error(generator, tmp_path):
+    journal_path = tmp_path / "batch.journal"
+    out = tmp_path / "out"
+    generator.generate_many([_spec("c0")], output_dir=str(out), max_workers=1, journal_path=str(journal_path))
+    with open(journal_path, "ab") as f:
+        f.write(b"garbage\n")
+        f.write(b'{"spec_id": "c1", "lic')  # 写入记录时中断
+    errors = []
+    result = generator.generate_many(
+        [_spec("c0"), _spec("c1")], output_dir=str(out), max_workers=1,
+        journal_path=str(journal_path), on_error=lambda spec, e: errors.append(spec)
+    )
+    assert (result.completed, result.skipped, result.failed) == (1, 1, 0)
+    assert [spec["journal_line"] for spec in errors] == ["garbage\n", '{"spec_id": "c1", "lic']
+    # 截掉的不完整行之后记录仍逐行可解析
+    records = [json.loads(line) for line in journal_path.read_text().splitlines() if line != "garbage"]
+    assert {r.get("spec_id") for r in records} >= {"c0", "c1"}
+
+def test_generate_license_returns_frozen_license(generator, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    license_obj = generator.generate_license(
+        customer_id="c1", not_before=datetime.utcnow(), not_after=datetime.utcnow() + timedelta(days=1),
+        features=[], usage_limits=[]
+    )
+    assert license_obj.frozen
+    with pytest.raises(TypeError):
+        license_obj.usage_limits.append(None)
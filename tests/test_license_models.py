@@ -0,0 +1,43 @@
+from license_models import FeatureType, License, UIPermission
+
+def _unfrozen(license_obj: License) -> License:
+    return License.model_validate(license_obj.model_dump())
+
+def test_unfrozen_license_sees_in_place_edits(make_license):
+    license_obj = _unfrozen(make_license())
+    assert license_obj.check_ui_permission("dashboard")
+    assert license_obj.check_api_permission("GET", "/api/v1/users/42")
+
+    license_obj.features.append(UIPermission(
+        feature_id="ui_reports", feature_name="报表", feature_type=FeatureType.UI,
+        component_id="reports", component_type="panel"))
+    assert license_obj.check_ui_permission("reports")
+    assert license_obj.check_feature("ui_reports", FeatureType.UI)
+
+    for feature in license_obj.features:
+        if feature.feature_id == "api_users":
+            feature.enabled = False
+        elif feature.feature_id == "ui_dashboard":
+            feature.visibility = False
+    assert not license_obj.check_api_permission("GET", "/api/v1/users/42")
+    assert license_obj.find_api_permission("GET", "/api/v1/users/42").feature_id == "api_users"
+    assert not license_obj.check_ui_permission("dashboard")
+
+    license_obj.usage_limits[0].max_value = 1
+    assert license_obj.usage_limit("api_calls") == (0, 1)
+    assert not license_obj.check_usage_limit("api_calls", 2)
+
+def test_frozen_and_unfrozen_licenses_answer_alike(make_license):
+    frozen = make_license()
+    unfrozen = _unfrozen(frozen)
+    assert frozen.frozen and not unfrozen.frozen
+    for license_obj in (frozen, unfrozen):
+        assert license_obj.check_api_permission("GET", "/api/v1/users/7")
+        assert license_obj.check_api_permission("POST", "/api/v1/orders")
+        assert not license_obj.check_api_permission("POST", "/api/v1/users/7")
+        assert license_obj.check_service_permission("orders", "/orders")
+        assert not license_obj.check_service_permission("orders", "/refunds")
+        assert license_obj.check_button_permission("export")
+        assert license_obj.usage_limit("api_calls") == (0, 10)
+        assert license_obj.usage_limit("nodes") is None
+    assert frozen.permission_index is frozen.permission_index
@@ -0,0 +1,45 @@
+"""RateLimiter 测试：令牌桶容量、补充与多线程下的准入总数"""
+import threading
+import time
+
+from rate_limiter import RateLimiter
+
+def test_bucket_denies_when_empty_and_refills():
+    limiter = RateLimiter()
+    key = ("license", "GET", "/api/v1/users")
+    assert all(limiter.take(key, 5, 50.0).allowed for _ in range(5))
+    denied = limiter.take(key, 5, 50.0)
+    assert not denied.allowed
+    assert 0 < denied.retry_after <= 1 / 50.0
+    time.sleep(denied.retry_after + 0.01)
+    assert limiter.take(key, 5, 50.0).allowed
+
+def test_concurrent_admissions_never_exceed_capacity_plus_refill():
+    limiter = RateLimiter(shards=16)
+    key = ("license", "GET", "/api/v1/users")
+    capacity, rate = 200, 100.0
+    allowed = []
+    barrier = threading.Barrier(16)
+
+    def worker():
+        barrier.wait()
+        allowed.append(sum(limiter.take(key, capacity, rate).allowed for _ in range(2000)))
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    assert capacity <= sum(allowed) <= capacity + rate * elapsed + 1
+
+def test_reset_refills_only_the_given_license():
+    limiter = RateLimiter()
+    a, b = ("a", "GET", "/x"), ("b", "GET", "/x")
+    assert limiter.take(a, 1, 0.001).allowed
+    assert limiter.take(b, 1, 0.001).allowed
+    limiter.reset("a")
+    assert limiter.take(a, 1, 0.001).allowed
+    assert not limiter.take(b, 1, 0.001).allowed
+    assert len(limiter) == 2
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from license_models import APIPermission, FeatureType, License
+from route_matcher import RouteMatcher, is_path_template
+
+def test_static_segment_beats_param_beats_wildcard():
+    routes = RouteMatcher()
+    routes.insert("GET", "/api/v1/users/*", "wildcard")
+    routes.insert("GET", "/api/v1/users/{id}", "param")
+    routes.insert("GET", "/api/v1/users/me", "static")
+    assert routes.match("GET", "/api/v1/users/me") == "static"
+    assert routes.match("GET", "/api/v1/users/42") == "param"
+    assert routes.match("GET", "/api/v1/users/42/orders") == "wildcard"
+    assert routes.match("POST", "/api/v1/users/42") is None
+    assert len(routes) == 3
+
+def test_match_backtracks_to_a_less_specific_branch():
+    routes = RouteMatcher()
+    routes.insert("GET", "/api/{version}/orders", "orders")
+    routes.insert("GET", "/api/v1/users", "users")
+    assert routes.match("GET", "/api/v1/orders") == "orders"
+    assert routes.match("GET", "//api/v1/users/") == "users"
+
+def test_trailing_wildcard_needs_at_least_one_segment():
+    routes = RouteMatcher()
+    routes.insert("GET", "/files/*", "files")
+    routes.insert("GET", "/files/*", "duplicate")
+    routes.insert("GET", "/jobs/*/status", "status")
+    assert routes.match("GET", "/files", default="none") == "none"
+    assert routes.match("GET", "/files/a/b/c") == "files"
+    assert routes.match("GET", "/jobs/7/status") == "status"
+    assert routes.match("GET", "/jobs/7/8/status") is None
+    assert len(routes) == 2
+
+@pytest.mark.parametrize("path, expected", [
+    ("/api/v1/users", False),
+    ("/api/v1/users/{id}", True),
+    ("/api/v1/files/*", True),
+    ("/api/v1/{}", False),
+])
+def test_is_path_template(path, expected):
+    assert is_path_template(path) is expected
+
+@pytest.mark.parametrize("frozen", [True, False])
+def test_license_exact_path_overrides_template(frozen):
+    now = datetime.utcnow()
+    features = [
+        APIPermission(feature_id="users", feature_name="用户", feature_type=FeatureType.API,
+                      method="GET", path="/api/v1/users/{id}", rate_limit=60),
+        APIPermission(feature_id="admin", feature_name="管理员", feature_type=FeatureType.API,
+                      method="GET", path="/api/v1/users/admin", enabled=False),
+    ]
+    license_obj = License(license_id="lic", customer_id="c", not_before=now,
+                          not_after=now + timedelta(days=1), features=features)
+    if frozen:
+        license_obj.freeze()
+    assert license_obj.check_api_permission("GET", "/api/v1/users/42")
+    assert license_obj.find_api_permission("GET", "/api/v1/users/42").feature_id == "users"
+    assert not license_obj.check_api_permission("GET", "/api/v1/users/admin")
+    assert license_obj.find_api_permission("GET", "/api/v1/users/admin").feature_id == "admin"
+    assert license_obj.find_api_permission("GET", "/api/v1/users") is None
@@ -0,0 +1,52 @@
+"""SecureTimeStorage 测试：多个进程共用同一 secure_storage 目录"""
+import shutil
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+
+from secure_time_storage import SecureTimeStorage
+
+@pytest.fixture
+def secret_key(tmp_path, monkeypatch):
+    # 存储目录为当前目录下的 secure_storage
+    monkeypatch.chdir(tmp_path)
+    return Fernet.generate_key()
+
+def test_stale_flush_does_not_roll_back_peer(secret_key):
+    a = SecureTimeStorage(secret_key, flush_interval=1.0)
+    b = SecureTimeStorage(secret_key, flush_interval=1.0)
+    time.sleep(1.1)
+    # B 落盘一次后再推进高水位，新值只留在内存中
+    b.update_timestamps()
+    b.update_timestamps()
+    time.sleep(1.5)
+    # A 写入较新的时间戳后 B 才关闭，B 的旧高水位不能覆盖它
+    a.update_timestamps()
+    b.close()
+    assert a.inspect_storage() is None
+    assert b.inspect_storage() is None
+    a.update_timestamps()
+    a.close()
+    assert a.inspect_storage() is None
+
+def test_restarted_peer_does_not_lock_out_others(secret_key):
+    a = SecureTimeStorage(secret_key)
+    a.update_timestamps()
+    # 新进程启动后各自写入，任何一方都不会把时间戳写回更早的值
+    b = SecureTimeStorage(secret_key, flush_interval=60.0)
+    b.update_timestamps()
+    b.close()
+    assert a.validate_storage()
+    assert b.validate_storage()
+
+def test_replaced_with_old_copy_is_rolled_back(secret_key, tmp_path):
+    storage = SecureTimeStorage(secret_key)
+    backup = tmp_path / "backup"
+    shutil.copytree(tmp_path / "secure_storage", backup)
+    time.sleep(1.1)
+    storage.update_timestamps()
+    assert storage.inspect_storage() is None
+    for file in backup.glob("timestamp_*.dat"):
+        shutil.copy(file, tmp_path / "secure_storage" / file.name)
+    assert storage.inspect_storage() == "rolled_back"
@@ -0,0 +1,86 @@
+import hashlib
+import hmac
+import struct
+import time
+import zlib
+
+import pytest
+
+from license_models import FeatureType
+from shared_snapshot import (
+    ENTRY, FLAG_HMAC, HEADER, MAC_SIZE, MAGIC, VERSION,
+    SharedLicenseView, SnapshotPublisher, build_snapshot,
+)
+from validation_result import ValidationReason
+
+SECRET = b"snapshot-secret"
+
+def _write_signed(path, n_slots, n_entries, slots, data=b"", secret=SECRET):
+    """写入 HMAC 正确、内容由调用方决定的快照文件"""
+    header = HEADER.pack(MAGIC, VERSION, FLAG_HMAC, 0, time.time(), time.monotonic(), 60.0, n_slots, n_entries)
+    body = struct.pack(f"!{len(slots)}I", *slots) + data
+    mac = hmac.new(secret, header + body, hashlib.sha256).digest()
+    path.write_bytes(header + mac + body)
+
+def _reason(path, secret=SECRET):
+    """打开快照并返回许可证 lic 的验证原因"""
+    view = SharedLicenseView(str(path), secret)
+    try:
+        return view.validate_license_detailed("lic").reason
+    finally:
+        view.close()
+
+def test_published_snapshot_answers_checks(make_license, make_validator, workdir):
+    license_obj = make_license()
+    path = workdir / "licenses.snapshot"
+    publisher = SnapshotPublisher(str(path), make_validator(), [license_obj], SECRET)
+    assert publisher.publish()[license_obj.license_id].valid
+
+    view = SharedLicenseView(str(path), SECRET)
+    license_id = license_obj.license_id
+    assert view.validate_license(license_id)
+    assert view.license_for_customer("test_customer") == license_id
+    assert view.check_api_permission(license_id, "GET", "/api/v1/users/1")
+    assert not view.check_api_permission(license_id, "DELETE", "/api/v1/orders")
+    assert view.check_feature(license_id, "ui_dashboard", FeatureType.UI)
+    assert view.check_usage_limit(license_id, "api_calls", 10)
+    assert not view.check_usage_limit(license_id, "api_calls", 11)
+    assert view.validate_license_detailed("missing").reason is ValidationReason.UNKNOWN_LICENSE
+    view.close()
+
+def test_secret_key_is_required(tmp_path):
+    with pytest.raises(ValueError):
+        build_snapshot([], 60.0, b"")
+    with pytest.raises(ValueError):
+        SharedLicenseView(str(tmp_path / "licenses.snapshot"), None)
+
+def test_snapshot_with_bad_mac_is_rejected(tmp_path):
+    path = tmp_path / "licenses.snapshot"
+    data = bytearray(build_snapshot([(b"Llic", b"x" * 16)], 60.0, SECRET))
+    path.write_bytes(bytes(data))
+    assert _reason(path, b"other-secret") is ValidationReason.SNAPSHOT_STALE
+
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    assert _reason(path) is ValidationReason.SNAPSHOT_STALE
+
+@pytest.mark.parametrize("n_slots, n_entries, slots", [
+    (8, 8, [0] * 8),                    # 没有空槽，查找不会终止
+    (1 << 20, 0, [0] * 8),              # 槽位表超出文件
+    (8, 1, [0] * 8),                    # 条目数与非空槽位数不一致
+    (8, 1, [1 << 30] + [0] * 7),        # 条目偏移越界
+])
+def test_snapshot_with_bad_tables_is_rejected(tmp_path, n_slots, n_entries, slots):
+    path = tmp_path / "licenses.snapshot"
+    _write_signed(path, n_slots, n_entries, slots)
+    assert _reason(path) is ValidationReason.SNAPSHOT_STALE
+
+def test_entry_lengths_beyond_file_do_not_match(tmp_path):
+    path = tmp_path / "licenses.snapshot"
+    data_offset = HEADER.size + MAC_SIZE + 8 * 4
+    # 声明的值长度超出文件，查找时视为不存在
+    entry = ENTRY.pack(4, 1000) + b"Llic"
+    slots = [0] * 8
+    slots[zlib.crc32(b"Llic") % 8] = data_offset
+    _write_signed(path, 8, 1, slots, entry)
+    assert _reason(path) is ValidationReason.UNKNOWN_LICENSE
@@ -0,0 +1,51 @@
+from license_validator import SignatureCache
+from validation_result import ValidationReason
+
+def test_signature_cache_evicts_least_recently_used():
+    cache = SignatureCache(max_size=2)
+    keys = [SignatureCache.make_key(b"license", str(i)) for i in range(3)]
+    cache.add(keys[0], "a")
+    cache.add(keys[1], "b")
+    assert cache.contains(keys[0])
+    cache.add(keys[2], "c")
+    assert not cache.contains(keys[1])
+    assert cache.contains(keys[0]) and cache.contains(keys[2])
+    assert cache.stats() == {'size': 2, 'max_size': 2, 'hits': 3, 'misses': 1, 'evictions': 1}
+
+    assert cache.invalidate("a") == 1
+    assert not cache.contains(keys[0])
+    assert cache.invalidate() == 1
+
+def test_signature_cache_key_covers_content_signature_and_algorithm():
+    key = SignatureCache.make_key(b"license", "00", "rsa-pss-sha256")
+    assert key == SignatureCache.make_key(memoryview(b"license"), "00", "rsa-pss-sha256")
+    assert key != SignatureCache.make_key(b"licensf", "00", "rsa-pss-sha256")
+    assert key != SignatureCache.make_key(b"license", "01", "rsa-pss-sha256")
+    assert key != SignatureCache.make_key(b"license", "00", "ed25519")
+
+def test_repeated_validation_hits_signature_cache(make_license, make_validator):
+    validator = make_validator()
+    license_obj = make_license()
+    assert validator.validate_license(license_obj)
+    assert validator.validate_license(license_obj)
+    stats = validator.get_cache_stats()
+    assert (stats['size'], stats['hits'], stats['misses']) == (1, 1, 1)
+
+    assert validator.invalidate_signature_cache(license_obj.license_id) == 1
+    assert validator.validate_license(license_obj)
+    assert validator.get_cache_stats()['misses'] == 2
+
+def test_rejected_signature_is_cached(make_license, make_validator):
+    validator = make_validator()
+    license_obj = make_license()
+    tampered = license_obj.model_copy(update={"customer_id": "someone_else"})
+
+    for _ in range(2):
+        result = validator.validate_license_detailed(tampered)
+        assert result.reason is ValidationReason.BAD_SIGNATURE
+    assert validator.rejected_signatures.stats()['hits'] == 1
+    assert validator.get_cache_stats()['size'] == 0
+
+    validator.invalidate_signature_cache()
+    assert validator.rejected_signatures.stats()['size'] == 0
+    assert validator.validate_license(license_obj)
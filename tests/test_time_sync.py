@@ -0,0 +1,130 @@
+"""TimeSyncValidator 测试，使用本地NTP应答器代替公网服务器"""
+import threading
+import time
+
+import pytest
+
+from hardware_validator import TimeSyncValidator
+
+# 超出 validate_time 允许的5分钟误差
+FAR_OFFSET = 3600.0
+
+def _make_validator(server, **kwargs) -> TimeSyncValidator:
+    kwargs.setdefault("ntp_timeout", 1.0)
+    return TimeSyncValidator(ntp_servers=[server.address], **kwargs)
+
+def _wait_stale(validator: TimeSyncValidator):
+    time.sleep(validator.max_staleness * 2)
+
+@pytest.mark.parametrize("offset, fresh, stale", [
+    (0.0, True, True),
+    (FAR_OFFSET, False, False),
+])
+def test_stale_use_last_keeps_checking_last_snapshot(ntp_server, offset, fresh, stale):
+    validator = _make_validator(
+        ntp_server(offset=offset), max_staleness=0.05, stale_policy=TimeSyncValidator.STALE_USE_LAST
+    )
+    assert validator.last_ntp_time is not None
+    assert validator.validate_time(time.time()) is fresh
+    _wait_stale(validator)
+    assert validator.validate_time(time.time()) is stale
+
+def test_stale_allow_passes_once_snapshot_expires(ntp_server):
+    validator = _make_validator(
+        ntp_server(offset=FAR_OFFSET), max_staleness=0.05, stale_policy=TimeSyncValidator.STALE_ALLOW
+    )
+    assert validator.validate_time(time.time()) is False
+    _wait_stale(validator)
+    assert validator.validate_time(time.time()) is True
+
+def test_stale_reject_fails_once_snapshot_expires(ntp_server):
+    validator = _make_validator(
+        ntp_server(), max_staleness=0.05, stale_policy=TimeSyncValidator.STALE_REJECT
+    )
+    assert validator.validate_time(time.time()) is True
+    _wait_stale(validator)
+    assert validator.validate_time(time.time()) is False
+    # 重新同步后恢复
+    validator.refresh()
+    assert validator.validate_time(time.time()) is True
+
+def test_unknown_stale_policy_rejected():
+    with pytest.raises(ValueError):
+        TimeSyncValidator(ntp_servers=[], stale_policy="ignore", initial_sync=False)
+
+def test_background_refresh_interval_is_jittered(ntp_server):
+    server = ntp_server()
+    validator = _make_validator(
+        server, background_refresh=True, refresh_interval=0.1, refresh_jitter=0.5, initial_sync=False
+    )
+    try:
+        assert server.wait_for_requests(10)
+    finally:
+        validator.stop(5.0)
+    # 首次探测之后的间隔落在 0.1 ± 0.05 秒内，且彼此不同
+    times = server.request_times[:10]
+    intervals = [b - a for a, b in zip(times, times[1:])]
+    assert all(0.04 <= interval <= 0.3 for interval in intervals)
+    assert max(intervals) - min(intervals) > 0.01
+    # 停止后不再探测
+    requests = server.requests
+    time.sleep(0.3)
+    assert server.requests == requests
+
+def test_background_refresh_publishes_new_snapshots(ntp_server):
+    server = ntp_server()
+    validator = _make_validator(server, background_refresh=True, refresh_interval=0.05, initial_sync=False)
+    try:
+        assert validator.wait_for_sync(5.0)
+        first = validator.snapshot
+        assert server.wait_for_requests(3)
+        time.sleep(0.05)
+        assert validator.snapshot.sync_monotonic > first.sync_monotonic
+        assert validator.last_ntp_time is not None
+    finally:
+        validator.stop(5.0)
+
+def test_validate_time_does_not_wait_for_first_background_probe(ntp_server):
+    server = ntp_server(delay=1.0)
+    start = time.monotonic()
+    validator = _make_validator(server, background_refresh=True, ntp_timeout=3.0, initial_sync=False)
+    try:
+        assert validator.validate_time(time.time()) is True
+        assert time.monotonic() - start < 0.5
+        assert not validator.synced
+        assert validator.wait_for_sync(5.0)
+        assert validator.last_ntp_time is not None
+    finally:
+        validator.stop(5.0)
+
+def test_validate_time_does_not_wait_for_background_refresh(ntp_server):
+    server = ntp_server()
+    validator = _make_validator(
+        server, background_refresh=True, refresh_interval=0.05, refresh_jitter=0.0, ntp_timeout=3.0
+    )
+    try:
+        # 之后的每次后台探测都要等待1秒
+        server.delay = 1.0
+        assert server.wait_for_requests(2)
+        start = time.monotonic()
+        for _ in range(100):
+            assert validator.validate_time(time.time()) is True
+        assert time.monotonic() - start < 0.5
+    finally:
+        validator.stop(5.0)
+
+def test_validate_time_does_not_wait_for_concurrent_inline_refresh(ntp_server):
+    server = ntp_server()
+    validator = _make_validator(server, refresh_interval=0.0, ntp_timeout=3.0)
+    server.delay = 1.0
+    refresher = threading.Thread(target=validator.refresh)
+    refresher.start()
+    try:
+        # 另一线程的探测已发出、正在等待应答时，快照虽已超过刷新间隔也直接使用
+        assert server.wait_for_requests(2)
+        start = time.monotonic()
+        assert validator.validate_time(time.time()) is True
+        assert time.monotonic() - start < 0.5
+        assert server.requests == 2
+    finally:
+        refresher.join()
@@ -0,0 +1,96 @@
+"""用量汇总测试：上限固定、协调进程重启与保底额度"""
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from license_models import License, UsageLimit
+from usage_aggregator import AggregatedUsageMeter, AggregatorClient, AggregatorServer
+
+SECRET = b"aggregator-test-secret"
+
+def _license(max_value: int = 5) -> License:
+    now = datetime.utcnow()
+    return License(
+        license_id=str(uuid.uuid4()),
+        customer_id="test_customer",
+        not_before=now - timedelta(days=1),
+        not_after=now + timedelta(days=1),
+        usage_limits=[UsageLimit(metric_type="api_calls", max_value=max_value)]
+    ).freeze()
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "usage.db")
+
+def _start(db_path: str, address: str = "tcp://127.0.0.1:0") -> AggregatorServer:
+    return AggregatorServer(address, db_path, SECRET).start()
+
+def _request(client: AggregatorClient, op: str, license_obj: License, **fields):
+    return client.request(op, license_id=license_obj.license_id, metric_type="api_calls", **fields)
+
+def test_add_usage_without_max_value_does_not_pin_unlimited(db_path):
+    license_obj = _license(max_value=5)
+    server = _start(db_path)
+    client = AggregatorClient(server.address, secret_key=SECRET)
+    try:
+        _request(client, "add_usage", license_obj, amount=3)
+        granted = [
+            _request(client, "lease_usage", license_obj, max_value=5, amount=1, min_amount=1)["granted"]
+            for _ in range(5)
+        ]
+        assert sum(granted) == 2
+        assert _request(client, "usage", license_obj)["used"] == 5
+    finally:
+        client.close()
+        server.stop()
+
+def test_pinned_limit_survives_restart(db_path):
+    license_obj = _license(max_value=5)
+    server = _start(db_path)
+    client = AggregatorClient(server.address, secret_key=SECRET)
+    try:
+        assert _request(client, "lease_usage", license_obj, max_value=5, amount=1, min_amount=1)["granted"] == 1
+    finally:
+        client.close()
+        server.stop()
+    server = _start(db_path)
+    client = AggregatorClient(server.address, secret_key=SECRET)
+    try:
+        # 重启后副本上报更大的上限也不被接受
+        granted = [
+            _request(client, "lease_usage", license_obj, max_value=100, amount=1, min_amount=1)["granted"]
+            for _ in range(10)
+        ]
+        assert sum(granted) == 4
+    finally:
+        client.close()
+        server.stop()
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="需要 Unix 套接字")
+def test_offline_usage_is_reconciled_under_the_limit(tmp_path, db_path):
+    address = f"unix://{tmp_path / 'aggregator.sock'}"
+    license_obj = _license(max_value=20)
+    server = _start(db_path, address)
+    meter = AggregatedUsageMeter(
+        AggregatorClient(address, secret_key=SECRET, retry_interval=0.0), lease_size=5, fallback_share=0.5
+    )
+    try:
+        # 预留5个，本地用掉3个
+        for _ in range(3):
+            assert meter.consume(license_obj, "api_calls")
+        server.stop()
+        # 协调进程不可达：先用完剩余的2个预留，再从保底额度放行4个
+        assert meter.consume(license_obj, "api_calls", 6)
+        server = _start(db_path, address)
+        # 补记后总用量为 3 + 6，预留的单位既不丢失也不重复计入
+        assert meter.consume(license_obj, "api_calls")
+        meter.flush()
+        assert meter.used(license_obj, "api_calls") == 10
+        # 重启后首先收到的是补记请求，上限仍按许可证固定
+        assert meter.consume(license_obj, "api_calls", 10)
+        assert not meter.consume(license_obj, "api_calls")
+    finally:
+        meter.close()
+        server.stop()
@@ -0,0 +1,87 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from license_models import License, UsageLimit
+from usage_meter import UsageMeter
+
+def _license(current_value: int = 2, max_value: int = 5) -> License:
+    now = datetime.utcnow()
+    return License(
+        license_id="lic", customer_id="c", not_before=now, not_after=now + timedelta(days=1),
+        usage_limits=[UsageLimit(metric_type="nodes", max_value=max_value, current_value=current_value)]
+    ).freeze()
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "usage.db")
+
+@pytest.fixture
+def meter(db_path):
+    meter = UsageMeter(db_path)
+    yield meter
+    meter.close()
+
+def test_consume_stops_at_max_value_and_starts_from_current_value(meter):
+    license_obj = _license()
+    assert meter.used(license_obj, "nodes") == 2
+    assert meter.consume(license_obj, "nodes", 3)
+    assert not meter.consume(license_obj, "nodes")
+    assert not meter.check(license_obj, "nodes")
+
+    meter.release(license_obj, "nodes", 2)
+    assert meter.used(license_obj, "nodes") == 3
+    assert meter.consume(license_obj, "nodes", 2)
+    assert meter.used(license_obj, "nodes") == 5
+
+def test_metric_without_limit_is_unlimited(meter):
+    license_obj = _license()
+    assert meter.check(license_obj, "users", 10 ** 6)
+    assert meter.consume(license_obj, "users", 10 ** 6)
+    assert meter.used(license_obj, "users") == 10 ** 6
+
+@pytest.mark.parametrize("value", [0, -1])
+def test_non_positive_amounts_are_rejected(meter, value):
+    license_obj = _license()
+    with pytest.raises(ValueError):
+        meter.consume(license_obj, "nodes", value)
+    with pytest.raises(ValueError):
+        meter.release(license_obj, "nodes", value)
+
+def test_meters_sharing_a_database_share_the_limit(db_path):
+    license_obj = _license(current_value=0, max_value=4)
+    a = UsageMeter(db_path, lease_size=3)
+    b = UsageMeter(db_path, lease_size=3)
+    try:
+        assert a.consume(license_obj, "nodes")
+        # a 预留了3个单位，b 只能拿到剩余的1个
+        assert b.consume(license_obj, "nodes")
+        assert not b.consume(license_obj, "nodes")
+        a.close()
+        assert b.consume(license_obj, "nodes", 2)
+        assert not b.consume(license_obj, "nodes")
+    finally:
+        a.close()
+        b.close()
+
+def test_row_deleted_by_another_connection_is_recreated(meter, db_path):
+    license_obj = _license()
+    assert meter.consume(license_obj, "nodes", 3)
+    other = sqlite3.connect(db_path)
+    with other:
+        other.execute("DELETE FROM usage")
+    other.close()
+
+    assert meter.consume(license_obj, "nodes")
+    assert meter.counter_value("lic", "nodes") == 3
+
+def test_validator_consumes_through_meter(make_license, make_validator, db_path):
+    meter = UsageMeter(db_path)
+    validator = make_validator(usage_meter=meter)
+    license_obj = make_license()
+    assert validator.consume_usage(license_obj, "api_calls", 10)
+    assert not validator.check_usage_limit(license_obj, "api_calls")
+    assert not validator.consume_usage(license_obj, "api_calls")
+    validator.release_usage(license_obj, "api_calls", 4)
+    assert validator.check_usage_limit(license_obj, "api_calls", 4)
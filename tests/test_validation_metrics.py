@@ -0,0 +1,24 @@
+import inspect
+import urllib.request
+
+from validation_metrics import ValidationMetrics, serve_metrics
+
+def test_serve_metrics_binds_loopback_by_default():
+    host, _ = inspect.signature(serve_metrics).parameters["address"].default
+    assert host == "127.0.0.1"
+
+def test_serve_metrics_exports_prometheus_text(make_license, make_validator):
+    metrics = ValidationMetrics()
+    validator = make_validator(hooks=[metrics])
+    assert validator.validate_license(make_license())
+
+    server = serve_metrics(metrics, validator, ("127.0.0.1", 0))
+    try:
+        host, port = server.server_address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'cache="signature"' in body
+    assert "license_validation" in body